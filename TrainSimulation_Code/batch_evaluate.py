@@ -0,0 +1,168 @@
+# batch_evaluate.py
+"""
+批量离线评价命令行工具
+
+递归查找目录下的仿真日志（*.csv / *.trj），用进程池并行评价，
+输出每个日志一行的汇总表：
+
+    python batch_evaluate.py logs/ -o summary.csv --workers 8
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from offline_evaluation import evaluate_log, DEFAULT_CHUNK_ROWS
+from route_data import load_sheet
+
+logger = logging.getLogger(__name__)
+
+LOG_EXTENSIONS = ('.csv', '.trj')
+
+# 汇总表的指标列（与display_evaluation_results展示的评价结果一致）
+METRIC_COLUMNS = (
+    "与目标速度平均相对偏差",
+    "极舒适时间占比",
+    "舒适时间占比",
+    "不舒适总时长",
+    "实际到发时间列表",
+    "目标到发时间列表",
+    "准点率",
+    "目标停车位置",
+    "实际停车位置",
+    "是否完成所有停站任务",
+    "停车误差",
+    "平均停车误差",
+)
+SUMMARY_COLUMNS = ('file',) + METRIC_COLUMNS + ('elapsed_s', 'error')
+
+# 工作进程中的时间表数据，由_init_worker设置，避免每个任务重复传输
+_schedule = None
+
+def find_logs(root, extensions=LOG_EXTENSIONS, exclude=()):
+    """递归查找目录下的日志文件，按路径排序"""
+    exclude = {os.path.abspath(path) for path in exclude}
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if filename.lower().endswith(extensions) and os.path.abspath(path) not in exclude:
+                paths.append(path)
+    return sorted(paths)
+
+def _init_worker(schedule):
+    global _schedule
+    _schedule = schedule
+
+def evaluate_file(path, chunk_rows=DEFAULT_CHUNK_ROWS, schedule=None):
+    """
+    评价单个日志文件，异常不向外抛出
+
+    返回:
+        (path, results, elapsed, error): 评价失败时results为None，error为错误信息
+    """
+    start = time.perf_counter()
+    try:
+        results = evaluate_log(path, schedule=schedule if schedule is not None else _schedule,
+                               chunk_rows=chunk_rows)
+        error = ""
+    except Exception as e:
+        results = None
+        error = f"{type(e).__name__}: {str(e)}"
+    return path, results, time.perf_counter() - start, error
+
+def _format_value(value):
+    """列表按JSON写出，数值转换为Python内置类型"""
+    if isinstance(value, (list, tuple)):
+        return json.dumps([float(v) for v in value])
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def summary_row(path, results, elapsed, error):
+    """一个日志的汇总行"""
+    row = {'file': path, 'elapsed_s': f"{elapsed:.4f}", 'error': error}
+    for column in METRIC_COLUMNS:
+        row[column] = _format_value(results[column]) if results is not None else ""
+    return row
+
+def evaluate_directory(root, output, workers=None, data_dir='.', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    并行评价目录下的全部日志并写出汇总表
+
+    参数:
+        root: 日志目录
+        output: 汇总表CSV路径
+        workers: 进程数，默认为CPU核数；为1时在当前进程中顺序评价
+        data_dir: 数据文件目录（读取列车目标速度曲线）
+        chunk_rows: CSV日志每块读取的行数
+
+    返回:
+        (total, failed): 日志总数与评价失败的数量
+    """
+    paths = find_logs(root, exclude=(output,))
+    schedule = load_sheet('target_speed', data_dir)
+    logger.info(f"共找到{len(paths)}个日志文件")
+
+    start = time.perf_counter()
+    if workers == 1:
+        outcomes = (evaluate_file(path, chunk_rows, schedule) for path in paths)
+        rows = _collect(outcomes, len(paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(schedule,)) as pool:
+            outcomes = pool.map(evaluate_file, paths, [chunk_rows] * len(paths))
+            rows = _collect(outcomes, len(paths))
+
+    with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    failed = sum(1 for row in rows if row['error'])
+    logger.info(
+        f"评价完成: {len(rows)}个日志, 失败{failed}个, "
+        f"耗时{time.perf_counter() - start:.2f}s, 汇总表: {output}"
+    )
+    return len(rows), failed
+
+def _collect(outcomes, total):
+    rows = []
+    for index, (path, results, elapsed, error) in enumerate(outcomes, 1):
+        if error:
+            logger.warning(f"[{index}/{total}] {path} 评价失败: {error}")
+        else:
+            logger.info(f"[{index}/{total}] {path} ({elapsed:.3f}s)")
+        rows.append(summary_row(path, results, elapsed, error))
+    return rows
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="批量离线评价仿真日志")
+    parser.add_argument('root', help="日志目录（递归查找*.csv与*.trj）")
+    parser.add_argument('-o', '--output', default='evaluation_summary.csv', help="汇总表CSV路径")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument('--data-dir', default='.', help="数据文件目录")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="CSV日志每块读取的行数")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    total, failed = evaluate_directory(
+        args.root, args.output,
+        workers=args.workers,
+        data_dir=args.data_dir,
+        chunk_rows=args.chunk_rows
+    )
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
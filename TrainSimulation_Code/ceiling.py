@@ -0,0 +1,122 @@
+# ceiling.py
+import bisect
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class CeilingSpeedIndex:
+    """
+    ATP顶棚速度分段索引
+
+    顶棚速度在每个信号区段内为常数。区段按起点排序，位置x处的限速为
+    起点不大于x的最后一个区段的限速；早于第一个区段时取第一个区段的限速，
+    区段之间的空隙沿用前一区段的限速。
+
+    列车位置单调增加，advance()从上一次的区段（游标）开始向前查找，
+    每步摊还O(1)；任意位置的查询与前方更低限速的查询为O(log n)。
+
+    参数:
+        starts: 各区段起点 (m)
+        ends: 各区段终点 (m)
+        limits: 各区段限速 (km/h)
+    """
+    def __init__(self, starts, ends, limits):
+        starts = np.asarray(starts, dtype=float)
+        order = np.argsort(starts, kind='stable')
+        self.starts = starts[order]
+        self.ends = np.asarray(ends, dtype=float)[order]
+        self.limits = np.asarray(limits, dtype=float)[order]
+        self.n_segments = len(self.starts)
+
+        # 标量查询使用Python列表
+        self._starts = self.starts.tolist()
+        self._limits = self.limits.tolist()
+        self.cursor = 0
+
+        self._build_lookahead()
+        logger.debug(f"顶棚速度索引已建立，区段数量: {self.n_segments}")
+
+    def _build_lookahead(self):
+        """建立区间最小值稀疏表：_range_min[k][p] 为 limits[p : p + 2^k] 的最小值"""
+        levels = [self.limits]
+        width = 1
+        while width * 2 <= self.n_segments:
+            previous = levels[-1]
+            levels.append(np.minimum(previous[:-width], previous[width:]))
+            width *= 2
+        self._range_min = [level.tolist() for level in levels]
+
+    def segment_at(self, position):
+        """位置所在区段的下标"""
+        i = bisect.bisect_right(self._starts, position) - 1
+        return min(max(i, 0), self.n_segments - 1)
+
+    def limit_at(self, position):
+        """任意位置的限速 (km/h)"""
+        return self._limits[self.segment_at(position)]
+
+    def limit_array(self, positions):
+        """数组形式的限速查询"""
+        i = np.searchsorted(self.starts, positions, side='right') - 1
+        return self.limits[np.clip(i, 0, self.n_segments - 1)]
+
+    def advance(self, position):
+        """
+        按单调增加的位置查询限速，从游标处向前查找
+
+        位置后退（如仿真重置）时退化为二分查找并重新定位游标。
+        """
+        i = self.cursor
+        starts = self._starts
+        if position < starts[i]:
+            i = self.segment_at(position)
+        else:
+            last = self.n_segments - 1
+            while i < last and starts[i + 1] <= position:
+                i += 1
+        self.cursor = i
+        return self._limits[i]
+
+    def reset_cursor(self):
+        """游标回到线路起点"""
+        self.cursor = 0
+
+    def next_change(self, position):
+        """位置之后下一个区段的起点，不存在时返回inf"""
+        i = bisect.bisect_right(self._starts, position)
+        return self._starts[i] if i < self.n_segments else float('inf')
+
+    def next_lower_restriction(self, position, below=None):
+        """
+        前方第一个低于阈值的限速区段
+
+        参数:
+            position: 当前位置 (m)
+            below: 限速阈值 (km/h)，为None时取当前位置的限速
+
+        返回:
+            (区段起点, 限速)，前方不存在更低限速时返回None
+        """
+        i = self.segment_at(position)
+        if below is None:
+            below = self._limits[i]
+
+        # 在稀疏表上按2的幂次向前跳过最小值不低于阈值的区间
+        p = i + 1
+        n = self.n_segments
+        for k in range(len(self._range_min) - 1, -1, -1):
+            width = 1 << k
+            if p + width <= n and self._range_min[k][p] >= below:
+                p += width
+        if p >= n:
+            return None
+        return self._starts[p], self._limits[p]
+
+    def distance_to_next_lower(self, position, below=None):
+        """到前方第一个更低限速区段起点的距离 (m)，不存在时返回inf"""
+        restriction = self.next_lower_restriction(position, below)
+        if restriction is None:
+            return float('inf')
+        return restriction[0] - position
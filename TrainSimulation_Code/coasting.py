@@ -0,0 +1,76 @@
+# coasting.py
+"""
+惰行工况的解析解
+
+惰行时列车只受基本阻力作用，以km/h计的速度u满足
+    du/dt = -3.6·g/1000·(A + B·u + C·u²)
+当C > 0且4AC > B²时（常用的Davis系数均满足），令 w = u + B/(2C)、
+ω = √(A/C - B²/(4C²))、λ = 3.6·g/1000·C·ω，则
+    w(t) = ω·tan(θ0 - λt),            θ0 = arctan(w0/ω)
+    s(t) = [(ω/λ)·ln(cos(θ0 - λt) / cos θ0) - B/(2C)·t] / 3.6
+速度在 t_stop = (θ0 - arctan(B/(2Cω))) / λ 时降为0，此后列车静止。
+
+解析解是连续方程的精确解，与按步长推进的TrainSimulation（步初阻力的
+显式积分）相差O(dt)。所有函数都接受标量或NumPy数组（按广播规则计算）。
+"""
+import numpy as np
+
+# 与TrainSimulation.get_resistance一致的重力加速度
+GRAVITY = 9.81
+
+def has_closed_form(davis):
+    """阻力系数是否满足解析解的条件（C > 0且4AC > B²）"""
+    A, B, C = (np.asarray(c, dtype=float) for c in davis)
+    return (C > 0) & (4 * A * C > B * B)
+
+class CoastSolution:
+    """
+    从初速度v0开始惰行的解析解
+
+    参数:
+        v0: 初速度 (m/s)
+        davis: 基本阻力系数 (A, B, C)，需满足has_closed_form
+    """
+    def __init__(self, v0, davis):
+        A, B, C = (np.asarray(c, dtype=float) for c in davis)
+        self.A, self.B, self.C = A, B, C
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.shift = B / (2 * C)
+            self.omega = np.sqrt(A / C - self.shift ** 2)
+            self.rate = 3.6 * GRAVITY / 1000 * C * self.omega
+            self.theta0 = np.arctan((3.6 * np.asarray(v0, dtype=float) + self.shift) / self.omega)
+            self.theta_stop = np.arctan(self.shift / self.omega)
+            self.stop_time = np.maximum(0.0, (self.theta0 - self.theta_stop) / self.rate)
+
+    def speed(self, t):
+        """t时刻的速度 (m/s)"""
+        theta = self.theta0 - self.rate * np.minimum(t, self.stop_time)
+        return np.maximum(0.0, self.omega * np.tan(theta) - self.shift) / 3.6
+
+    def distance(self, t):
+        """0到t时刻的行驶距离 (m)"""
+        t = np.minimum(t, self.stop_time)
+        log_ratio = np.log(np.cos(self.theta0 - self.rate * t) / np.cos(self.theta0))
+        return (self.omega / self.rate * log_ratio - self.shift * t) / 3.6
+
+    def resistance(self, t):
+        """t时刻的基本阻力加速度 (m/s²，为负值)"""
+        u = self.speed(t) * 3.6
+        return -(self.A + self.B * u + self.C * u ** 2) * GRAVITY / 1000
+
+    def time_to_distance(self, distance, iterations=60):
+        """
+        行驶distance所需时间，停车前到达不了时返回inf
+
+        s(t)单调增加，按停车时间区间二分求解。
+        """
+        distance = np.asarray(distance, dtype=float)
+        stop_time = np.broadcast_to(self.stop_time, np.broadcast(distance, self.stop_time).shape)
+        lo = np.zeros(stop_time.shape)
+        hi = stop_time.copy()
+        for _ in range(iterations):
+            mid = (lo + hi) / 2
+            below = self.distance(mid) < distance
+            lo = np.where(below, mid, lo)
+            hi = np.where(below, hi, mid)
+        return np.where(self.distance(stop_time) < distance, np.inf, hi)
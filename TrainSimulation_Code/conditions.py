@@ -0,0 +1,29 @@
+# conditions.py
+"""列车运行工况名称及其整数编码"""
+
+COASTING = "正常运行：惰行"
+TRACTION = "正常运行：牵引"
+BRAKING = "正常运行：制动"
+ATP_EMERGENCY = "ATP紧急制动"
+ATP_PENALTY = "紧急制动罚时"
+STATION_STOP = "停站"
+
+# 工况编码即其在元组中的下标，新增工况只能追加在末尾
+OPERATING_CONDITIONS = (
+    COASTING,
+    TRACTION,
+    BRAKING,
+    ATP_EMERGENCY,
+    ATP_PENALTY,
+    STATION_STOP,
+)
+
+CONDITION_CODES = {name: code for code, name in enumerate(OPERATING_CONDITIONS)}
+
+def condition_code(name):
+    """工况名称转换为整数编码"""
+    return CONDITION_CODES[name]
+
+def condition_name(code):
+    """整数编码转换为工况名称"""
+    return OPERATING_CONDITIONS[int(code)]
@@ -0,0 +1,195 @@
+# eval_server.py
+"""
+无头实时评价服务
+
+基于asyncio接收多个仿真客户端的遥测数据（协议同SimulationDataSender），
+每个连接对应一个EvaluationSession，并在本机提供简单的HTTP JSON查询接口:
+
+    GET /sessions         全部会话概览
+    GET /sessions/<id>    单个会话的概览与当前实时评价
+
+    python eval_server.py --port 5000 --query-port 5001
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+
+from evaluation_session import EvaluationSession
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+
+class EvaluationServer:
+    """
+    asyncio评价服务
+
+    参数:
+        host, port: 遥测数据监听地址
+        query_host, query_port: 查询接口监听地址，query_port为None时不启动查询接口
+        retain_disconnected: 保留的已断开会话数量上限
+        retain_seconds: 已断开会话的保留时间(秒)，None表示不按时间过期
+    """
+    def __init__(self, host='0.0.0.0', port=5000, query_host='127.0.0.1', query_port=5001,
+                 retain_disconnected=32, retain_seconds=3600.0):
+        self.host = host
+        self.port = port
+        self.query_host = query_host
+        self.query_port = query_port
+        self.retain_disconnected = retain_disconnected
+        self.retain_seconds = retain_seconds
+
+        self.sessions = OrderedDict()
+        self.next_session_id = 1
+        self.messages = 0
+        self._servers = []
+
+    async def start(self):
+        """启动遥测数据与查询接口的监听"""
+        self._servers.append(await asyncio.start_server(self.handle_client, self.host, self.port))
+        logger.info(f"评价服务已启动，监听 {self.host}:{self.port}")
+        if self.query_port is not None:
+            self._servers.append(await asyncio.start_server(self.handle_query, self.query_host, self.query_port))
+            logger.info(f"查询接口已启动: http://{self.query_host}:{self.query_port}/sessions")
+
+    async def serve_forever(self):
+        """启动并持续运行直至被取消"""
+        await self.start()
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in self._servers))
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """关闭全部监听"""
+        for server in self._servers:
+            server.close()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+
+    async def handle_client(self, reader, writer):
+        """接收一个仿真客户端的遥测数据"""
+        peer = writer.get_extra_info('peername')
+        peer = f"{peer[0]}:{peer[1]}" if peer else ""
+        self._prune_sessions()
+        session = EvaluationSession(self.next_session_id, peer)
+        self.next_session_id += 1
+        self.sessions[session.session_id] = session
+        logger.info(f"客户端已连接: 会话{session.session_id} ({peer})")
+
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                self.messages += session.feed(data)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"会话{session.session_id}连接异常: {str(e)}")
+        finally:
+            session.connected = False
+            session.disconnected_at = time.time()
+            writer.close()
+            logger.info(f"客户端已断开: 会话{session.session_id} ({peer})")
+            self._prune_sessions()
+
+    def _prune_sessions(self):
+        """移除超过保留时间的已断开会话，数量超过上限时再移除最早的会话"""
+        if self.retain_seconds is not None:
+            expire_before = time.time() - self.retain_seconds
+            for session_id in [sid for sid, session in self.sessions.items()
+                               if not session.connected and (session.disconnected_at or 0) < expire_before]:
+                del self.sessions[session_id]
+        disconnected = [sid for sid, session in self.sessions.items() if not session.connected]
+        for session_id in disconnected[:max(0, len(disconnected) - self.retain_disconnected)]:
+            del self.sessions[session_id]
+
+    def query(self, path):
+        """
+        处理查询请求
+
+        返回:
+            (HTTP状态码, 可JSON序列化的结果)
+        """
+        self._prune_sessions()
+        parts = [part for part in path.split('?', 1)[0].split('/') if part]
+        if parts == ['sessions']:
+            return 200, {
+                "messages": self.messages,
+                "sessions": [session.summary() for session in self.sessions.values()],
+            }
+        if len(parts) == 2 and parts[0] == 'sessions' and parts[1].isdigit():
+            session = self.sessions.get(int(parts[1]))
+            if session is None:
+                return 404, {"error": f"会话不存在: {parts[1]}"}
+            return 200, {
+                "summary": session.summary(),
+                "evaluation": session.current_evaluation(),
+            }
+        return 404, {"error": f"未知的查询路径: {path}"}
+
+    async def handle_query(self, reader, writer):
+        """最简HTTP/1.0查询接口，仅支持GET"""
+        try:
+            request_line = await reader.readline()
+            # 丢弃请求头
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            if method != 'GET':
+                status, body = 405, {"error": "仅支持GET请求"}
+            else:
+                status, body = self.query(path)
+        except ValueError:
+            status, body = 400, {"error": "请求格式错误"}
+
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}[status]
+        writer.write(
+            f"HTTP/1.0 {status} {reason}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode('latin-1') + payload
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="无头实时评价服务")
+    parser.add_argument('--host', default='0.0.0.0', help="遥测数据监听地址")
+    parser.add_argument('--port', type=int, default=5000, help="遥测数据监听端口")
+    parser.add_argument('--query-host', default='127.0.0.1', help="查询接口监听地址")
+    parser.add_argument('--query-port', type=int, default=5001, help="查询接口监听端口")
+    parser.add_argument('--retain-disconnected', type=int, default=32, help="保留的已断开会话数量上限")
+    parser.add_argument('--retain-seconds', type=float, default=3600.0, help="已断开会话的保留时间(秒)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    server = EvaluationServer(
+        host=args.host,
+        port=args.port,
+        query_host=args.query_host,
+        query_port=args.query_port,
+        retain_disconnected=args.retain_disconnected,
+        retain_seconds=args.retain_seconds
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("评价服务已停止")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,60 +3,32 @@ import os
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QLabel, QPushButton, QTextEdit, 
-                           QFileDialog, QGroupBox, QMessageBox, QProgressBar)
+                           QFileDialog, QGroupBox, QMessageBox, QProgressBar,
+                           QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView)
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtNetwork import QTcpServer, QTcpSocket
-import pandas as pd
 import numpy as np
-import json
 import logging
 
-class EvaluationMetrics:
-    """评价指标计算类"""
-    @staticmethod
-    def calculate_overshoot(actual_speed, target_speed):
-        """计算超调量"""
-        if target_speed == 0:
-            return 0
-        overshoot = max(0, (actual_speed - target_speed) / target_speed * 100)
-        return overshoot
-
-    @staticmethod
-    def calculate_comfort_level(acceleration):
-        """计算舒适度"""
-        abs_acc = abs(acceleration)
-        if abs_acc <= 0.28:
-            return 1, "极舒适"
-        elif abs_acc <= 1.23:
-            return 2, "舒适"
-        elif abs_acc <= 2.12:
-            return 3, "不舒适"
-        else:
-            return 4, "无法忍受"
-
-    @staticmethod
-    def calculate_punctuality(actual_time, number):
-        """计算准点率"""
-        if number == 1:
-            if abs(actual_time-98.2) <= 5:
-                in_time = 1
-            else:
-                in_time = 0
-        else:
-            if abs(actual_time-228.6) <= 5:
-                in_time = 1
-            else:
-                in_time = 0
-        return in_time
-
-    @staticmethod
-    def calculate_stopping_error(actual_position, number):
-        """计算停车误差"""
-        if number == 1:
-            stopping_error = abs(actual_position-22878.32)
-        else:
-            stopping_error = abs(actual_position-24275.31)
-        return stopping_error
+from route_data import load_sheet
+from offline_evaluation import evaluate_log
+from metrics import EvaluationMetrics
+from evaluation_session import EvaluationSession
+
+# 会话概览表的列：(表头, 取值函数)
+SESSION_TABLE_COLUMNS = (
+    ("会话", lambda s: str(s["session_id"])),
+    ("客户端", lambda s: s["peer"]),
+    ("连接", lambda s: "已连接" if s["connected"] else "已断开"),
+    ("样本数", lambda s: str(s["samples"])),
+    ("仿真时间(s)", lambda s: "" if s["time"] is None else f"{s['time']:.1f}"),
+    ("速度(km/h)", lambda s: "" if s["speed"] is None else f"{s['speed']:.1f}"),
+    ("工况", lambda s: s["status"] or ""),
+    ("平均偏差(%)", lambda s: f"{s['mean_deviation_percent']:.2f}"),
+    ("最大超调(%)", lambda s: f"{s['max_overshoot']:.2f}"),
+    ("极舒适占比(%)", lambda s: f"{s['comfort_ratio']:.1f}"),
+    ("ATP触发次数", lambda s: str(s["atp_count"])),
+)
 
 class EvaluationSystem(QMainWindow):
     """评价系统主窗口"""
@@ -67,8 +39,11 @@ class EvaluationSystem(QMainWindow):
         
         # 初始化状态变量
         self.tcp_server = None
-        self.client_socket = None
-        self.real_time_data = []
+        # 每个仿真客户端连接对应一个评价会话
+        self.sessions = {}
+        self.client_sockets = {}
+        self.next_session_id = 1
+        self.selected_session_id = None
         
         # 初始化界面
         self.setup_ui()
@@ -78,7 +53,7 @@ class EvaluationSystem(QMainWindow):
         
         # 创建定时器用于实时评价更新
         self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.update_realtime_evaluation)
+        self.update_timer.timeout.connect(self.refresh_evaluation)
         self.update_timer.start(1000)  # 每秒更新一次
 
     def setup_ui(self):
@@ -95,6 +70,22 @@ class EvaluationSystem(QMainWindow):
         connection_layout.addWidget(self.status_label)
         connection_group.setLayout(connection_layout)
         layout.addWidget(connection_group)
+
+        """ 用户界面上部，会话概览组 """
+        # 各仿真客户端的评价概览，选中一行后在实时评价组中显示该会话
+        session_group = QGroupBox("会话概览")
+        session_layout = QVBoxLayout()
+        self.session_table = QTableWidget(0, len(SESSION_TABLE_COLUMNS))
+        self.session_table.setHorizontalHeaderLabels([title for title, _ in SESSION_TABLE_COLUMNS])
+        self.session_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.session_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.session_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.session_table.verticalHeader().setVisible(False)
+        self.session_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.session_table.itemSelectionChanged.connect(self.handle_session_selected)
+        session_layout.addWidget(self.session_table)
+        session_group.setLayout(session_layout)
+        layout.addWidget(session_group)
         
         """ 用户界面中上部，实时评价组 """
         # 创建实时评价组
@@ -106,9 +97,10 @@ class EvaluationSystem(QMainWindow):
         self.comfort_label = QLabel("舒适度: 极舒适")
         self.speed_deviation_label = QLabel("与目标速度偏差: 0km/h")
         self.speed_deviation_label_percent = QLabel("与目标速度偏差百分比: 0%")
+        self.window_label = QLabel("滑动窗口统计: 暂无")
         
         # 将标签添加入实时评价组
-        for label in [self.overshoot_label, self.comfort_label, self.speed_deviation_label, self.speed_deviation_label_percent]:
+        for label in [self.overshoot_label, self.comfort_label, self.speed_deviation_label, self.speed_deviation_label_percent, self.window_label]:
             realtime_layout.addWidget(label)
             
         realtime_group.setLayout(realtime_layout)
@@ -182,119 +174,167 @@ class EvaluationSystem(QMainWindow):
         self.status_label.setText("服务器已启动，等待连接...")
 
     def handle_new_connection(self):
-        """处理新的客户端连接"""
-        self.client_socket = self.tcp_server.nextPendingConnection()
-        self.client_socket.readyRead.connect(self.handle_client_data)
-        self.client_socket.disconnected.connect(self.handle_client_disconnect)
-        self.status_label.setText("客户端已连接")
-
-    def handle_client_data(self):
+        """处理新的客户端连接，为每个连接创建独立的评价会话"""
+        while self.tcp_server.hasPendingConnections():
+            client_socket = self.tcp_server.nextPendingConnection()
+            session_id = self.next_session_id
+            self.next_session_id += 1
+
+            peer = f"{client_socket.peerAddress().toString()}:{client_socket.peerPort()}"
+            self.sessions[session_id] = EvaluationSession(session_id, peer)
+            self.client_sockets[session_id] = client_socket
+            client_socket.readyRead.connect(lambda sid=session_id: self.handle_client_data(sid))
+            client_socket.disconnected.connect(lambda sid=session_id: self.handle_client_disconnect(sid))
+
+            # 默认显示最新连接的会话
+            self.selected_session_id = session_id
+            logging.info(f"客户端已连接: 会话{session_id} ({peer})")
+        self.update_connection_status()
+        self.update_session_table()
+
+    def handle_client_data(self, session_id):
         """处理接收到的客户端数据"""
         try:
-            data = self.client_socket.readAll().data().decode()
-            sim_data = json.loads(data)
-            
-            # 更新评价数据
-            self.actual_time = sim_data.get("actual_time", [])
-            self.number_1 = sim_data.get("number_1", [])
-            self.actual_position = sim_data.get("actual_position", [])
-            self.number_2 = sim_data.get("number_2", [])
-            
-            self.real_time_data.append(sim_data)
-            self.update_realtime_evaluation()
+            client_socket = self.client_sockets.get(session_id)
+            if client_socket is None:
+                return
+            # 数据流可能在任意位置合并或拆分，由会话的帧解码器拼出完整记录
+            received = self.sessions[session_id].feed(client_socket.readAll().data())
+            if received and session_id == self.selected_session_id:
+                self.update_realtime_evaluation()
         except Exception as e:
             logging.error(f"数据处理错误: {str(e)}")
 
-    def handle_client_disconnect(self):
-        """处理客户端断开连接"""
-        self.client_socket = None
-        self.status_label.setText("客户端已断开")
+    def handle_client_disconnect(self, session_id):
+        """处理客户端断开连接，保留会话的评价数据"""
+        client_socket = self.client_sockets.pop(session_id, None)
+        if client_socket is not None:
+            client_socket.deleteLater()
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.connected = False
+            logging.info(f"客户端已断开: 会话{session_id} ({session.peer})")
+        self.update_connection_status()
+        self.update_session_table()
+
+    def update_connection_status(self):
+        """更新连接状态显示"""
+        connected = len(self.client_sockets)
+        if connected:
+            self.status_label.setText(f"已连接客户端: {connected}")
+        elif self.sessions:
+            self.status_label.setText("客户端已断开")
+        else:
+            self.status_label.setText("服务器已启动，等待连接...")
+
+    def handle_session_selected(self):
+        """切换实时评价组显示的会话"""
+        rows = self.session_table.selectionModel().selectedRows()
+        if not rows:
+            return
+        item = self.session_table.item(rows[0].row(), 0)
+        if item is None:
+            return
+        session_id = int(item.text())
+        if session_id != self.selected_session_id:
+            self.selected_session_id = session_id
+            self.reset_evaluation_labels()
+            self.update_realtime_evaluation()
+
+    def update_session_table(self):
+        """刷新会话概览表"""
+        summaries = [session.summary() for session in self.sessions.values()]
+        self.session_table.blockSignals(True)
+        self.session_table.setRowCount(len(summaries))
+        for row, summary in enumerate(summaries):
+            for column, (_, value) in enumerate(SESSION_TABLE_COLUMNS):
+                text = value(summary)
+                item = self.session_table.item(row, column)
+                if item is None:
+                    self.session_table.setItem(row, column, QTableWidgetItem(text))
+                elif item.text() != text:
+                    item.setText(text)
+            if summary["session_id"] == self.selected_session_id:
+                self.session_table.selectRow(row)
+        self.session_table.blockSignals(False)
+
+    def selected_session(self):
+        """实时评价组当前显示的会话"""
+        return self.sessions.get(self.selected_session_id)
+
+    def refresh_evaluation(self):
+        """定时刷新会话概览与实时评价显示"""
+        self.update_session_table()
+        self.update_realtime_evaluation()
 
     def update_realtime_evaluation(self):
         """更新实时评价显示"""
-        # 在命名变量前检查有没有同名变量，如果没有则初始化
-        if not hasattr(self, "actual_time"):
-            self.actual_time = []
-        if not hasattr(self, "number_1"):
-            self.number_1 = []
-        if not hasattr(self, "actual_position"):
-            self.actual_position = []
-        if not hasattr(self, "number_2"):
-            self.number_2 = []
-        
-        if not self.real_time_data:
+        session = self.selected_session()
+        if session is None:
+            return
+        evaluation = session.current_evaluation()
+        if evaluation is None:
             return
-            
-        current_data = self.real_time_data[-1]
         
-        # 计算超调量
-        overshoot = EvaluationMetrics.calculate_overshoot(
-            current_data['speed'],
-            current_data['target_speed']
-        )
-        self.overshoot_label.setText(f"超调量: {overshoot:.2f}%")
+        # 超调量
+        self.overshoot_label.setText(f"超调量: {evaluation['overshoot']:.2f}%")
 
         # 实际速度与目标速度偏差（大小）
-        deviation = current_data['speed'] - current_data['target_speed']
-        self.speed_deviation_label.setText(f"与目标速度偏差: {deviation:.2f}km/h")
+        self.speed_deviation_label.setText(f"与目标速度偏差: {evaluation['deviation']:.2f}km/h")
 
         # 实际速度与目标速度偏差（百分比）
-        deviation_percent = abs(deviation / current_data['target_speed'] * 100)
-        self.speed_deviation_label_percent.setText(f"与目标速度偏差百分比: {deviation_percent:.2f}%")
+        self.speed_deviation_label_percent.setText(f"与目标速度偏差百分比: {evaluation['deviation_percent']:.2f}%")
         
-        # 计算舒适度
-        comfort_text = EvaluationMetrics.calculate_comfort_level(
-            current_data['acceleration']
-        )
-        self.comfort_label.setText(f"舒适度: {comfort_text}")
+        # 舒适度
+        self.comfort_label.setText(f"舒适度: {evaluation['comfort']}")
+
+        # 滑动窗口内的统计
+        window_texts = []
+        for seconds, window in session.metrics.snapshot()["windows"].items():
+            window_texts.append(
+                f"近{seconds:g}秒: 平均偏差 {window['mean_deviation_percent']:.2f}%  "
+                f"极舒适占比 {window['comfort_fractions'][0]:.1f}%  "
+                f"最大超调 {window['max_overshoot']:.2f}%  "
+                f"ATP触发 {window['atp_count']}次"
+            )
+        self.window_label.setText("\n".join(window_texts))
         
-        # 如果当前状态为紧急制动，则将ATP警告显示为“ATP警告: 警告”
-        if current_data["status"]=="ATP紧急制动":
+        # 本会话触发过ATP紧急制动时显示警告
+        if evaluation["atp_count"]:
             self.ATP_TRIGGERED.setText("很遗憾，您触发了ATP紧急制动，请及时处理！")
         
-        # 更新encoragement_label
-        if current_data['status']=="ATP紧急制动":
-            # 字号为20，颜色为红色
-            self.encoragement_label.setStyleSheet("font-size:20px;color:red;")
-            self.encoragement_label.setText("ATP紧急制动中")
-        
-        elif abs(deviation / current_data['target_speed'])>0.05:
-            if current_data['speed']>current_data['target_speed']:
-                 # 字号为20，颜色为红色
-                self.encoragement_label.setStyleSheet("font-size:20px;color:red;")
-                self.encoragement_label.setText("速度过快，请减速！")
-
-            else:
-                # 字号为20，颜色为蓝色
-                self.encoragement_label.setStyleSheet("font-size:20px;color:blue;")
-                self.encoragement_label.setText("速度过慢，请加速！")
-                
-        else:
-            # 字号为20，颜色为绿色
-            self.encoragement_label.setStyleSheet("font-size:20px;color:green;")
-            self.encoragement_label.setText("速度恰好，请保持！")
+        # 更新encoragement_label，字号为20，颜色随提示变化
+        self.encoragement_label.setStyleSheet(f"font-size:20px;color:{evaluation['advice_color']};")
+        self.encoragement_label.setText(evaluation['advice'])
 
 
     def reset_evaluation(self):
-        """重置实时评价界面"""
+        """重置实时评价界面与当前会话的评价数据"""
+        self.reset_evaluation_labels()
+        session = self.selected_session()
+        if session is not None:
+            session.reset()
+        self.update_session_table()
+
+    def reset_evaluation_labels(self):
+        """恢复实时评价组的初始显示"""
         self.overshoot_label.setText("与目标速度平均相对偏差: 0%")
         self.comfort_label.setText("舒适度: 极舒适")
         self.speed_deviation_label.setText("与目标速度偏差: 0km/h")
         self.speed_deviation_label_percent.setText("与目标速度偏差百分比: 0%")
+        self.window_label.setText("滑动窗口统计: 暂无")
         self.ATP_TRIGGERED.setText("ATP触发情况: 暂无")
         # 字号为20，颜色为黑色
         self.encoragement_label.setStyleSheet("font-size:16px;color:black;text-align:center;")
         self.encoragement_label.setText("就绪")
 
-        self.real_time_data = []
-
     def select_file(self):
-        """选择CSV文件进行离线评价"""
+        """选择CSV文件或列式轨迹日志进行离线评价"""
         file_name, _ = QFileDialog.getOpenFileName(
             self,
             "选择CSV文件",
             "",
-            "CSV Files (*.csv)"
+            "Log Files (*.csv *.trj);;CSV Files (*.csv);;Trajectory Files (*.trj)"
         )
         
         if file_name:
@@ -322,142 +362,11 @@ class EvaluationSystem(QMainWindow):
 
 
     def evaluate_offline_data(self, file_path):
-        """评价离线数据"""
+        """评价离线数据（CSV日志或.trj轨迹日志，分块流式计算）"""
         try:
-            # 读取离线数据，读取第一行为标题行
-            df = pd.read_csv(file_path, encoding='gb2312')
-            # 读取时间表数据，相对路径为Simulation_V1.1\列车目标速度曲线.xlsx
-            time_table=pd.read_excel(r'./列车目标速度曲线.xlsx')
-            # 从df中筛选出Operating Condition不为停站的行，保存为df_on_rail
-            df_on_rail = df[df["Operating Condition"]!="停站"]
-
-            # 计算评价指标
-            results = {
-                # 列车运行平稳性指标
-                "与目标速度平均相对偏差": 0, # 与目标速度平均相对偏差，实际运行速度与目标速度差的绝对值除以目标速度
-                "极舒适时间占比": 0, # 舒适度为“极舒适”的总时间占比
-                "舒适时间占比": 0, # 舒适度为”极舒适“与”舒适“的总时间占比
-                "不舒适总时长": 0, # 舒适度为”不舒适“与”无法忍受“的总时间
-
-                # 列车停站指标
-                "实际到发时间列表": [],
-                "目标到发时间列表": [],
-                "准点率": 0, # 各站到站准点率与离站准点率
-                "目标停车位置": [],
-                "实际停车位置": [],
-                "是否完成所有停站任务":[],
-                "停车误差": [],
-                "平均停车误差": 0, # 各站停车误差的平均值
-            }
-            
+            # 时间表数据（列车目标速度曲线.xlsx）优先使用编译后的数据缓存
+            results = evaluate_log(file_path, schedule=load_sheet('target_speed', '.'))
 
-            # 计算各项指标
-            """ 与目标速度平均相对偏差 """
-            sum = 0
-            # 计算和
-            for i in range(0,len(df_on_rail)):
-                sum += abs(df_on_rail.iloc[i]["Speed (km/h)"]-df_on_rail.iloc[i]["Target Speed (km/h)"])/df_on_rail.iloc[i]["Target Speed (km/h)"]
-            
-            #计算与目标速度平均相对偏差
-            results["与目标速度平均相对偏差"] = sum/(len(df_on_rail))
-
-
-
-            """ 舒适度统计 """
-            # 统计舒适度为“极舒适”的总时间占比，注意，我们评价的是运行过程中的舒适度，故分母中的总时间不包括停车时间。
-            comfort_time=0
-            for i in range(0,len(df_on_rail)):
-                if abs(df_on_rail.iloc[i]["Total Acceleration (m/s^2)"])<=0.28:
-                    comfort_time+=1
-
-            # 将极舒适时间占比写入results字典中
-            results["极舒适时间占比"] = 100*comfort_time/(len(df_on_rail['Simulation Time (s)']))
-
-            # 统计舒适度为“极舒适”或“舒适”的总时间占比，注意，我们评价的是运行过程中的舒适度，故分母中的总时间不包括停车时间。
-            mid_comfort_time=0
-            for i in range(0,len(df_on_rail)):
-                if abs(df_on_rail.iloc[i]["Total Acceleration (m/s^2)"])<=1.23:
-                    mid_comfort_time+=1
-
-            # 将舒适时间占比写入results字典中
-            results["舒适时间占比"] = 100*mid_comfort_time/(len(df_on_rail['Simulation Time (s)']))
-
-            # 统计舒适度为”不舒适“或”无法忍受“的总时间
-            un_comfort_time=0
-            for i in range(0,len(df_on_rail)):
-                if abs(df_on_rail.iloc[i]["Total Acceleration (m/s^2)"])>1.23:
-                    un_comfort_time+=1
-
-            # 将不舒适总时长写入results字典中
-            results["不舒适总时长"] = un_comfort_time
-
-
-
-            """ 准点率 """
-            # 本次仿真只考虑中间站到站、中间站离站与终点站到站的时间。认为与时间表相比差距在60s以内的为准点。
-            on_time_count = 0
-            actual_stop_time = []
-            for i in range(0,len(df)):
-                # 遍历df中的各行，如果该行的Operating Condition为停站且与上一行或下一行不同，记录该行的Simulation Time (s)，并保存到数组actual_stop_time中
-                if (i>0 and i<len(df)-1) and df.iloc[i]["Operating Condition"]=="停站":
-                    if df.iloc[i]["Operating Condition"] != df.iloc[i-1]["Operating Condition"] or df.iloc[i]["Operating Condition"] != df.iloc[i+1]["Operating Condition"]:
-                        actual_stop_time.append(df.iloc[i]["Simulation Time (s)"])
-            # 将actual_stop_time数组中的所有元素写入results的“实际到发时间列表”数组中
-            results["实际到发时间列表"] = actual_stop_time
-            
-            target_stop_time = []
-            for i in range(0,len(time_table)):
-                if(i>0 and i<len(time_table)-1) and (time_table.iloc[i]["列车速度（km/h）"]==0):
-                    if (time_table.iloc[i]["列车速度（km/h）"]!=time_table.iloc[i-1]["列车速度（km/h）"] or time_table.iloc[i]["列车速度（km/h）"]!=time_table.iloc[i+1]["列车速度（km/h）"]):
-                        target_stop_time.append(time_table.iloc[i]["仿真时间"])
-
-            # 将target_stop_time数组中的所有元素写入results的“目标到发时间列表”数组中
-            results["目标到发时间列表"] = target_stop_time
-            
-            # 计算准点率
-            for i in range(len(actual_stop_time)):
-                if abs(actual_stop_time[i]-target_stop_time[i])<=60:
-                    on_time_count = on_time_count+1
-            
-            # 将准点率写入results字典中
-            results["准点率"] = 100 * on_time_count/len(actual_stop_time)
-            
-
-
-            """ 停车误差与平均停车误差 """
-            # 将目标停站位置写入数组target_stop_position中
-            target_stop_position = []
-            for i in range(len(time_table)):
-                if time_table.iloc[i]["列车速度（km/h）"]==0:
-                    # 对于已经记录的停站位置，不再重复记录
-                    if (time_table.iloc[i]["列车位置"] not in target_stop_position) and time_table.iloc[i]["列车位置"]!=22880.2255:
-                        target_stop_position.append(time_table.iloc[i]["列车位置"])
-            
-            # 将目标停车位置写入字典
-            results["目标停车位置"] = target_stop_position
-
-            # 将实际停站位置写入数组stop_position中
-            stop_position = []
-            for i in range(len(df)):
-                if df.iloc[i]["Operating Condition"]=="停站":
-                    # 对于已经记录的停站位置，不再重复记录
-                    if df.iloc[i]["Position (m)"] not in stop_position:
-                        stop_position.append(df.iloc[i]["Position (m)"])
-            
-            # 将实际停车位置写入字典
-            results["实际停车位置"] = stop_position
-            
-            # 检查是否完成所有停站任务，若是，则继续计算平均停车误差
-            if len(target_stop_position)!=len(stop_position):
-                results["是否完成所有停站任务"]="未完成停站任务"
-            else:
-                results["是否完成所有停站任务"]="完成停站任务"
-                # 将target_stop_position与stop_position数组对应元素相减并取绝对值，结果写入results的“停车误差”数组中
-                results["停车误差"] = [abs(target_stop_position[i]-stop_position[i]) for i in range(len(target_stop_position))]
-                # 对results的“停车误差”数组求平均值，并写入results的“平均停车误差”字段中
-                results["平均停车误差"] = np.mean(results["停车误差"])
-            
-            
             """ 评价结果展示 """
             # 显示评价结果
             self.display_evaluation_results(results)
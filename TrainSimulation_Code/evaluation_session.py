@@ -0,0 +1,154 @@
+# evaluation_session.py
+"""
+评价会话：一个仿真客户端连接对应一个会话
+
+会话保存该连接的帧解码器、最近的列车状态（固定容量环形缓冲区）、到站记录
+以及增量评价指标，不依赖Qt，可同时用于EvaluationSystem与无头评价服务。
+"""
+import logging
+import time
+
+from conditions import ATP_EMERGENCY
+from metrics import EvaluationMetrics
+from online_metrics import DEFAULT_WINDOWS, OnlineMetrics, StateRingBuffer
+from telemetry_protocol import FrameDecoder, RECORD_COUNTERS
+
+logger = logging.getLogger(__name__)
+
+# 实际速度与目标速度的相对偏差超过该值时提示加速或减速
+SPEED_ADVICE_TOLERANCE = 0.05
+
+def speed_advice(state):
+    """
+    根据当前列车状态给出驾驶提示
+
+    返回:
+        (提示文字, 颜色)
+    """
+    if state['status'] == ATP_EMERGENCY:
+        return "ATP紧急制动中", "red"
+    target_speed = state['target_speed']
+    if target_speed and abs((state['speed'] - target_speed) / target_speed) > SPEED_ADVICE_TOLERANCE:
+        if state['speed'] > target_speed:
+            return "速度过快，请减速！", "red"
+        return "速度过慢，请加速！", "blue"
+    return "速度恰好，请保持！", "green"
+
+class EvaluationSession:
+    """
+    单个仿真客户端的评价会话
+
+    参数:
+        session_id: 会话编号
+        peer: 客户端地址描述
+        windows: 滑动窗口长度(秒)列表
+        history_size: 保存的最近列车状态数，0表示不保存（默认）
+    """
+    def __init__(self, session_id, peer="", windows=DEFAULT_WINDOWS, history_size=0):
+        self.session_id = session_id
+        self.peer = peer
+        self.decoder = FrameDecoder()
+        self.connected = True
+        self.connected_at = time.time()
+        self.disconnected_at = None
+        self.metrics = OnlineMetrics(windows)
+        self.history = StateRingBuffer(history_size) if history_size else None
+        self.reset()
+
+    def reset(self):
+        """清空评价数据（连接与帧解码状态保持不变）"""
+        self.metrics.reset()
+        if self.history is not None:
+            self.history.clear()
+        self.latest = None
+        self.last_received = None
+
+        # 到站时间与停车位置记录
+        self.actual_time = []
+        self.number_1 = []
+        self.actual_position = []
+        self.number_2 = []
+
+    def feed(self, data):
+        """
+        处理收到的原始数据
+
+        返回:
+            本次收到的列车状态记录数
+        """
+        self.decoder.feed(data)
+        received = 0
+        for record_type, record in self.decoder.records():
+            self.handle_record(record_type, record)
+            if record_type != RECORD_COUNTERS:
+                received += 1
+        if received:
+            self.last_received = time.time()
+        return received
+
+    def handle_record(self, record_type, record):
+        """处理一条解码后的记录"""
+        if record_type == RECORD_COUNTERS:
+            self.actual_time = record["actual_time"]
+            self.number_1 = record["number_1"]
+            self.actual_position = record["actual_position"]
+            self.number_2 = record["number_2"]
+            return
+
+        if self.history is not None:
+            self.history.append(record)
+        self.metrics.update(record)
+        self.latest = record
+
+    def current_evaluation(self):
+        """
+        当前时刻的实时评价
+
+        返回:
+            评价字典，尚未收到列车状态时返回None
+        """
+        state = self.latest
+        if state is None:
+            return None
+        deviation = state['speed'] - state['target_speed']
+        deviation_percent = (abs(deviation / state['target_speed'] * 100)
+                             if state['target_speed'] else 0.0)
+        comfort_level, comfort_name = EvaluationMetrics.calculate_comfort_level(state['acceleration'])
+        advice, advice_color = speed_advice(state)
+        return {
+            "overshoot": EvaluationMetrics.calculate_overshoot(state['speed'], state['target_speed']),
+            "deviation": deviation,
+            "deviation_percent": deviation_percent,
+            "comfort_level": comfort_level,
+            "comfort": comfort_name,
+            "atp_active": state['status'] == ATP_EMERGENCY,
+            "atp_count": self.metrics.cumulative()["atp_count"],
+            "advice": advice,
+            "advice_color": advice_color,
+        }
+
+    def summary(self):
+        """会话概览（用于会话列表与查询接口）"""
+        state = self.latest or {}
+        metrics = self.metrics.snapshot()
+        cumulative = metrics["cumulative"]
+        return {
+            "session_id": self.session_id,
+            "peer": self.peer,
+            "connected": self.connected,
+            "samples": cumulative["samples"],
+            "time": state.get('time'),
+            "position": state.get('position'),
+            "speed": state.get('speed'),
+            "status": state.get('status'),
+            "mean_deviation_percent": cumulative["mean_deviation_percent"],
+            "max_overshoot": cumulative["max_overshoot"],
+            "comfort_ratio": cumulative["comfort_fractions"][0],
+            "atp_count": cumulative["atp_count"],
+            "windows": metrics["windows"],
+            "on_time": [EvaluationMetrics.calculate_punctuality(t, n)
+                        for t, n in zip(self.actual_time, self.number_1)],
+            "stopping_error": [EvaluationMetrics.calculate_stopping_error(p, n)
+                               for p, n in zip(self.actual_position, self.number_2)],
+            "decode_errors": self.decoder.errors,
+        }
@@ -0,0 +1,226 @@
+# events.py
+"""
+仿真步内事件的精确定位
+
+TrainSimulation.shanhou在一个步长内以恒定加速度推进:
+    v(τ) = max(0, v0 + aτ)
+    x(τ) = x0 + v0τ + aτ²/2        (τ ≤ 停车时刻)
+事件（越过某一位置、速度降为0、超过顶棚速度）的发生时刻由该运动学关系解析求得
+（位置事件为二次方程的根），记录的时间与位置不再量化到步长。
+
+EventRegistry保存线路上的全部事件，新增地面事件只需注册一个Event对象，
+不必修改shanhou:
+
+    simulation.events.register(PositionEvent(23500.0, handler))
+
+处理函数签名为 handler(simulation, time, position, speed)，速度单位m/s。
+"""
+import logging
+import math
+
+import numpy as np
+
+from conditions import ATP_EMERGENCY, ATP_PENALTY
+
+logger = logging.getLogger(__name__)
+
+class StepKinematics:
+    """
+    一个仿真步内的匀加速运动（速度降为0后静止）
+
+    参数:
+        t0: 步开始时刻(s)
+        x0: 步开始位置(m)
+        v0: 步开始速度(m/s)
+        a: 加速度(m/s²)
+        dt: 步长(s)
+    """
+    __slots__ = ('t0', 'x0', 'v0', 'a', 'dt', 'duration', 'x1', 'v1')
+
+    def __init__(self, t0, x0, v0, a, dt):
+        self.t0 = t0
+        self.x0 = x0
+        self.v0 = v0
+        self.a = a
+        self.dt = dt
+        self.v1 = max(0, v0 + a * dt)
+        # 运动时长：步内速度降为0时为停车时刻
+        self.duration = -v0 / a if self.v1 == 0 and a < 0 else dt
+        self.x1 = x0 + (v0 + self.v1) * self.duration / 2
+
+    def speed_at(self, tau):
+        """步内τ时刻的速度"""
+        return max(0, self.v0 + self.a * min(tau, self.duration))
+
+    def position_at(self, tau):
+        """步内τ时刻的位置"""
+        tau = min(tau, self.duration)
+        return self.x0 + (self.v0 + self.a * tau / 2) * tau
+
+    def time_to_position(self, position):
+        """
+        到达位置的步内时刻
+
+        返回:
+            τ ∈ [0, duration]，本步未到达时返回None；起点已在该位置之后时返回0
+        """
+        if self.x0 >= position:
+            return 0.0
+        if self.x1 < position:
+            return None
+        return min(crossing_time(self.v0, self.a, position - self.x0), self.duration)
+
+    def time_to_speed(self, speed):
+        """速度首次达到speed（加速越过或减速降至）的步内时刻，本步未达到时返回None"""
+        if self.v0 == speed:
+            return 0.0
+        if self.a == 0 or (speed - self.v0) / self.a < 0:
+            return None
+        tau = (speed - self.v0) / self.a
+        return tau if tau <= self.duration else None
+
+def crossing_time(v0, a, distance):
+    """
+    匀加速运动行驶distance所需时间，即 aτ²/2 + v0τ - distance = 0 的最小非负根
+
+    采用 τ = 2d / (v0 + √(v0² + 2ad)) 的形式，避免a接近0时的相消误差。
+    调用方需保证distance在停车前可以到达。
+    """
+    disc = max(0.0, v0 * v0 + 2 * a * distance)
+    denominator = v0 + math.sqrt(disc)
+    if denominator <= 0:
+        return 0.0
+    return 2 * distance / denominator
+
+def crossing_times(v0, a, distance):
+    """crossing_time的数组形式（用于批量仿真）"""
+    v0 = np.asarray(v0, dtype=float)
+    disc = np.maximum(0.0, v0 * v0 + 2 * np.asarray(a) * distance)
+    denominator = v0 + np.sqrt(disc)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, 2 * np.asarray(distance) / denominator, 0.0)
+
+class Event:
+    """
+    步内事件基类
+
+    参数:
+        handler: 处理函数 handler(simulation, time, position, speed)
+        condition: 事件是否有效的判断函数 condition(simulation)，None表示始终有效
+        name: 事件名称
+    """
+    def __init__(self, handler, condition=None, name=""):
+        self.handler = handler
+        self.condition = condition
+        self.name = name
+
+    def active(self, simulation):
+        return self.condition is None or self.condition(simulation)
+
+    def locate(self, simulation, step):
+        """返回事件在本步内的发生时刻τ，未发生时返回None"""
+        raise NotImplementedError
+
+class PositionEvent(Event):
+    """列车越过指定位置"""
+    def __init__(self, position, handler, condition=None, name=""):
+        super().__init__(handler, condition, name or f"位置{position}")
+        self.position = position
+
+    def locate(self, simulation, step):
+        return step.time_to_position(self.position)
+
+class StopEvent(Event):
+    """运行中的列车速度降为0"""
+    def locate(self, simulation, step):
+        if step.v0 > 0 and step.v1 == 0:
+            return step.duration
+        return None
+
+class CeilingOverspeedEvent(Event):
+    """
+    列车速度首次达到顶棚速度（ATP触发点）
+
+    只在步末处于超速状态（即下一步开始时ATP将触发紧急制动）时定位，
+    步内超速的起点可能是加速越过当前区段限速，也可能是驶入更低限速的区段。
+    """
+    def locate(self, simulation, step):
+        if simulation.status in (ATP_EMERGENCY, ATP_PENALTY):
+            return None
+        ceiling = simulation.ceiling_index
+        if step.v1 * 3.6 < ceiling.limit_at(step.x1) or step.v0 * 3.6 >= ceiling.limit_at(step.x0):
+            return None
+
+        tau = 0.0
+        position = step.x0
+        while True:
+            limit = ceiling.limit_at(position) / 3.6
+            if step.speed_at(tau) >= limit:
+                return tau
+            boundary = ceiling.next_change(position)
+            boundary_tau = step.time_to_position(boundary) if boundary <= step.x1 else None
+            reached = step.time_to_speed(limit)
+            if reached is not None and reached >= tau and (boundary_tau is None or reached < boundary_tau):
+                return reached
+            if boundary_tau is None:
+                return step.duration
+            tau = boundary_tau
+            position = boundary
+
+class EventRegistry:
+    """步内事件注册表，按发生时刻依次调用处理函数"""
+    def __init__(self):
+        self.events = []
+
+    def register(self, event):
+        """注册事件并返回该事件"""
+        self.events.append(event)
+        return event
+
+    def remove(self, event):
+        self.events.remove(event)
+
+    def position_events(self):
+        """全部位置事件"""
+        return [event for event in self.events if isinstance(event, PositionEvent)]
+
+    def next_position(self, simulation, position):
+        """
+        position之后第一个有效位置事件的位置，用于宏步在事件之前停下
+
+        返回:
+            事件位置，前方没有有效位置事件时返回inf
+        """
+        ahead = [event.position for event in self.position_events()
+                 if event.position > position and event.active(simulation)]
+        return min(ahead, default=float('inf'))
+
+    def next_event_time(self, simulation, step):
+        """
+        本步内最早发生的有效事件的时刻τ（只定位，不调用处理函数）
+
+        返回:
+            τ，本步内没有事件时返回None
+        """
+        times = [tau for tau in (event.locate(simulation, step) for event in self.events
+                                 if event.active(simulation)) if tau is not None]
+        return min(times, default=None)
+
+    def process(self, simulation, step):
+        """
+        定位并处理本步内发生的事件
+
+        返回:
+            发生的事件数
+        """
+        hits = []
+        for order, event in enumerate(self.events):
+            if not event.active(simulation):
+                continue
+            tau = event.locate(simulation, step)
+            if tau is not None:
+                hits.append((tau, order, event))
+        hits.sort(key=lambda hit: (hit[0], hit[1]))
+        for tau, _, event in hits:
+            event.handler(simulation, step.t0 + tau, step.position_at(tau), step.speed_at(tau))
+        return len(hits)
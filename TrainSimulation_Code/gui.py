@@ -7,15 +7,29 @@ from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QPainter, QLinearGradien
 import logging
 import numpy as np
 import os
+import threading
+import time
+from collections import deque
 from datetime import datetime
 import csv
 
 from widgets import SpeedGaugeWidget, AccelerationGaugeWidget, MatplotlibWidget
 from simulation import TrainSimulation
 from pid import TrainSpeedController
+from sim_clock import FixedStepClock, MAX_SPEED, SIM_STEP
+from sim_worker import SimulationWorker, QueuedDataSender
+from trajectory_buffer import TrajectoryBuffer
 
 logger = logging.getLogger(__name__)
 
+# 界面刷新率选项，与仿真步进频率相互独立
+SPEED_OPTIONS = ["1倍速", "2倍速", "5倍速", "10倍速", "20倍速", "50倍速", "100倍速", "最大速度"]
+
+UI_FPS_OPTIONS = ["10帧/秒", "20帧/秒", "30帧/秒", "60帧/秒", "自适应"]
+DEFAULT_UI_FPS_OPTION = "30帧/秒"
+ADAPTIVE_UI_FPS_RANGE = (5, 60)  # 自适应模式的刷新率范围
+UI_RENDER_BUDGET = 0.5           # 一帧渲染耗时占刷新间隔的上限比例
+
 class ModernGroupBox(QGroupBox):
     """现代风格的GroupBox"""
     def __init__(self, title, parent=None):
@@ -112,9 +126,17 @@ class MainWindow(QMainWindow):
             # 初始化状态变量
             self.is_running = False
             self.is_manual = True
-            self.actual_positions = []
-            self.actual_speeds = []
+            self.trajectory = TrajectoryBuffer()  # 实际速度曲线（位置, 速度）
             self.simulation_speed = 1
+            self.sim_clock = FixedStepClock(SIM_STEP, self.simulation_speed)
+
+            # 界面刷新状态：仿真线程每步发布最新状态，由界面定时器按刷新率绘制
+            self.gui_thread = threading.current_thread()
+            self.pending_messages = deque()
+            self.latest_result = None
+            self.ui_dirty = False
+            self.ui_fps = 30
+            self.adaptive_ui = False
             
             # 初始化界面
             self.setup_ui()
@@ -122,10 +144,13 @@ class MainWindow(QMainWindow):
             # 初始化仿真系统
             self.setup_simulation()
             
-            # 创建定时器
-            self.sim_timer = QTimer()
-            self.sim_timer.timeout.connect(self.update_simulation)
-            self.base_interval = 100  # 100ms = 10Hz
+            # 创建仿真线程
+            self.sim_worker = SimulationWorker(self.sim_clock, self.step_simulation)
+
+            # 创建界面刷新定时器
+            self.ui_timer = QTimer()
+            self.ui_timer.timeout.connect(self.refresh_ui)
+            self.update_ui_rate()
             
             logger.info("主窗口初始化完成")
             
@@ -226,7 +251,7 @@ class MainWindow(QMainWindow):
         # 仿真速度选择
         speed_label = QLabel("仿真速度:")
         self.speed_combo = ModernComboBox()
-        self.speed_combo.addItems(["1倍速", "2倍速", "5倍速", "10倍速"])
+        self.speed_combo.addItems(SPEED_OPTIONS)
         
         for button in [self.start_button, self.stop_button, self.reset_button]:
             button_layout.addWidget(button)
@@ -419,7 +444,12 @@ class MainWindow(QMainWindow):
         
         # 仿真速度选择
         self.speed_combo = QComboBox()
-        self.speed_combo.addItems(["1倍速", "2倍速", "5倍速", "10倍速"])
+        self.speed_combo.addItems(SPEED_OPTIONS)
+
+        # 界面刷新率选择
+        self.fps_combo = QComboBox()
+        self.fps_combo.addItems(UI_FPS_OPTIONS)
+        self.fps_combo.setCurrentText(DEFAULT_UI_FPS_OPTION)
         
         # 连接信号
         self.start_button.clicked.connect(self.start_simulation)
@@ -427,6 +457,7 @@ class MainWindow(QMainWindow):
         self.reset_button.clicked.connect(self.reset_simulation)
         self.mode_combo.currentTextChanged.connect(self.change_drive_mode)
         self.speed_combo.currentTextChanged.connect(self.update_simulation_speed)
+        self.fps_combo.currentTextChanged.connect(self.update_ui_rate)
         
         # 添加到布局
         control_layout.addWidget(self.start_button)
@@ -436,6 +467,8 @@ class MainWindow(QMainWindow):
         control_layout.addWidget(self.mode_combo)
         control_layout.addWidget(QLabel("仿真速度:"))
         control_layout.addWidget(self.speed_combo)
+        control_layout.addWidget(QLabel("界面刷新:"))
+        control_layout.addWidget(self.fps_combo)
         control_layout.addStretch()
         
         control_group.setLayout(control_layout)
@@ -458,6 +491,10 @@ class MainWindow(QMainWindow):
         try:
             self.simulation = TrainSimulation()
             self.controller = TrainSpeedController()
+            # 仿真线程只暂存遥测数据，由界面线程发送
+            self.telemetry = QueuedDataSender(self.simulation.data_sender)
+            self.simulation.data_sender = self.telemetry
+            self.init_plot_curves()
             self.reset_data_records()
             self.update_displays()
             self.show_message("仿真系统初始化完成")
@@ -471,9 +508,8 @@ class MainWindow(QMainWindow):
         try:
             if not self.is_running:
                 self.is_running = True
-                interval = self.base_interval / self.simulation_speed
-                self.sim_timer.setInterval(int(interval))
-                self.sim_timer.start()
+                self.sim_worker.start()
+                self.ui_timer.start()
                 
                 self.update_control_state(True)
                 self.show_message("仿真开始")
@@ -487,9 +523,13 @@ class MainWindow(QMainWindow):
         try:
             if self.is_running:
                 self.is_running = False
-                self.sim_timer.stop()
+                self.sim_worker.stop()
+                self.ui_timer.stop()
+                # 显示最后一步的状态
+                self.refresh_ui()
                 
                 self.update_control_state(False)
+                self.simulation.flush_log()
                 self.show_message("仿真结束")
                 self.save_simulation_data()
                 
@@ -505,6 +545,7 @@ class MainWindow(QMainWindow):
                 
             self.simulation.reset()
             self.controller.reset()
+            self.sim_clock.reset()
             self.reset_data_records()
             self.update_displays()
             self.show_message("仿真已重置")
@@ -528,22 +569,30 @@ class MainWindow(QMainWindow):
         """更新仿真速度"""
         try:
             speed_text = self.speed_combo.currentText()
-            self.simulation_speed = int(speed_text.replace('倍速', ''))
-            
+            if speed_text == "最大速度":
+                self.simulation_speed = MAX_SPEED
+            else:
+                self.simulation_speed = int(speed_text.replace('倍速', ''))
             if self.is_running:
-                interval = self.base_interval / self.simulation_speed
-                self.sim_timer.setInterval(int(interval))
+                self.sim_worker.submit(self.sim_clock.set_speed, self.simulation_speed)
+            else:
+                self.sim_clock.set_speed(self.simulation_speed)
                 
         except Exception as e:
             logger.error(f"更新仿真速度失败: {str(e)}")
 
-    def update_simulation(self):
-        """更新仿真状态"""
+    def step_simulation(self):
+        """
+        执行一个固定步长的仿真步（在仿真线程中运行）
+
+        返回:
+            仿真是否继续运行
+        """
         try:
             if not self.is_running:
-                return
+                return False
                 
-            dt = 0.1 * self.simulation_speed
+            dt = self.sim_clock.step
             
             # 计算控制输出（自动驾驶模式）
             control_acc = None
@@ -562,26 +611,70 @@ class MainWindow(QMainWindow):
             if "error" in result:
                 raise Exception(result["error"])
                 
-            # 更新数据记录和显示
+            # 更新数据记录并发布最新状态，显示由界面定时器按刷新率更新
             self.update_data_records(result)
-            self.update_displays(result)
+            self.latest_result = result
+            self.ui_dirty = True
             
             if result.get("message"):
                 self.show_message(result["message"])
                 if result["message"].startswith("仿真结束"):
-                    self.show_message("仿真结束")
-                    self.stop_simulation()
+                    return False
+            return True
                 
         except Exception as e:
             logger.error(f"仿真更新失败: {str(e)}")
             self.show_message(f"错误: 仿真更新失败 - {str(e)}")
+            return False
+
+    def update_ui_rate(self, fps_text=None):
+        """设置界面刷新率"""
+        try:
+            fps_text = fps_text or self.fps_combo.currentText()
+            self.adaptive_ui = fps_text == "自适应"
+            if self.adaptive_ui:
+                # 自适应模式从最高刷新率开始，渲染超出预算时逐步降低
+                self.ui_fps = ADAPTIVE_UI_FPS_RANGE[1]
+            else:
+                self.ui_fps = int(fps_text.replace('帧/秒', ''))
+            self.ui_timer.setInterval(int(1000 / self.ui_fps))
+        except Exception as e:
+            logger.error(f"更新界面刷新率失败: {str(e)}")
+
+    def refresh_ui(self):
+        """按界面刷新率显示最新的仿真状态，并发送仿真线程暂存的遥测数据"""
+        self.show_pending_messages()
+        self.telemetry.drain()
+        if self.is_running and self.sim_worker.finished:
+            # 仿真线程已结束（到达终点或出错）
             self.stop_simulation()
+            return
+        if not self.ui_dirty:
+            return
+        self.ui_dirty = False
+        start = time.perf_counter()
+        self.update_displays(self.latest_result)
+        if self.adaptive_ui:
+            self.adapt_ui_rate(time.perf_counter() - start)
+
+    def adapt_ui_rate(self, render_time):
+        """自适应刷新率：渲染超出预算时减半，余量充足时逐步恢复"""
+        min_fps, max_fps = ADAPTIVE_UI_FPS_RANGE
+        budget = UI_RENDER_BUDGET / self.ui_fps
+        if render_time > budget:
+            fps = max(min_fps, self.ui_fps // 2)
+        elif render_time < budget * 0.5:
+            fps = min(max_fps, self.ui_fps + 1)
+        else:
+            return
+        if fps != self.ui_fps:
+            self.ui_fps = fps
+            self.ui_timer.setInterval(int(1000 / fps))
 
     def update_data_records(self, result):
         """更新数据记录"""
-        if result["speed"] > 0 or self.actual_positions:
-            self.actual_positions.append(result["position"])
-            self.actual_speeds.append(result["speed"])
+        if result["speed"] > 0 or len(self.trajectory):
+            self.trajectory.append(result["position"], result["speed"])
 
 
     def update_displays(self, result=None):
@@ -606,28 +699,32 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logger.error(f"更新显示失败: {str(e)}")
 
-    def update_plot(self):
-        """更新速度-位置图表"""
+    def init_plot_curves(self):
+        """计算并绘制目标速度和顶棚速度曲线（每条线路只需一次）"""
         try:
-            # 生成目标速度和顶棚速度曲线数据
             x_range = np.linspace(21604.2803, 24275.30985, 1000)
-            target_speeds = [self.simulation.get_target_speed(x) for x in x_range]
-            ceiling_speeds = [self.simulation.get_ceiling_speed(x) for x in x_range]
-            
-            # 绘制图表
-            self.plot_widget.plot_data(
+            target_speeds, ceiling_speeds = self.simulation.get_speed_profiles(x_range)
+            self.plot_widget.set_static_curves(
                 x_range, target_speeds,
-                x_range, ceiling_speeds,
-                self.actual_positions, self.actual_speeds
+                x_range, ceiling_speeds
             )
+        except Exception as e:
+            logger.error(f"绘制速度曲线失败: {str(e)}")
+
+    def update_plot(self):
+        """更新速度-位置图表（只重绘实际速度曲线）"""
+        try:
+            # 按绘图区像素宽度降采样，绘制耗时与运行时长无关
+            left, right = self.plot_widget.ax.get_xlim()
+            positions, speeds = self.trajectory.view(left, right, self.plot_widget.point_budget())
+            self.plot_widget.update_actual(positions, speeds)
         except Exception as e:
             logger.error(f"更新图表失败: {str(e)}")
 
     def reset_data_records(self):
         """重置数据记录"""
         try:
-            self.actual_positions.clear()
-            self.actual_speeds.clear()
+            self.trajectory.clear()
             self.update_plot()
         except Exception as e:
             logger.error(f"重置数据记录失败: {str(e)}")
@@ -647,7 +744,11 @@ class MainWindow(QMainWindow):
             # 保存运行数据
             #self.export_data_to_csv(f"{base_filename}.csv")
             
-            # 保存速度曲线图
+            # 保存速度曲线图（LTTB降采样）
+            left, right = self.plot_widget.ax.get_xlim()
+            positions, speeds = self.trajectory.view(left, right, self.plot_widget.point_budget(),
+                                                     method='lttb')
+            self.plot_widget.actual_line.set_data(positions, speeds)
             self.plot_widget.save_plot(f"{base_filename}.png")
             
             self.show_message(f"仿真数据以及仿真过程记录已保存至 {save_dir} 目录")
@@ -671,12 +772,13 @@ class MainWindow(QMainWindow):
                 ])
                 
                 # 写入数据
-                for i, pos in enumerate(self.actual_positions):
+                positions, speeds = self.trajectory.arrays()
+                for i, pos in enumerate(positions):
                     target_speed = self.simulation.get_target_speed(pos)
                     ceiling_speed = self.simulation.get_ceiling_speed(pos)
                     writer.writerow([
                         f"{pos:.4f}",
-                        f"{self.actual_speeds[i]:.2f}",
+                        f"{speeds[i]:.2f}",
                         f"{target_speed:.2f}",
                         f"{ceiling_speed:.2f}"
                     ])
@@ -697,35 +799,44 @@ class MainWindow(QMainWindow):
             logger.error(f"更新控制状态失败: {str(e)}")
 
     def show_message(self, message):
-        """显示消息"""
+        """显示消息（在仿真线程中调用时暂存，由界面线程显示）"""
         try:
             timestamp = self.simulation.time if hasattr(self, 'simulation') else 0
-            formatted_message = f"[{timestamp:.1f}s] {message}"
-            self.message_box.append(formatted_message)
-            
-            # 自动滚动到底部
-            scrollbar = self.message_box.verticalScrollBar()
-            scrollbar.setValue(scrollbar.maximum())
+            self.pending_messages.append(f"[{timestamp:.1f}s] {message}")
+            if threading.current_thread() is self.gui_thread:
+                self.show_pending_messages()
             
         except Exception as e:
             logger.error(f"显示消息失败: {str(e)}")
 
+    def show_pending_messages(self):
+        """在界面线程中显示暂存的消息"""
+        if not self.pending_messages:
+            return
+        while self.pending_messages:
+            self.message_box.append(self.pending_messages.popleft())
+            
+        # 自动滚动到底部
+        scrollbar = self.message_box.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
     def keyPressEvent(self, event):
         """处理键盘事件"""
         if not self.is_running or not self.is_manual:
             return
             
+        # 驾驶操作提交给仿真线程，在两个仿真步之间执行
+        handlers = {
+            Qt.Key_Q: self.handle_traction_key,
+            Qt.Key_W: self.handle_coasting_key,
+            Qt.Key_E: self.handle_brake_key,
+            Qt.Key_O: self.handle_increase_key,
+            Qt.Key_P: self.handle_decrease_key,
+        }
         try:
-            if event.key() == Qt.Key_Q:
-                self.handle_traction_key()
-            elif event.key() == Qt.Key_W:
-                self.handle_coasting_key()
-            elif event.key() == Qt.Key_E:
-                self.handle_brake_key()
-            elif event.key() == Qt.Key_O:
-                self.handle_increase_key()
-            elif event.key() == Qt.Key_P:
-                self.handle_decrease_key()
+            handler = handlers.get(event.key())
+            if handler is not None:
+                self.sim_worker.submit(handler)
                 
         except Exception as e:
             logger.error(f"键盘事件处理失败: {str(e)}")
@@ -821,9 +932,10 @@ class MainWindow(QMainWindow):
             if self.is_running:
                 self.stop_simulation()
             
-            # 保存最终日志
+            # 保存最终日志并关闭日志文件
             if hasattr(self, 'simulation'):
                 self.simulation.log_state()
+                self.simulation.cleanup()
                 
             event.accept()
             
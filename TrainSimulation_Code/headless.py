@@ -0,0 +1,345 @@
+# headless.py
+import argparse
+import csv
+import logging
+import sys
+import time
+
+import numpy as np
+
+from simulation import TrainSimulation, NullDataSender
+from pid import TrainSpeedController
+from adaptive import AdaptiveStepper, DEFAULT_POSITION_TOLERANCE, DEFAULT_SPEED_TOLERANCE
+
+logger = logging.getLogger(__name__)
+
+# 驾驶策略返回该值表示惰行至下一个事件：宏步模式下按惰行解析解一次推进到
+# 下一个事件之前（期间不再调用驾驶策略），否则与返回None相同
+COAST_PHASE = object()
+
+# 轨迹记录的字段（与TrainSimulation.get_status的键一致）
+TRAJECTORY_FIELDS = (
+    'time', 'position', 'speed', 'acceleration',
+    'status', 'target_speed', 'ceiling_speed'
+)
+
+class CsvSink:
+    """CSV输出端，将每一步的仿真状态写入文件"""
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(TRAJECTORY_FIELDS)
+
+    def write(self, status):
+        self.writer.writerow([status[field] for field in TRAJECTORY_FIELDS])
+
+    def close(self):
+        self.file.close()
+
+class TrajectoryRecorder:
+    """轨迹记录器，按字段累积仿真状态，结束时转换为NumPy数组"""
+    def __init__(self):
+        self.columns = {field: [] for field in TRAJECTORY_FIELDS}
+
+    def write(self, status):
+        for field in TRAJECTORY_FIELDS:
+            self.columns[field].append(status[field])
+
+    def close(self):
+        pass
+
+    def to_arrays(self):
+        """返回 {字段: ndarray} 形式的轨迹"""
+        return {field: np.asarray(values) for field, values in self.columns.items()}
+
+class HeadlessRunner:
+    """
+    无头仿真运行器
+
+    不创建Qt事件循环与TCP发送器，在一个紧凑循环中驱动TrainSimulation.update，
+    以CPU允许的最快速度完成整条线路的仿真。
+
+    参数:
+        simulation: 仿真对象，为None时创建一个不发送数据、不写日志的TrainSimulation
+        controller: 速度控制器，为None时使用TrainSpeedController（自动驾驶）
+        driver: 驾驶策略回调 driver(simulation, dt) -> control_acc，
+                指定后代替controller；返回None表示按当前工况（牵引/制动/惰行）运行，
+                惰行工况下返回COAST_PHASE表示惰行至下一个事件
+        dt: 仿真步长(秒)；自适应步长时为最小步长
+        sinks: 输出端列表，每个对象需提供write(status)与close()
+        max_time: 最长仿真时间(秒)
+        data_dir: 数据文件目录
+        adaptive: 是否使用自适应步长积分（见adaptive.AdaptiveStepper）
+        dt_max: 自适应步长的最大步长(秒)
+        position_tolerance, speed_tolerance: 自适应步长的单步局部误差容限(m, m/s)，
+                    整条轨迹的偏差见adaptive.trajectory_deviation
+        macro_step: 是否以宏步跳过停站、紧急制动罚时以及驾驶策略返回COAST_PHASE
+                    的惰行阶段（见TrainSimulation.macro_step，仅固定步长时跳过惰行）
+        emit_every: 宏步内每隔多少步输出一条记录，1表示与逐步推进相同
+    """
+    def __init__(
+        self,
+        simulation=None,
+        controller=None,
+        driver=None,
+        dt=0.1,
+        sinks=(),
+        max_time=3600.0,
+        data_dir='.',
+        adaptive=False,
+        dt_max=5.0,
+        position_tolerance=DEFAULT_POSITION_TOLERANCE,
+        speed_tolerance=DEFAULT_SPEED_TOLERANCE,
+        macro_step=False,
+        emit_every=1
+    ):
+        if simulation is None:
+            simulation = TrainSimulation(
+                data_sender=NullDataSender(),
+                data_dir=data_dir,
+                log_to_file=False
+            )
+        self.simulation = simulation
+        self.controller = controller if controller is not None else TrainSpeedController()
+        self.driver = driver
+        self.dt = dt
+        self.sinks = list(sinks)
+        self.max_time = max_time
+        self.macro_step = macro_step
+        self.emit_every = emit_every
+        self.stepper = None
+        if adaptive:
+            self.stepper = AdaptiveStepper(
+                self.simulation,
+                control_fn=self.compute_control,
+                controller=self.controller if driver is None else None,
+                dt_min=dt,
+                dt_max=dt_max,
+                position_tolerance=position_tolerance,
+                speed_tolerance=speed_tolerance
+            )
+
+    def snapshot(self):
+        """保存仿真与控制器的当前状态（见snapshot.SimulationSnapshot）"""
+        return self.simulation.snapshot(self.controller)
+
+    def restore(self, snapshot):
+        """恢复到快照保存的状态，之后以run(reset=False)继续运行"""
+        self.simulation.restore(snapshot, self.controller)
+
+    def fork(self, snapshot=None, **params):
+        """
+        派生一个从快照继续运行的独立运行器
+
+        新运行器使用派生的仿真对象（TrainSimulation.fork）与新的控制器，
+        控制器状态取自快照；输出端不继承。
+
+        参数:
+            snapshot: 快照，为None时取当前状态
+            params: 覆盖本运行器的构造参数，如driver、controller、max_time
+        返回:
+            HeadlessRunner，以run(reset=False)从快照处继续运行
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        options = {
+            'driver': self.driver,
+            'dt': self.dt,
+            'max_time': self.max_time,
+            'adaptive': self.stepper is not None,
+            'macro_step': self.macro_step,
+            'emit_every': self.emit_every,
+        }
+        if self.stepper is not None:
+            options.update(
+                dt_max=self.stepper.dt_max,
+                position_tolerance=self.stepper.position_tolerance,
+                speed_tolerance=self.stepper.speed_tolerance
+            )
+        options.update(params)
+        if options.get('controller') is None:
+            options['controller'] = TrainSpeedController()
+        runner = HeadlessRunner(simulation=self.simulation.fork(snapshot), **options)
+        if snapshot.controller is not None:
+            runner.controller.set_state(snapshot.controller)
+        return runner
+
+    def compute_control(self, dt=None):
+        """计算当前步的控制加速度"""
+        control_acc = self._control(dt)
+        return None if control_acc is COAST_PHASE else control_acc
+
+    def _control(self, dt=None):
+        """驾驶策略或控制器的原始输出（可能为COAST_PHASE）"""
+        if dt is None:
+            dt = self.dt
+        if self.driver is not None:
+            return self.driver(self.simulation, dt)
+        return self.controller.compute_control(
+            self.simulation.get_target_speed(),
+            self.simulation.speed * 3.6,
+            dt
+        )
+
+    def step(self):
+        """推进一步（固定步长或自适应步长）"""
+        if self.stepper is not None:
+            return self.stepper.step()
+        return self.simulation.update(self.dt, self.compute_control())
+
+    def run(self, reset=True):
+        """
+        运行仿真直至到达终点或超过最长仿真时间
+
+        参数:
+            reset: 是否在运行前重置仿真与控制器状态
+
+        返回:
+            result: 包含轨迹数组、到站时间、停车位置及运行统计的字典
+        """
+        sim = self.simulation
+        if reset:
+            sim.reset()
+            self.controller.reset()
+            if self.stepper is not None:
+                self.stepper.reset()
+
+        recorder = TrajectoryRecorder()
+        sinks = [recorder] + self.sinks
+        finished = False
+        steps = 0
+        start = time.perf_counter()
+
+        try:
+            while sim.time < self.max_time:
+                if self.macro_step:
+                    # 停站与罚时：控制器仍按步计算以保持其状态
+                    count, results = sim.macro_step(
+                        self.dt,
+                        control_fn=self.compute_control,
+                        end_time=self.max_time,
+                        emit_every=self.emit_every
+                    )
+                    if count == 0 and self.stepper is None:
+                        control_acc = self._control()
+                        if control_acc is COAST_PHASE:
+                            # 驾驶策略要求惰行至下一个事件：按解析解一次推进
+                            count, results = sim.macro_step(
+                                self.dt,
+                                end_time=self.max_time,
+                                emit_every=self.emit_every
+                            )
+                            control_acc = None
+                        if count == 0:
+                            results = [sim.update(self.dt, control_acc)]
+                            count = 1
+                    if count:
+                        steps += count
+                        for result in results:
+                            if "error" in result:
+                                raise RuntimeError(result["error"])
+                            for sink in sinks:
+                                sink.write(result)
+                        if results and results[-1].get("message", "").startswith("仿真结束"):
+                            finished = True
+                            break
+                        continue
+
+                result = self.step()
+                if "error" in result:
+                    raise RuntimeError(result["error"])
+                steps += 1
+
+                for sink in sinks:
+                    sink.write(result)
+
+                if result.get("message", "").startswith("仿真结束"):
+                    finished = True
+                    break
+        finally:
+            sim.flush_log()
+            for sink in self.sinks:
+                sink.close()
+
+        wall_time = time.perf_counter() - start
+        logger.info(
+            f"无头仿真完成: {steps}步, 仿真时间{sim.time:.1f}s, "
+            f"耗时{wall_time:.3f}s, {'到达终点' if finished else '未到达终点'}"
+        )
+
+        return {
+            "trajectory": recorder.to_arrays(),
+            "actual_time": list(sim.actual_time),
+            "number_1": list(sim.number_1),
+            "actual_position": list(sim.actual_position),
+            "number_2": list(sim.number_2),
+            "atp_trigger_time": list(sim.atp_trigger_time),
+            "atp_trigger_position": list(sim.atp_trigger_position),
+            "finished": finished,
+            "steps": steps,
+            "wall_time": wall_time,
+        }
+
+def run_headless(**kwargs):
+    """以库函数方式运行一次无头仿真，参数同HeadlessRunner，返回HeadlessRunner.run的结果"""
+    return HeadlessRunner(**kwargs).run()
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="列车无头仿真运行器")
+    parser.add_argument('--dt', type=float, default=0.1, help="仿真步长(秒)，自适应步长时为最小步长")
+    parser.add_argument('--adaptive', action='store_true', help="使用自适应步长积分")
+    parser.add_argument('--dt-max', type=float, default=5.0, help="自适应步长的最大步长(秒)")
+    parser.add_argument('--position-tolerance', type=float, default=DEFAULT_POSITION_TOLERANCE,
+                        help="自适应步长的单步位置误差容限(m)，不是整条轨迹的误差界")
+    parser.add_argument('--speed-tolerance', type=float, default=DEFAULT_SPEED_TOLERANCE,
+                        help="自适应步长的单步速度误差容限(m/s)，不是整条轨迹的误差界")
+    parser.add_argument('--macro-step', action='store_true', help="以宏步跳过停站与紧急制动罚时（自动驾驶不产生纯惰行阶段）")
+    parser.add_argument('--emit-every', type=int, default=1, help="宏步内每隔多少步输出一条记录")
+    parser.add_argument('--max-time', type=float, default=3600.0, help="最长仿真时间(秒)")
+    parser.add_argument('--data-dir', default='.', help="数据文件目录")
+    parser.add_argument('--csv', help="将轨迹写入指定CSV文件")
+    parser.add_argument('--log', action='store_true', help="同时生成logs目录下的仿真日志")
+    parser.add_argument('--log-format', choices=['csv', 'columnar'], default='csv',
+                        help="仿真日志格式：文本CSV或列式二进制轨迹日志(.trj)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    simulation = TrainSimulation(
+        data_sender=NullDataSender(),
+        data_dir=args.data_dir,
+        log_to_file=args.log,
+        log_format=args.log_format
+    )
+    sinks = [CsvSink(args.csv)] if args.csv else []
+    result = HeadlessRunner(
+        simulation=simulation,
+        dt=args.dt,
+        sinks=sinks,
+        max_time=args.max_time,
+        adaptive=args.adaptive,
+        dt_max=args.dt_max,
+        position_tolerance=args.position_tolerance,
+        speed_tolerance=args.speed_tolerance,
+        macro_step=args.macro_step,
+        emit_every=args.emit_every
+    ).run()
+    simulation.cleanup()
+
+    steps = result["steps"]
+    wall_time = result["wall_time"]
+    print(f"仿真步数: {steps}")
+    print(f"仿真时间: {simulation.time:.1f} s")
+    print(f"运行耗时: {wall_time:.3f} s ({steps / max(wall_time, 1e-9):.0f} 步/秒)")
+    print(f"到站时间: {result['actual_time']}")
+    print(f"停车位置: {result['actual_position']}")
+    print(f"是否到达终点: {'是' if result['finished'] else '否'}")
+    return 0 if result["finished"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# log_writer.py
+import atexit
+import csv
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 仿真日志CSV表头（与TrainSimulation.init_log_file写入的表头一致）
+LOG_COLUMNS = [
+    'Simulation Time (s)', 'Position (m)', 'Speed (km/h)',
+    'Total Acceleration (m/s^2)', 'Traction Acceleration (m/s^2)',
+    'Braking Acceleration (m/s^2))', 'Resistance Acceleration (m/s^2))',
+    'Operating Condition', 'Target Speed (km/h)', 'Ceiling Speed (km/h)'
+]
+
+def format_state_row(state):
+    """
+    将一条原始状态记录格式化为CSV行
+
+    参数:
+        state: (时间, 位置, 速度km/h, 总加速度, 牵引加速度, 制动加速度,
+                阻力加速度, 工况, 目标速度, 顶棚速度)
+    """
+    (sim_time, position, speed, acceleration, traction_acc, brake_acc,
+     resistance_acc, status, target_speed, ceiling_speed) = state
+    return [
+        f"{sim_time:.1f}",
+        f"{position:.4f}",
+        f"{speed:.2f}",
+        f"{acceleration:.4f}",
+        f"{traction_acc:.4f}",
+        f"{brake_acc:.4f}",
+        f"{resistance_acc:.4f}",
+        status,
+        f"{target_speed:.2f}",
+        f"{ceiling_speed:.2f}"
+    ]
+
+class BufferedLogWriter:
+    """
+    缓冲式后台日志写入器
+
+    仿真线程只把原始状态记录追加到内存缓冲区，格式化与文件写入由后台线程完成。
+    缓冲行数达到flush_rows或距上次写入超过flush_interval秒时写入文件。
+    flush()在调用线程中同步写出全部缓冲内容，close()写出剩余内容并关闭文件。
+
+    参数:
+        filename: 日志文件路径（以追加方式打开）
+        encoding: 文件编码
+        flush_rows: 触发写入的缓冲行数
+        flush_interval: 最长写入间隔(秒)
+        formatter: 记录格式化函数，默认为format_state_row
+    """
+    def __init__(self, filename, encoding='gbk', flush_rows=500, flush_interval=1.0,
+                 formatter=format_state_row):
+        self.filename = filename
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.formatter = formatter
+
+        self._file = open(filename, 'a', newline='', encoding=encoding)
+        self._writer = csv.writer(self._file)
+        self._rows = []
+        self._closed = False
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # 保证后台写入与同步flush不交错
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write_row(self, state):
+        """追加一条原始状态记录"""
+        with self._cond:
+            if self._closed:
+                return
+            self._rows.append(state)
+            if len(self._rows) >= self.flush_rows:
+                self._cond.notify()
+
+    def flush(self):
+        """同步写出全部缓冲记录"""
+        with self._io_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+            self._write(rows)
+
+    def close(self):
+        """写出剩余记录，停止后台线程并关闭文件"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+        with self._io_lock:
+            self._file.close()
+        atexit.unregister(self.close)
+        logger.info(f"日志文件已关闭: {self.filename}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._rows) < self.flush_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            # 取出与写入在_io_lock内完成，避免与同步flush交错导致记录乱序
+            with self._io_lock:
+                with self._cond:
+                    rows, self._rows = self._rows, []
+                    closed = self._closed
+                self._write(rows)
+            if closed:
+                return
+
+    def _write(self, rows):
+        """写出记录，调用方需持有_io_lock"""
+        if self._file.closed:
+            return
+        try:
+            if rows:
+                self._writer.writerows(self.formatter(row) for row in rows)
+            self._file.flush()
+        except Exception as e:
+            logger.error(f"写入日志失败: {str(e)}")
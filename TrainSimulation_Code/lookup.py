@@ -0,0 +1,153 @@
+# lookup.py
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class UniformGridTable:
+    """
+    均匀网格查找表
+
+    将分段线性曲线预先采样到等间距网格上，查询时直接计算下标并线性插值，
+    代替每次调用scipy interp1d的数组封装与类型转换。超出定义域时取端点值，
+    与interp1d(fill_value=(首值, 末值))的行为一致。
+
+    参数:
+        x0: 网格起点
+        step: 网格间距
+        values: 各网格点上的曲线值
+        points: 原始曲线折点 (x, y)，用于误差校验时在折点附近加密采样
+    """
+    def __init__(self, x0, step, values, points=None):
+        self.x0 = float(x0)
+        self.step = float(step)
+        self.inv_step = 1.0 / self.step
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.last_index = len(self.values) - 1
+        self.x1 = self.x0 + self.last_index * self.step
+        self.points = points
+
+        # 标量查询使用Python列表，避免逐元素取出NumPy标量的开销
+        self._values = self.values.tolist()
+        self._first = self._values[0]
+        self._last = self._values[-1]
+
+    @classmethod
+    def from_points(cls, x, y, resolution):
+        """
+        由分段线性曲线的折点构建查找表
+
+        参数:
+            x: 折点横坐标
+            y: 折点纵坐标
+            resolution: 网格间距上限，实际间距为将定义域等分后不超过该值的最大间距
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+
+        span = x[-1] - x[0]
+        n_cells = max(1, math.ceil(span / resolution))
+        step = span / n_cells if span > 0 else 1.0
+        grid = x[0] + np.arange(n_cells + 1) * step
+        return cls(x[0], step, np.interp(grid, x, y), points=(x, y))
+
+    def __call__(self, x):
+        """标量查询"""
+        u = (x - self.x0) * self.inv_step
+        if u <= 0:
+            return self._first
+        if u >= self.last_index:
+            return self._last
+        i = int(u)
+        values = self._values
+        lower = values[i]
+        return lower + (values[i + 1] - lower) * (u - i)
+
+    def lookup_array(self, x):
+        """数组查询"""
+        u = np.clip((np.asarray(x, dtype=float) - self.x0) * self.inv_step, 0, self.last_index)
+        values = self.values
+        if self.last_index == 0:
+            return np.full(u.shape, values[0])
+        i = np.minimum(u.astype(np.int64), self.last_index - 1)
+        lower = values[i]
+        return lower + (values[i + 1] - lower) * (u - i)
+
+    def validate(self, reference, n_samples=100000):
+        """
+        与参考插值函数对比，统计查找表误差
+
+        采样点包括均匀随机点、所有折点及折点附近的点（误差只出现在含折点的网格内）。
+
+        参数:
+            reference: 参考函数，接受数组返回数组（如scipy interp1d对象）
+            n_samples: 均匀随机采样点数
+
+        返回:
+            report: 包含最大/平均/均方根误差及网格信息的字典
+        """
+        rng = np.random.default_rng(0)
+        samples = [rng.uniform(self.x0, self.x1, n_samples)]
+        if self.points is not None:
+            x = self.points[0]
+            offset = self.step * 0.5
+            samples.extend([x, x - offset, x + offset])
+        samples = np.concatenate(samples)
+
+        error = np.abs(self.lookup_array(samples) - np.asarray(reference(samples), dtype=float))
+        worst = int(np.argmax(error))
+        return {
+            "grid_points": len(self.values),
+            "step": self.step,
+            "samples": len(samples),
+            "max_abs_error": float(error[worst]),
+            "max_error_at": float(samples[worst]),
+            "mean_abs_error": float(error.mean()),
+            "rms_error": float(np.sqrt(np.mean(error ** 2))),
+        }
+
+def build_table(x, y, resolution, reference=None, tolerance=None, max_points=2_000_000):
+    """
+    构建查找表，若给定误差容限则逐步加密网格直至满足要求
+
+    参数:
+        x, y: 曲线折点
+        resolution: 初始网格间距
+        reference: 参考插值函数，tolerance不为None时必须提供
+        tolerance: 最大绝对误差容限
+        max_points: 网格点数上限
+
+    返回:
+        table: UniformGridTable
+    """
+    table = UniformGridTable.from_points(x, y, resolution)
+    if tolerance is None:
+        return table
+
+    while True:
+        report = table.validate(reference)
+        if report["max_abs_error"] <= tolerance:
+            return table
+        if len(table.values) * 2 > max_points:
+            logger.warning(
+                f"查找表误差{report['max_abs_error']:.3g}超过容限{tolerance:.3g}，"
+                f"已达到网格点数上限{max_points}"
+            )
+            return table
+        resolution = table.step / 2
+        table = UniformGridTable.from_points(x, y, resolution)
+
+def format_validation_report(reports):
+    """将各查找表的校验结果格式化为文本报告"""
+    lines = ["查找表误差校验报告", "=" * 50]
+    for name, report in reports.items():
+        lines.append(
+            f"{name}: 网格点数 {report['grid_points']}, 间距 {report['step']:.4g}, "
+            f"最大误差 {report['max_abs_error']:.3e} (x={report['max_error_at']:.4f}), "
+            f"平均误差 {report['mean_abs_error']:.3e}, 均方根误差 {report['rms_error']:.3e}"
+        )
+    return "\n".join(lines)
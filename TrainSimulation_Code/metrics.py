@@ -0,0 +1,47 @@
+# metrics.py
+class EvaluationMetrics:
+    """评价指标计算类"""
+    @staticmethod
+    def calculate_overshoot(actual_speed, target_speed):
+        """计算超调量"""
+        if target_speed == 0:
+            return 0
+        overshoot = max(0, (actual_speed - target_speed) / target_speed * 100)
+        return overshoot
+
+    @staticmethod
+    def calculate_comfort_level(acceleration):
+        """计算舒适度"""
+        abs_acc = abs(acceleration)
+        if abs_acc <= 0.28:
+            return 1, "极舒适"
+        elif abs_acc <= 1.23:
+            return 2, "舒适"
+        elif abs_acc <= 2.12:
+            return 3, "不舒适"
+        else:
+            return 4, "无法忍受"
+
+    @staticmethod
+    def calculate_punctuality(actual_time, number):
+        """计算准点率"""
+        if number == 1:
+            if abs(actual_time-98.2) <= 5:
+                in_time = 1
+            else:
+                in_time = 0
+        else:
+            if abs(actual_time-228.6) <= 5:
+                in_time = 1
+            else:
+                in_time = 0
+        return in_time
+
+    @staticmethod
+    def calculate_stopping_error(actual_position, number):
+        """计算停车误差"""
+        if number == 1:
+            stopping_error = abs(actual_position-22878.32)
+        else:
+            stopping_error = abs(actual_position-24275.31)
+        return stopping_error
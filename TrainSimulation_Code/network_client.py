@@ -1,16 +1,70 @@
 # network_client.py
 from PyQt5.QtNetwork import QTcpSocket
 from PyQt5.QtCore import QTimer
-import json
+from collections import deque
 import logging
+import time
+
+from telemetry_protocol import (ENCODING_BINARY, COUNTERS_FIELDS, RECORD_COUNTERS, RECORD_STATE,
+                                encode_counters, encode_state)
 
 logger = logging.getLogger(__name__)
 
+# 发送队列溢出策略
+DROP_OLDEST = 'drop_oldest'   # 丢弃最早的记录
+LATEST_ONLY = 'latest_only'   # 队列中只保留最新的列车状态
+BLOCK = 'block'               # 最多等待block_timeout毫秒，仍无法发送时丢弃最早的记录
+OVERFLOW_POLICIES = (DROP_OLDEST, LATEST_ONLY, BLOCK)
+
 class SimulationDataSender:
-    """仿真数据发送器，负责通过TCP发送仿真数据到评价系统"""
-    def __init__(self, host='localhost', port=5000):
+    """
+    仿真数据发送器，负责通过TCP发送仿真数据到评价系统
+
+    数据按telemetry_protocol分帧发送，encoding可选ENCODING_JSON以便调试。
+
+    一个仿真步内多次调用send_data只保留最后的列车状态，到站时间与停车位置记录
+    仅在变化时发送；commit_step()把本步合并后的记录加入待发送队列。
+    publish_rate为None时每步提交后立即发送，否则按该频率(Hz)定时把队列中的
+    全部记录合并为一次socket写入。
+
+    待发送队列最多保存queue_size条记录，socket中未发出的数据超过max_bytes_pending
+    字节时暂停写入，由overflow_policy决定队列满时的处理方式，评价系统卡顿时
+    仿真系统的内存占用与单步耗时都有上限。
+
+    参数:
+        host, port: 评价系统地址
+        encoding: 负载编码
+        publish_rate: 发送频率(Hz)，None表示每个仿真步发送
+        queue_size: 待发送队列的最大记录数
+        overflow_policy: 队列溢出策略，见OVERFLOW_POLICIES
+        block_timeout: BLOCK策略的最长等待时间(毫秒)
+        max_bytes_pending: socket缓冲区中允许积压的最大字节数
+    """
+    def __init__(self, host='localhost', port=5000, encoding=ENCODING_BINARY, publish_rate=None,
+                 queue_size=1000, overflow_policy=DROP_OLDEST, block_timeout=20,
+                 max_bytes_pending=256 * 1024):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的队列溢出策略: {overflow_policy}")
         self.host = host
         self.port = port
+        self.encoding = encoding
+        self.publish_rate = publish_rate
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.max_bytes_pending = max_bytes_pending
+
+        # 本步暂存的记录与待发送队列 [(记录类型, 数据帧)]
+        self.step_state = None
+        self.step_counters = None
+        self.last_counters = None
+        self.pending_frames = deque()
+        self.backlogged = False
+
+        # 发送统计
+        self.sent_records = 0
+        self.dropped_records = 0
+        self.writes = 0
         self.socket = QTcpSocket()
         self.connected = False
         
@@ -18,11 +72,16 @@ class SimulationDataSender:
         self.socket.connected.connect(self.handle_connected)
         self.socket.disconnected.connect(self.handle_disconnected)
         self.socket.error.connect(self.handle_error)
+        self.socket.bytesWritten.connect(self.handle_bytes_written)
         
         # 创建重连定时器
         self.reconnect_timer = QTimer()
         self.reconnect_timer.timeout.connect(self.try_connect)
         self.reconnect_timer.setInterval(5000)  # 5秒重连间隔（单位：毫秒）
+
+        # 创建定时发送定时器
+        self.publish_timer = QTimer()
+        self.publish_timer.timeout.connect(self.flush)
         
         logger.info("数据发送器初始化完成")
         
@@ -36,12 +95,24 @@ class SimulationDataSender:
         """启动数据发送器"""
         self.try_connect()
         self.reconnect_timer.start()
+        self.set_publish_rate(self.publish_rate)
         logger.info("数据发送器已启动")
+
+    def set_publish_rate(self, publish_rate):
+        """设置发送频率(Hz)，None表示每个仿真步发送一次"""
+        self.publish_rate = publish_rate
+        if publish_rate:
+            self.publish_timer.start(max(1, int(round(1000 / publish_rate))))
+        else:
+            self.publish_timer.stop()
+            self.flush()
         
     def stop(self):
         """停止数据发送器"""
         self.reconnect_timer.stop()
+        self.publish_timer.stop()
         if self.connected:
+            self.flush()
             self.socket.disconnectFromHost()
         logger.info("数据发送器已停止")
         
@@ -49,12 +120,18 @@ class SimulationDataSender:
         """处理连接成功事件"""
         self.connected = True
         self.reconnect_timer.stop()
+        # 新连接的评价系统需要重新接收完整的到站记录
+        self.last_counters = None
         logger.info("已连接到评价系统")
         
     def handle_disconnected(self):
         """处理断开连接事件"""
         self.connected = False
         self.reconnect_timer.start()
+        # 连接断开后队列中的记录已无法送达
+        self.dropped_records += len(self.pending_frames)
+        self.pending_frames.clear()
+        self.backlogged = False
         logger.info("与评价系统的连接已断开，将尝试重新连接")
         
     def handle_error(self, socket_error):
@@ -62,28 +139,107 @@ class SimulationDataSender:
         logger.error(f"网络连接错误: {self.socket.errorString()}")
         
     def send_data(self, simulation_data):
-        """发送仿真数据"""
+        """暂存本步的仿真数据（列车状态或到站时间与停车位置记录）"""
+        if 'time' in simulation_data:
+            self.step_state = simulation_data
+        elif 'actual_time' in simulation_data:
+            self.step_counters = simulation_data
+
+    def commit_step(self):
+        """结束一个仿真步：把本步合并后的记录打包加入待发送队列"""
+        state, self.step_state = self.step_state, None
+        counters, self.step_counters = self.step_counters, None
+        if not self.connected:
+            return
+
         try:
-            if not self.connected:
-                return
-                
-            # 构造要发送的数据
-            data = {
-                'time': simulation_data['time'],
-                'position': simulation_data['position'],
-                'speed': simulation_data['speed'],
-                'acceleration': simulation_data['acceleration'],
-                'target_speed': simulation_data.get('target_speed', 0),
-                'ceiling_speed': simulation_data.get('ceiling_speed', 0),
-                'status': simulation_data['status']
-            }
-            
-            # 转换为JSON字符串
-            json_data = json.dumps(data)
-            
-            
-            # 发送数据
-            self.socket.write(json_data.encode())
-            
+            if counters is not None:
+                # 仿真对象原地追加列表，需保存副本用于比较
+                snapshot = tuple(tuple(counters[field]) for field, _ in COUNTERS_FIELDS)
+                if snapshot != self.last_counters:
+                    self.last_counters = snapshot
+                    self.enqueue(RECORD_COUNTERS, encode_counters(counters, self.encoding))
+            if state is not None:
+                self.enqueue(RECORD_STATE, encode_state(state, self.encoding))
         except Exception as e:
-            logger.error(f"发送数据失败: {str(e)}")
\ No newline at end of file
+            logger.error(f"打包数据失败: {str(e)}")
+
+        if not self.publish_rate:
+            self.flush()
+
+    def enqueue(self, record_type, frame):
+        """按溢出策略把一条记录加入待发送队列"""
+        if self.overflow_policy == LATEST_ONLY and record_type == RECORD_STATE:
+            # 新状态取代队列中尚未发出的旧状态
+            stale = sum(1 for queued_type, _ in self.pending_frames if queued_type == RECORD_STATE)
+            if stale:
+                self.pending_frames = deque(item for item in self.pending_frames if item[0] != RECORD_STATE)
+                self._drop(stale)
+
+        if len(self.pending_frames) >= self.queue_size and self.overflow_policy == BLOCK:
+            self.flush(wait=True)
+        while len(self.pending_frames) >= self.queue_size:
+            dropped_type, _ = self.pending_frames.popleft()
+            if dropped_type == RECORD_COUNTERS:
+                # 丢弃的到站记录在下一步重新发送
+                self.last_counters = None
+            self._drop(1)
+        self.pending_frames.append((record_type, frame))
+
+    def flush(self, wait=None):
+        """
+        把待发送队列合并为一次写入
+
+        socket中积压的数据超过max_bytes_pending时只写出允许的部分，其余记录留在队列中，
+        待socket发出数据后继续发送。BLOCK策略下先最多等待block_timeout毫秒。
+        """
+        if not self.pending_frames or not self.connected:
+            return
+        if wait is None:
+            wait = self.overflow_policy == BLOCK
+
+        budget = self.max_bytes_pending - self.socket.bytesToWrite()
+        if budget <= 0 and wait:
+            deadline = time.monotonic() + self.block_timeout / 1000
+            while budget <= 0:
+                remaining = int((deadline - time.monotonic()) * 1000)
+                if remaining <= 0 or not self.socket.waitForBytesWritten(remaining):
+                    break
+                budget = self.max_bytes_pending - self.socket.bytesToWrite()
+
+        frames = []
+        while self.pending_frames and budget > 0:
+            _, frame = self.pending_frames.popleft()
+            frames.append(frame)
+            budget -= len(frame)
+        self.backlogged = bool(self.pending_frames)
+        if not frames:
+            return
+
+        try:
+            self.socket.write(b''.join(frames))
+            self.writes += 1
+            self.sent_records += len(frames)
+        except Exception as e:
+            logger.error(f"发送数据失败: {str(e)}")
+
+    def handle_bytes_written(self, nbytes):
+        """socket发出数据后继续发送积压的记录"""
+        if self.backlogged and self.socket.bytesToWrite() < self.max_bytes_pending:
+            self.flush(wait=False)
+
+    def _drop(self, count):
+        if self.dropped_records == 0 or (self.dropped_records + count) // 1000 > self.dropped_records // 1000:
+            logger.warning(f"评价系统接收过慢，已丢弃{self.dropped_records + count}条记录")
+        self.dropped_records += count
+
+    def stats(self):
+        """发送统计：队列深度、丢弃记录数与积压字节数"""
+        return {
+            "queue_depth": len(self.pending_frames),
+            "queued_bytes": sum(len(frame) for _, frame in self.pending_frames),
+            "bytes_pending": self.socket.bytesToWrite(),
+            "dropped_records": self.dropped_records,
+            "sent_records": self.sent_records,
+            "writes": self.writes,
+        }
\ No newline at end of file
@@ -0,0 +1,299 @@
+# offline_evaluation.py
+"""
+离线评价计算（不依赖Qt）
+
+按工况的游程（连续相同工况的行段）对日志进行分段，所有指标以NumPy向量运算完成。
+日志可以分块流式读入，跨块的游程与统计量保存在OfflineEvaluator中，内存占用只与
+块大小有关。计算结果与EvaluationSystem原有的逐行评价逻辑一致。
+"""
+import logging
+
+import numpy as np
+
+from conditions import STATION_STOP
+from route_data import load_sheet
+from trajectory_log import TrajectoryLog
+
+logger = logging.getLogger(__name__)
+
+# 评价所用的日志列：键名 -> CSV表头
+EVALUATION_COLUMNS = {
+    'time': 'Simulation Time (s)',
+    'position': 'Position (m)',
+    'speed': 'Speed (km/h)',
+    'acceleration': 'Total Acceleration (m/s^2)',
+    'condition': 'Operating Condition',
+    'target_speed': 'Target Speed (km/h)',
+}
+
+# 舒适度阈值(m/s^2)：极舒适上限与舒适上限
+EXTREME_COMFORT_ACC = 0.28
+COMFORT_ACC = 1.23
+
+# 准点判定的允许偏差(秒)
+ON_TIME_TOLERANCE = 60
+
+# 时间表中不计入目标停车位置的位置(m)
+EXCLUDED_TARGET_STOP_POSITION = 22880.2255
+
+# 默认分块行数
+DEFAULT_CHUNK_ROWS = 65536
+
+def condition_runs(conditions):
+    """
+    工况序列的游程分段
+
+    参数:
+        conditions: 工况数组
+
+    返回:
+        (starts, ends, values): 各游程的起止行号（含）与工况
+    """
+    conditions = np.asarray(conditions)
+    if len(conditions) == 0:
+        empty = np.empty(0, dtype=int)
+        return empty, empty, conditions[:0]
+    changes = np.flatnonzero(conditions[1:] != conditions[:-1]) + 1
+    starts = np.concatenate(([0], changes))
+    ends = np.concatenate((changes - 1, [len(conditions) - 1]))
+    return starts, ends, conditions[starts]
+
+def _ordered_unique(values):
+    """按首次出现顺序去重"""
+    if len(values) == 0:
+        return values
+    _, first = np.unique(values, return_index=True)
+    return values[np.sort(first)]
+
+def schedule_stops(schedule):
+    """
+    时间表（列车目标速度曲线）中的目标到发时间与目标停车位置
+
+    参数:
+        schedule: {'time', 'position', 'speed'} 数组字典，见route_data.load_sheet('target_speed')
+
+    返回:
+        (target_stop_time, target_stop_position)
+    """
+    time = np.asarray(schedule['time'], dtype=float)
+    position = np.asarray(schedule['position'], dtype=float)
+    speed = np.asarray(schedule['speed'], dtype=float)
+
+    # 速度为0且与前一行或后一行速度不同的行（首末行除外）为到发时刻
+    stopped = speed == 0
+    inner = np.zeros(len(speed), dtype=bool)
+    if len(speed) > 2:
+        inner[1:-1] = stopped[1:-1] & ((speed[1:-1] != speed[:-2]) | (speed[1:-1] != speed[2:]))
+    target_stop_time = time[inner].tolist()
+
+    stop_position = position[stopped & (position != EXCLUDED_TARGET_STOP_POSITION)]
+    target_stop_position = _ordered_unique(stop_position).tolist()
+    return target_stop_time, target_stop_position
+
+class OfflineEvaluator:
+    """
+    流式离线评价器
+
+    依次调用update()送入日志各块，最后调用result()得到评价结果字典。
+
+    参数:
+        schedule: 时间表数组字典，见schedule_stops
+    """
+    def __init__(self, schedule):
+        self.target_stop_time, self.target_stop_position = schedule_stops(schedule)
+
+        self.n_rows = 0
+        # 运行中（非停站）行的统计量
+        self.on_rail_rows = 0
+        self.deviation_sum = 0.0
+        self.extreme_comfort_rows = 0
+        self.comfort_rows = 0
+        self.uncomfortable_rows = 0
+        # 停站游程的边界时刻与停车位置
+        self.stop_times = []
+        self.stop_positions = []
+        self._seen_positions = set()
+        # 跨块未结束的游程：(工况, 起始行号, 起始时间)
+        self._open_run = None
+
+    def update(self, chunk):
+        """
+        送入一块日志数据
+
+        参数:
+            chunk: 以EVALUATION_COLUMNS键名索引的数组字典
+        """
+        conditions = np.asarray(chunk['condition'], dtype=object)
+        n = len(conditions)
+        if n == 0:
+            return
+        time = np.asarray(chunk['time'], dtype=float)
+        position = np.asarray(chunk['position'], dtype=float)
+        stopped = conditions == STATION_STOP
+
+        self._update_on_rail(
+            np.asarray(chunk['speed'], dtype=float)[~stopped],
+            np.asarray(chunk['target_speed'], dtype=float)[~stopped],
+            np.asarray(chunk['acceleration'], dtype=float)[~stopped]
+        )
+        self._update_runs(conditions, time)
+        self._update_stop_positions(position[stopped])
+        self.n_rows += n
+
+    def _update_on_rail(self, speed, target_speed, acceleration):
+        self.on_rail_rows += len(speed)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.deviation_sum += float(np.sum(np.abs(speed - target_speed) / target_speed))
+        abs_acc = np.abs(acceleration)
+        self.extreme_comfort_rows += int(np.count_nonzero(abs_acc <= EXTREME_COMFORT_ACC))
+        self.comfort_rows += int(np.count_nonzero(abs_acc <= COMFORT_ACC))
+        self.uncomfortable_rows += int(np.count_nonzero(abs_acc > COMFORT_ACC))
+
+    def _update_runs(self, conditions, time):
+        offset = self.n_rows
+        starts, ends, values = condition_runs(conditions)
+        run_starts = (starts + offset).tolist()
+        run_start_times = time[starts].tolist()
+
+        if self._open_run is not None:
+            value, start, start_time = self._open_run
+            if values[0] == value:
+                # 上一块末尾的游程延续到本块
+                run_starts[0] = start
+                run_start_times[0] = start_time
+            else:
+                self._close_run(value, start, start_time, offset - 1, self._last_time)
+
+        # 除最后一个游程外，其余游程在本块内已结束
+        for k in np.flatnonzero(values[:-1] == STATION_STOP):
+            self._close_run(STATION_STOP, run_starts[k], run_start_times[k],
+                            int(ends[k]) + offset, float(time[ends[k]]))
+
+        self._open_run = (values[-1], run_starts[-1], run_start_times[-1])
+        self._last_time = float(time[-1])
+
+    def _close_run(self, value, start, start_time, end, end_time):
+        """已结束的停站游程：首行（非日志首行）与末行为到发时刻"""
+        if value != STATION_STOP:
+            return
+        if start > 0:
+            self.stop_times.append(start_time)
+        if end != start:
+            self.stop_times.append(end_time)
+
+    def _update_stop_positions(self, positions):
+        for value in _ordered_unique(positions).tolist():
+            if value not in self._seen_positions:
+                self._seen_positions.add(value)
+                self.stop_positions.append(value)
+
+    def _stop_times(self):
+        """全部到发时刻（含日志末尾未结束的停站游程，末行除外）"""
+        times = list(self.stop_times)
+        if self._open_run is not None:
+            value, start, start_time = self._open_run
+            if value == STATION_STOP and 0 < start < self.n_rows - 1:
+                times.append(start_time)
+        return times
+
+    def result(self):
+        """
+        评价结果
+
+        返回:
+            results: 与EvaluationSystem.display_evaluation_results所需格式一致的字典
+        """
+        results = {
+            # 列车运行平稳性指标
+            "与目标速度平均相对偏差": 0,
+            "极舒适时间占比": 0,
+            "舒适时间占比": 0,
+            "不舒适总时长": 0,
+
+            # 列车停站指标
+            "实际到发时间列表": [],
+            "目标到发时间列表": [],
+            "准点率": 0,
+            "目标停车位置": [],
+            "实际停车位置": [],
+            "是否完成所有停站任务": [],
+            "停车误差": [],
+            "平均停车误差": 0,
+        }
+
+        """ 与目标速度平均相对偏差与舒适度统计（分母为非停站行数） """
+        results["与目标速度平均相对偏差"] = self.deviation_sum / self.on_rail_rows
+        results["极舒适时间占比"] = 100 * self.extreme_comfort_rows / self.on_rail_rows
+        results["舒适时间占比"] = 100 * self.comfort_rows / self.on_rail_rows
+        results["不舒适总时长"] = self.uncomfortable_rows
+
+        """ 准点率 """
+        actual_stop_time = self._stop_times()
+        results["实际到发时间列表"] = actual_stop_time
+        results["目标到发时间列表"] = self.target_stop_time
+        if len(actual_stop_time) > len(self.target_stop_time):
+            raise IndexError("实际到发次数多于时间表中的到发次数")
+        deviation = np.abs(
+            np.asarray(actual_stop_time) - np.asarray(self.target_stop_time[:len(actual_stop_time)])
+        )
+        on_time_count = int(np.count_nonzero(deviation <= ON_TIME_TOLERANCE))
+        results["准点率"] = 100 * on_time_count / len(actual_stop_time)
+
+        """ 停车误差与平均停车误差 """
+        results["目标停车位置"] = self.target_stop_position
+        results["实际停车位置"] = self.stop_positions
+        if len(self.target_stop_position) != len(self.stop_positions):
+            results["是否完成所有停站任务"] = "未完成停站任务"
+        else:
+            results["是否完成所有停站任务"] = "完成停站任务"
+            errors = np.abs(np.asarray(self.target_stop_position) - np.asarray(self.stop_positions))
+            results["停车误差"] = errors.tolist()
+            results["平均停车误差"] = np.mean(results["停车误差"])
+
+        return results
+
+def iter_log_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, encoding='gb2312'):
+    """
+    分块读取CSV日志或列式轨迹日志（.trj）
+
+    返回:
+        生成器，每块为以EVALUATION_COLUMNS键名索引的数组字典
+    """
+    if path.lower().endswith('.trj'):
+        with TrajectoryLog(path) as log:
+            for chunk in log.iter_chunks():
+                columns = {key: chunk[key] for key in EVALUATION_COLUMNS}
+                columns['condition'] = log.decode_conditions(chunk['condition'])
+                yield columns
+        return
+
+    import pandas as pd
+    reader = pd.read_csv(
+        path,
+        encoding=encoding,
+        usecols=list(EVALUATION_COLUMNS.values()),
+        chunksize=chunk_rows
+    )
+    for frame in reader:
+        yield {key: frame[name].to_numpy() for key, name in EVALUATION_COLUMNS.items()}
+
+def evaluate_log(path, schedule=None, data_dir='.', chunk_rows=DEFAULT_CHUNK_ROWS, encoding='gb2312'):
+    """
+    评价一个仿真日志文件
+
+    参数:
+        path: CSV日志或.trj轨迹日志路径
+        schedule: 时间表数组字典，为None时从data_dir读取列车目标速度曲线
+        data_dir: 数据文件目录
+        chunk_rows: CSV日志每块读取的行数
+        encoding: CSV日志编码
+
+    返回:
+        results: 评价结果字典
+    """
+    if schedule is None:
+        schedule = load_sheet('target_speed', data_dir)
+    evaluator = OfflineEvaluator(schedule)
+    for chunk in iter_log_chunks(path, chunk_rows, encoding):
+        evaluator.update(chunk)
+    return evaluator.result()
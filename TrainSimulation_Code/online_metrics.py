@@ -0,0 +1,185 @@
+# online_metrics.py
+"""
+实时评价的增量指标
+
+OnlineMetrics对每条列车状态以常数时间更新累计指标与若干滑动时间窗口内的指标；
+StateRingBuffer以固定容量的环形缓冲区保存最近的列车状态，代替无限增长的历史列表。
+
+各样本的权重为与上一样本的仿真时间间隔，发送端降频或丢弃记录时
+舒适度时间占比与平均偏差仍按仿真时间计算。
+"""
+from collections import deque
+
+import numpy as np
+
+from conditions import ATP_EMERGENCY, CONDITION_CODES
+from metrics import EvaluationMetrics
+
+# 默认滑动窗口长度(秒)
+DEFAULT_WINDOWS = (60.0,)
+
+# 舒适度等级数（极舒适、舒适、不舒适、无法忍受）
+COMFORT_LEVELS = 4
+
+class _Accumulator:
+    """加权和统计量，支持加入与移出样本"""
+    def __init__(self):
+        self.samples = 0
+        self.duration = 0.0
+        self.deviation_sum = 0.0
+        self.deviation_weight = 0.0
+        self.comfort_time = [0.0] * COMFORT_LEVELS
+        self.atp_count = 0
+
+    def add(self, entry, sign=1):
+        _, weight, deviation, level, _, atp_trigger = entry
+        self.samples += sign
+        self.duration += sign * weight
+        if deviation is not None:
+            self.deviation_sum += sign * deviation * weight
+            self.deviation_weight += sign * weight
+        self.comfort_time[level - 1] += sign * weight
+        self.atp_count += sign * atp_trigger
+
+    def remove(self, entry):
+        self.add(entry, -1)
+
+    def result(self, max_overshoot):
+        duration = self.duration
+        return {
+            "samples": self.samples,
+            "duration": duration,
+            "mean_deviation_percent": (self.deviation_sum / self.deviation_weight
+                                       if self.deviation_weight > 1e-9 else 0.0),
+            "comfort_fractions": [100 * t / duration if duration > 1e-9 else 0.0
+                                  for t in self.comfort_time],
+            "max_overshoot": max_overshoot,
+            "atp_count": self.atp_count,
+        }
+
+class _RollingWindow:
+    """按仿真时间滑动的窗口，最大超调量用单调队列维护"""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.entries = deque()
+        self.maxima = deque()  # (时间, 超调量)，超调量单调递减
+        self.accumulator = _Accumulator()
+
+    def add(self, entry):
+        time, _, _, _, overshoot, _ = entry
+        self.entries.append(entry)
+        self.accumulator.add(entry)
+        while self.maxima and self.maxima[-1][1] <= overshoot:
+            self.maxima.pop()
+        self.maxima.append((time, overshoot))
+
+        start = time - self.seconds
+        while self.entries[0][0] <= start:
+            self.accumulator.remove(self.entries.popleft())
+        while self.maxima[0][0] <= start:
+            self.maxima.popleft()
+
+    def result(self):
+        return self.accumulator.result(self.maxima[0][1] if self.maxima else 0.0)
+
+class OnlineMetrics:
+    """
+    增量实时评价指标
+
+    参数:
+        windows: 滑动窗口长度(秒)列表
+    """
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.window_lengths = tuple(windows)
+        self.reset()
+
+    def reset(self):
+        """清空全部统计"""
+        self.cumulative_accumulator = _Accumulator()
+        self.max_overshoot = 0.0
+        self.windows = {seconds: _RollingWindow(seconds) for seconds in self.window_lengths}
+        self.last_time = None
+        self.last_status = None
+
+    def update(self, state):
+        """
+        加入一条列车状态
+
+        参数:
+            state: 含time, speed, target_speed, acceleration, status的字典
+        """
+        time = state['time']
+        if self.last_time is not None and time < self.last_time:
+            # 仿真时间回退说明仿真已重置，滑动窗口重新开始
+            self.windows = {seconds: _RollingWindow(seconds) for seconds in self.window_lengths}
+            self.last_time = None
+        weight = time - self.last_time if self.last_time is not None else 0.0
+        self.last_time = time
+
+        speed = state['speed']
+        target_speed = state['target_speed']
+        deviation = abs((speed - target_speed) / target_speed * 100) if target_speed else None
+        level, _ = EvaluationMetrics.calculate_comfort_level(state['acceleration'])
+        overshoot = EvaluationMetrics.calculate_overshoot(speed, target_speed)
+        # 由其他工况进入ATP紧急制动计为一次触发
+        atp_trigger = int(state['status'] == ATP_EMERGENCY and self.last_status != ATP_EMERGENCY)
+        self.last_status = state['status']
+
+        entry = (time, weight, deviation, level, overshoot, atp_trigger)
+        self.cumulative_accumulator.add(entry)
+        self.max_overshoot = max(self.max_overshoot, overshoot)
+        for window in self.windows.values():
+            window.add(entry)
+
+    def cumulative(self):
+        """累计指标"""
+        return self.cumulative_accumulator.result(self.max_overshoot)
+
+    def window(self, seconds):
+        """最近seconds秒内的指标"""
+        return self.windows[seconds].result()
+
+    def snapshot(self):
+        """全部指标：{'cumulative': 累计指标, 'windows': {窗口长度: 指标}}"""
+        return {
+            "cumulative": self.cumulative(),
+            "windows": {seconds: window.result() for seconds, window in self.windows.items()},
+        }
+
+class StateRingBuffer:
+    """
+    固定容量的列车状态环形缓冲区
+
+    参数:
+        capacity: 最多保存的状态数，写满后覆盖最早的状态
+    """
+    FIELDS = ('time', 'position', 'speed', 'acceleration', 'target_speed', 'ceiling_speed')
+
+    def __init__(self, capacity=36000):
+        self.capacity = capacity
+        self.values = np.zeros((len(self.FIELDS), capacity))
+        self.status = np.zeros(capacity, dtype=np.uint8)
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def clear(self):
+        self.total = 0
+
+    def append(self, state):
+        """写入一条状态"""
+        index = self.total % self.capacity
+        for row, field in enumerate(self.FIELDS):
+            self.values[row, index] = state[field]
+        self.status[index] = CONDITION_CODES.get(state['status'], 255)
+        self.total += 1
+
+    def to_arrays(self):
+        """按时间顺序返回缓冲区中的状态 {字段: 数组}，工况为编码数组'status'"""
+        count = len(self)
+        start = self.total - count
+        order = (np.arange(start, self.total)) % self.capacity
+        arrays = {field: self.values[row, order] for row, field in enumerate(self.FIELDS)}
+        arrays['status'] = self.status[order]
+        return arrays
@@ -40,6 +40,22 @@ class PIDController:
         self.last_error = 0.0      # 上次误差
         self.integral = 0.0        # 积分项
         self.last_time = None      # 上次更新时间
+
+    def get_state(self) -> dict:
+        """获取控制器内部状态（积分项、上次误差等），用于仿真快照"""
+        return {
+            'setpoint': float(self.setpoint),
+            'last_error': float(self.last_error),
+            'integral': float(self.integral),
+            'last_time': self.last_time,
+        }
+
+    def set_state(self, state: dict):
+        """恢复get_state保存的内部状态"""
+        self.setpoint = state['setpoint']
+        self.last_error = state['last_error']
+        self.integral = state['integral']
+        self.last_time = state['last_time']
         
     def clamp(self, value: float) -> float:
         """限制输出值在指定范围内"""
@@ -134,6 +150,18 @@ class TrainSpeedController:
         self.speed_pid.reset()
         self.last_acc = 0.0
         logger.debug("列车速度控制器已重置")
+
+    def get_state(self) -> dict:
+        """获取控制器内部状态，用于仿真快照"""
+        return {
+            'speed_pid': self.speed_pid.get_state(),
+            'last_acc': float(self.last_acc),
+        }
+
+    def set_state(self, state: dict):
+        """恢复get_state保存的内部状态"""
+        self.speed_pid.set_state(state['speed_pid'])
+        self.last_acc = state['last_acc']
         
     def compute_control(self, target_speed: float, current_speed: float, dt: float) -> float:
         """
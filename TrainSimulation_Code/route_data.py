@@ -0,0 +1,114 @@
+# route_data.py
+import glob
+import hashlib
+import logging
+import os
+import sys
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，修改缓存内容的组织方式时递增，使旧缓存失效
+CACHE_VERSION = 1
+
+# 默认缓存目录（相对于数据文件目录）
+CACHE_DIR_NAME = '.route_cache'
+
+# 线路与车辆数据表：名称 -> (Excel文件名, ((缓存数组名, 表格列名), ...))
+ROUTE_SHEETS = {
+    'target_speed': ('列车目标速度曲线.xlsx', (
+        ('time', '仿真时间'),
+        ('position', '列车位置'),
+        ('speed', '列车速度（km/h）'),
+    )),
+    'ceiling_speed': ('ATP顶棚速度数据.xls', (
+        ('start', '信号里程起点'),
+        ('end', '信号里程终点'),
+        ('limit', '土建限速（ATP顶篷速度）'),
+    )),
+    'brake_acc': ('制动特性曲线.xls', (
+        ('speed', '速度（km/h）'),
+        ('acc', '加速度（m/s2）'),
+    )),
+    'traction_acc': ('牵引特性曲线.xls', (
+        ('speed', '速度（km/h）'),
+        ('acc', '加速度_AW0（m/s2）'),
+    )),
+}
+
+def source_digest(path):
+    """数据文件内容的SHA-256摘要（含缓存格式版本）"""
+    digest = hashlib.sha256(f"route-data-v{CACHE_VERSION}".encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _parse_sheet(path, columns):
+    """用pandas解析Excel表格，仅在缓存缺失或失效时调用"""
+    import pandas as pd
+    sheet = pd.read_excel(path)
+    return {key: sheet[column].to_numpy(dtype=float) for key, column in columns}
+
+def load_sheet(name, data_dir='.', cache_dir=None):
+    """
+    读取一张数据表，优先使用编译后的缓存
+
+    缓存文件以源文件内容摘要命名，源文件改动后摘要变化，自动重新解析并写入新缓存；
+    命中缓存时只读取.npz文件，不导入pandas、xlrd或openpyxl。
+
+    参数:
+        name: 数据表名称，见ROUTE_SHEETS
+        data_dir: 数据文件目录
+        cache_dir: 缓存目录，默认为数据文件目录下的.route_cache
+
+    返回:
+        columns: {数组名: ndarray}
+    """
+    filename, columns = ROUTE_SHEETS[name]
+    path = os.path.join(data_dir, filename)
+    if cache_dir is None:
+        cache_dir = os.path.join(data_dir, CACHE_DIR_NAME)
+
+    digest = source_digest(path)
+    cache_path = os.path.join(cache_dir, f"{name}_{digest[:16]}.npz")
+
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cached:
+                return {key: cached[key] for key, _ in columns}
+        except Exception as e:
+            logger.warning(f"缓存文件损坏，重新解析数据文件: {cache_path} ({str(e)})")
+
+    data = _parse_sheet(path, columns)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 清理同一数据表的旧缓存
+        for stale in glob.glob(os.path.join(glob.escape(cache_dir), f"{name}_*.npz")):
+            os.remove(stale)
+        # 先写临时文件再原子替换，避免并发任务读到不完整的缓存
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **data)
+        os.replace(temp_path, cache_path)
+        logger.info(f"已生成数据缓存: {cache_path}")
+    except OSError as e:
+        logger.warning(f"写入数据缓存失败: {str(e)}")
+    return data
+
+def load_route_data(data_dir='.', cache_dir=None):
+    """读取全部线路与车辆数据表，返回 {数据表名称: {数组名: ndarray}}"""
+    return {name: load_sheet(name, data_dir, cache_dir) for name in ROUTE_SHEETS}
+
+def main(argv=None):
+    """预先生成数据缓存：python route_data.py [数据文件目录]"""
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    argv = sys.argv[1:] if argv is None else argv
+    data_dir = argv[0] if argv else '.'
+    for name, columns in load_route_data(data_dir).items():
+        sizes = ", ".join(f"{key}[{len(values)}]" for key, values in columns.items())
+        print(f"{name}: {sizes}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# sim_clock.py
+"""
+固定步长仿真时钟
+
+仿真始终以固定步长SIM_STEP推进，播放倍速只决定每次定时器触发时执行多少步，
+因此停车精度、ATP触发等结果与倍速无关。应推进的仿真时间以墙钟为基准计算
+（开始或改变倍速时重新锚定），定时器的抖动与间隔取整不会累积为速度偏差。
+倍速为None时不受墙钟限制，仅受每次触发的运算时间预算约束。
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# 仿真步长(秒)
+SIM_STEP = 0.1
+
+# 最大速度模式
+MAX_SPEED = None
+
+class FixedStepClock:
+    """
+    以墙钟为基准的固定步长累加器
+
+    参数:
+        step: 仿真步长(秒)
+        speed: 播放倍速，MAX_SPEED表示不受墙钟限制
+        max_lag: 落后墙钟超过该仿真时间(秒)时放弃追赶，避免卡顿后连续执行大量步
+        tick_budget: 单次触发的最长运算时间(秒)，超出后把剩余步数留到下次触发
+    """
+    def __init__(self, step=SIM_STEP, speed=1, max_lag=2.0, tick_budget=0.05):
+        self.step = step
+        self.speed = speed
+        self.max_lag = max_lag
+        self.tick_budget = tick_budget
+        self.running = False
+        self.steps = 0
+        self.skipped_time = 0.0
+        self._anchor_wall = 0.0
+        self._anchor_steps = 0
+
+    @property
+    def sim_time(self):
+        """已推进的仿真时间(秒)"""
+        return self.steps * self.step
+
+    def start(self, now=None):
+        """开始计时（从当前步数继续）"""
+        self.running = True
+        self._anchor(now)
+
+    def stop(self):
+        """暂停计时"""
+        self.running = False
+
+    def reset(self):
+        """步数清零"""
+        self.steps = 0
+        self.skipped_time = 0.0
+        self._anchor()
+
+    def set_speed(self, speed, now=None):
+        """改变播放倍速，从当前时刻重新锚定"""
+        self.speed = speed
+        self._anchor(now)
+
+    def _anchor(self, now=None):
+        self._anchor_wall = time.perf_counter() if now is None else now
+        self._anchor_steps = self.steps
+
+    def steps_due(self, now=None):
+        """
+        本次触发应执行的仿真步数
+
+        返回:
+            步数；最大速度模式下返回-1，表示执行到运算时间预算耗尽为止
+        """
+        if not self.running:
+            return 0
+        if self.speed is MAX_SPEED:
+            return -1
+        now = time.perf_counter() if now is None else now
+        target = int((now - self._anchor_wall) * self.speed / self.step + 1e-9) + self._anchor_steps
+        due = target - self.steps
+        max_steps = max(1, int(self.max_lag / self.step))
+        if due > max_steps:
+            # 落后过多（如窗口被拖动或弹出对话框），丢弃积压的仿真时间
+            self.skipped_time += (due - max_steps) * self.step
+            logger.warning(f"仿真落后墙钟{due * self.step:.1f}s，跳过{(due - max_steps) * self.step:.1f}s")
+            self._anchor_wall = now
+            self._anchor_steps = self.steps + max_steps
+            due = max_steps
+        return due
+
+    def run(self, step_fn, now=None):
+        """
+        执行本次触发应推进的仿真步
+
+        参数:
+            step_fn: 执行一步仿真的回调，返回False时停止
+        返回:
+            本次执行的步数
+        """
+        due = self.steps_due(now)
+        if due == 0:
+            return 0
+        deadline = time.perf_counter() + self.tick_budget
+        done = 0
+        while due < 0 or done < due:
+            keep_running = step_fn()
+            self.steps += 1
+            done += 1
+            if keep_running is False or time.perf_counter() > deadline:
+                break
+        return done
+
+    def next_step_delay(self, now=None):
+        """距下一步到期的墙钟时间(秒)，最大速度模式下为0"""
+        if self.speed is MAX_SPEED:
+            return 0.0
+        now = time.perf_counter() if now is None else now
+        due_at = self._anchor_wall + (self.steps + 1 - self._anchor_steps) * self.step / self.speed
+        return max(0.0, due_at - now)
+
+    def achieved_speed(self, now=None):
+        """自上次锚定以来实际达到的倍速"""
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._anchor_wall
+        if elapsed <= 0:
+            return 0.0
+        return (self.steps - self._anchor_steps) * self.step / elapsed
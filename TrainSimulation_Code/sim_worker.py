@@ -0,0 +1,145 @@
+# sim_worker.py
+"""
+仿真工作线程
+
+物理计算、日志写入与控制器计算在独立线程中按FixedStepClock推进，
+窗口缩放、对话框或绘图卡顿不再拖慢仿真时间。线程间通信:
+
+    命令队列: 界面线程通过submit()提交的驾驶操作在两个仿真步之间执行
+    状态交接: 每步的结果由step_fn以单个引用赋值发布，界面线程只读取最新值
+    遥测数据: QueuedDataSender暂存每步的记录，由界面线程转交SimulationDataSender发送
+"""
+import logging
+import queue
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# 空闲等待的最长时间(秒)，保证停止请求能及时响应
+MAX_IDLE_WAIT = 0.05
+
+class SimulationWorker:
+    """
+    仿真工作线程
+
+    参数:
+        clock: FixedStepClock
+        step_fn: 执行一个仿真步的回调，返回False时结束仿真
+    """
+    def __init__(self, clock, step_fn):
+        self.clock = clock
+        self.step_fn = step_fn
+        self.commands = queue.SimpleQueue()
+        self.finished = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动工作线程"""
+        self.finished = False
+        self._stop.clear()
+        self.clock.start()
+        self._thread = threading.Thread(target=self._run, name="simulation-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """请求停止并等待当前仿真步完成，返回后可在调用线程中安全访问仿真对象"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self.clock.stop()
+        self._run_commands()
+
+    def submit(self, command, *args):
+        """提交一条命令，在工作线程的两个仿真步之间执行"""
+        self.commands.put((command, args))
+        self._wake.set()
+
+    def _run_commands(self):
+        while True:
+            try:
+                command, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                command(*args)
+            except Exception as e:
+                logger.error(f"执行仿真命令失败: {str(e)}")
+
+    def _step(self):
+        self._run_commands()
+        if self.step_fn() is False:
+            self.finished = True
+            return False
+        return True
+
+    def _run(self):
+        try:
+            while not self._stop.is_set() and not self.finished:
+                self._run_commands()
+                self.clock.run(self._step)
+                delay = self.clock.next_step_delay()
+                if delay > 0:
+                    self._wake.wait(min(delay, MAX_IDLE_WAIT))
+                    self._wake.clear()
+        except Exception as e:
+            logger.error(f"仿真线程异常退出: {str(e)}")
+            self.finished = True
+
+class QueuedDataSender:
+    """
+    线程安全的遥测数据暂存器
+
+    代替TrainSimulation.data_sender在工作线程中使用，每个仿真步的记录保存为
+    副本放入队列，由界面线程调用drain()转交实际的数据发送器（QTcpSocket只能在
+    创建它的线程中使用）。界面线程长时间未取走时丢弃最早的记录。
+
+    参数:
+        sender: 实际的数据发送器（SimulationDataSender）
+        maxlen: 暂存的最大步数
+    """
+    def __init__(self, sender, maxlen=10000):
+        self.sender = sender
+        self.steps = deque(maxlen=maxlen)
+        self.step_state = None
+        self.step_counters = None
+
+    def start(self):
+        self.sender.start()
+
+    def stop(self):
+        self.drain()
+        self.sender.stop()
+
+    def send_data(self, simulation_data):
+        if 'time' in simulation_data:
+            self.step_state = simulation_data
+        elif 'actual_time' in simulation_data:
+            # 仿真对象原地追加列表，需保存副本
+            self.step_counters = {key: list(value) for key, value in simulation_data.items()}
+
+    def commit_step(self):
+        self.steps.append((self.step_state, self.step_counters))
+        self.step_state = None
+        self.step_counters = None
+
+    def flush(self):
+        self.drain()
+
+    def drain(self):
+        """在界面线程中把暂存的记录转交实际的数据发送器"""
+        while self.steps:
+            state, counters = self.steps.popleft()
+            if counters is not None:
+                self.sender.send_data(counters)
+            if state is not None:
+                self.sender.send_data(state)
+            self.sender.commit_step()
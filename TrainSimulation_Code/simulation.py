@@ -1,17 +1,63 @@
 # simulation.py
 import numpy as np
 from scipy.interpolate import interp1d
-import pandas as pd
 import logging
 from datetime import datetime
 import os
 import csv
-from network_client import SimulationDataSender
+import copy
+
+from lookup import build_table, format_validation_report
+from ceiling import CeilingSpeedIndex
+from route_data import load_route_data
+from log_writer import BufferedLogWriter, LOG_COLUMNS
+from trajectory_log import TrajectoryWriter
+from events import (EventRegistry, StepKinematics, PositionEvent, StopEvent,
+                    CeilingOverspeedEvent)
+from coasting import CoastSolution, has_closed_form
+from snapshot import SimulationSnapshot
 
 logger = logging.getLogger(__name__)
 
+# 线路常量
+START_POSITION = 21604.2803                  # 起点位置 (m)
+CHECKPOINT_POSITIONS = (22878.32, 24275.31)  # 到站检测位置 (m)
+MIDDLE_STATION_WINDOW = (22873.32, 22883.32) # 中间站停车区间 (m)
+TERMINAL_STATION_WINDOW = (24270.31, 24280.31) # 终点站停车区间 (m)
+STATION_DEPART_POSITION = 22883.33           # 中间站发车位置 (m)
+STATION_STOP_SPEED = 3.6                     # 允许停站的最高速度 (km/h)
+STATION_DWELL_TIME = 23.5                    # 中间站停站时间 (s)
+ATP_PENALTY_TIME = 5                         # ATP紧急制动罚时 (s)
+ATP_BRAKE_ACC = -1.1                         # ATP紧急制动减速度 (m/s²)
+DAVIS_COEFFICIENTS = (2.03, 0.062, 0.0018)   # 基本阻力系数 A, B, C (N/kN)
+
+class NullDataSender:
+    """空数据发送器，无头运行时代替SimulationDataSender，不依赖Qt事件循环"""
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def send_data(self, simulation_data):
+        pass
+
+    def commit_step(self):
+        pass
+
+    def flush(self):
+        pass
+
 class TrainSimulation:
-    def __init__(self):
+    # 查找表默认网格间距：目标速度曲线按位置(m)，牵引/制动特性曲线按速度(km/h)
+    LOOKUP_RESOLUTION = {
+        'target_speed': 0.1,
+        'traction_acc': 0.05,
+        'brake_acc': 0.05,
+    }
+
+    def __init__(self, data_sender=None, data_dir='.', log_to_file=True,
+                 lookup_resolution=None, lookup_tolerance=None, log_format='csv'):
         self.train_length = 23.4
         self.train_mass = 194.295e3
         self.train_formation = "6编组4动2拖"
@@ -25,9 +71,31 @@ class TrainSimulation:
         self.number_2 = []         # 用于记录速度检测的次序
         self.speed_zero_counter = 0  # 记录速度为 0 的次数
         self.position_counter = 0    # 记录距离检测的次数
+        self.atp_trigger_time = []      # ATP触发（速度达到顶棚速度）的精确时刻
+        self.atp_trigger_position = []  # ATP触发的精确位置
+
+        # 步内事件：到站检测、停车检测与ATP触发点
+        self.events = EventRegistry()
+        self.register_route_events()
         
-        # 添加数据发送器
-        self.data_sender = SimulationDataSender()
+        # 数据文件目录与日志开关（无头运行时可关闭逐步日志）
+        # 日志格式：'csv'为文本CSV，'columnar'为列式二进制轨迹日志(.trj)
+        self.data_dir = data_dir
+        self.log_to_file = log_to_file
+        self.log_format = log_format
+        self.log_writer = None
+
+        # 查找表网格间距与误差容限（容限不为None时自动加密网格直至满足）
+        self.lookup_resolution = dict(self.LOOKUP_RESOLUTION)
+        if lookup_resolution:
+            self.lookup_resolution.update(lookup_resolution)
+        self.lookup_tolerance = lookup_tolerance
+
+        # 添加数据发送器，未指定时使用基于Qt的TCP发送器
+        if data_sender is None:
+            from network_client import SimulationDataSender
+            data_sender = SimulationDataSender()
+        self.data_sender = data_sender
 
         self.reset()
         self.load_data()
@@ -40,7 +108,7 @@ class TrainSimulation:
 
     def reset(self):
         self.time = 0.0
-        self.position = 21604.2803
+        self.position = START_POSITION
         self.speed = 0.0
         self.acceleration = 0.0
         self.traction_acc = 0.0
@@ -49,48 +117,97 @@ class TrainSimulation:
         self.status = "正常运行：惰行"
         self.emergency_brake_start = 0.0
         self.stop_start = 0.0
+        self.flush_log()
         logger.info("仿真状态已重置")
 
+    def snapshot(self, controller=None):
+        """
+        保存当前仿真状态（及控制器状态）
+
+        参数:
+            controller: 速度控制器（TrainSpeedController），为None时不保存
+        返回:
+            SimulationSnapshot
+        """
+        return SimulationSnapshot.capture(self, controller)
+
+    def restore(self, snapshot, controller=None):
+        """
+        恢复到快照保存的状态
+
+        参数:
+            snapshot: SimulationSnapshot
+            controller: 一并恢复状态的速度控制器，为None时只恢复仿真
+        """
+        snapshot.apply(self, controller)
+        self.ceiling_index.cursor = self.ceiling_index.segment_at(self.position)
+
+    def fork(self, snapshot=None, data_sender=None):
+        """
+        派生一个独立的仿真对象
+
+        新对象共享已加载的线路数据与查找表（只读），状态与记录各自独立，
+        不写日志文件。
+
+        参数:
+            snapshot: 派生后恢复的快照，为None时复制当前状态
+            data_sender: 新对象的数据发送器，为None时使用NullDataSender
+        返回:
+            TrainSimulation
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        clone = copy.copy(self)
+        clone.data_sender = data_sender if data_sender is not None else NullDataSender()
+        clone.log_to_file = False
+        clone.log_filename = None
+        clone.log_writer = None
+        # 顶棚速度索引的游标与事件注册表属于各仿真对象
+        clone.ceiling_index = copy.copy(self.ceiling_index)
+        clone.events = EventRegistry()
+        clone.events.events = list(self.events.events)
+        clone.restore(snapshot)
+        return clone
+
     def load_data(self):
         try:
-            target_data = pd.read_excel('列车目标速度曲线.xlsx')
+            route_data = load_route_data(self.data_dir)
+
+            target_data = route_data['target_speed']
             self.target_speed_interp = interp1d(
-                target_data['列车位置'],
-                target_data['列车速度（km/h）'],
+                target_data['position'],
+                target_data['speed'],
                 bounds_error=False,
-                fill_value=(target_data['列车速度（km/h）'].iloc[0], 
-                           target_data['列车速度（km/h）'].iloc[-1])
+                fill_value=(target_data['speed'][0],
+                           target_data['speed'][-1])
             )
             
-            ceiling_data = pd.read_excel('ATP顶棚速度数据.xls')
-            x_points = []
-            y_points = []
-            for _, row in ceiling_data.iterrows():
-                x_points.extend([row['信号里程起点'], row['信号里程终点']])
-                y_points.extend([row['土建限速（ATP顶篷速度）']] * 2)
-            self.ceiling_speed_interp = interp1d(
-                x_points, y_points,
-                bounds_error=False,
-                fill_value=(y_points[0], y_points[-1])
+            ceiling_data = route_data['ceiling_speed']
+            self.ceiling_index = CeilingSpeedIndex(
+                ceiling_data['start'],
+                ceiling_data['end'],
+                ceiling_data['limit']
             )
             
-            brake_data = pd.read_excel('制动特性曲线.xls')
+            brake_data = route_data['brake_acc']
             self.brake_acc_interp = interp1d(
-                brake_data['速度（km/h）'],
-                brake_data['加速度（m/s2）'],
+                brake_data['speed'],
+                brake_data['acc'],
                 bounds_error=False,
-                fill_value=(brake_data['加速度（m/s2）'].iloc[0], 
-                           brake_data['加速度（m/s2）'].iloc[-1])
+                fill_value=(brake_data['acc'][0],
+                           brake_data['acc'][-1])
             )
             
-            traction_data = pd.read_excel('牵引特性曲线.xls')
+            traction_data = route_data['traction_acc']
             self.traction_acc_interp = interp1d(
-                traction_data['速度（km/h）'],
-                traction_data['加速度_AW0（m/s2）'],
+                traction_data['speed'],
+                traction_data['acc'],
                 bounds_error=False,
-                fill_value=(traction_data['加速度_AW0（m/s2）'].iloc[0], 
-                           traction_data['加速度_AW0（m/s2）'].iloc[-1])
+                fill_value=(traction_data['acc'][0],
+                           traction_data['acc'][-1])
             )
+
+            self.compile_lookup_tables()
             
             logger.info("数据文件加载完成")
             
@@ -98,21 +215,52 @@ class TrainSimulation:
             logger.error(f"数据加载错误: {str(e)}")
             raise
 
+    def compile_lookup_tables(self):
+        """将目标速度、牵引与制动特性曲线编译为均匀网格查找表"""
+        self.lookup_tables = {}
+        for name in self.LOOKUP_RESOLUTION:
+            interp = getattr(self, f'{name}_interp')
+            self.lookup_tables[name] = build_table(
+                interp.x, interp.y,
+                self.lookup_resolution[name],
+                reference=interp,
+                tolerance=self.lookup_tolerance
+            )
+        self.target_speed_table = self.lookup_tables['target_speed']
+        self.traction_acc_table = self.lookup_tables['traction_acc']
+        self.brake_acc_table = self.lookup_tables['brake_acc']
+
+    def validate_lookup_tables(self):
+        """对比查找表与原interp1d插值的误差，返回各表的校验结果"""
+        reports = {
+            name: table.validate(getattr(self, f'{name}_interp'))
+            for name, table in self.lookup_tables.items()
+        }
+        logger.info(format_validation_report(reports))
+        return reports
+
     def init_log_file(self):
+        if not self.log_to_file:
+            self.log_filename = None
+            return
         try:
             if not os.path.exists('logs'):
                 os.makedirs('logs')
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            if self.log_format == 'columnar':
+                self.log_filename = f'logs/train_simulation_{timestamp}.trj'
+                self.log_writer = TrajectoryWriter(self.log_filename)
+                logger.info(f"日志文件已创建: {self.log_filename}")
+                return
+
             self.log_filename = f'logs/train_simulation_{timestamp}.csv'
             
             with open(self.log_filename, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow([
-                    'Simulation Time (s)', 'Position (m)', 'Speed (km/h)', 
-                    'Total Acceleration (m/s^2)', 'Traction Acceleration (m/s^2)',
-                    'Braking Acceleration (m/s^2))', 'Resistance Acceleration (m/s^2))', 
-                    'Operating Condition', 'Target Speed (km/h)', 'Ceiling Speed (km/h)'
-                ])
+                writer.writerow(LOG_COLUMNS)
+
+            # 逐步记录由后台线程批量写入文件
+            self.log_writer = BufferedLogWriter(self.log_filename, encoding='gbk')
 
             logger.info(f"日志文件已创建: {self.log_filename}")
             
@@ -121,11 +269,17 @@ class TrainSimulation:
             raise
 
     def get_resistance(self, speed_kmh):
-        A, B, C = 2.03, 0.062, 0.0018
+        A, B, C = DAVIS_COEFFICIENTS
         resistance = (A + B * speed_kmh + C * speed_kmh ** 2) * 9.81 / 1000
         return -resistance
 
     def update(self, dt, control_acc=None):
+        """推进一个仿真步，本步产生的遥测数据由数据发送器合并为一条记录"""
+        result = self._update(dt, control_acc)
+        self.data_sender.commit_step()
+        return result
+
+    def _update(self, dt, control_acc=None):
         try:
             self.time += dt
 
@@ -142,7 +296,7 @@ class TrainSimulation:
                     self.resistance_acc = self.get_resistance(speed_kmh)
                     self.traction_acc = 0
                     #self.brake_acc = float(self.brake_acc_interp(speed_kmh))
-                    self.acceleration = -1.1
+                    self.acceleration = ATP_BRAKE_ACC
                     self.shanhou(dt)
                     status = self.get_status()
                     self.data_sender.send_data(status)
@@ -164,7 +318,7 @@ class TrainSimulation:
 
             elif self.status == "紧急制动罚时":
                 delta_t = self.time - self.emergency_brake_start
-                if delta_t >= 5:
+                if delta_t >= ATP_PENALTY_TIME:
                     self.status = "正常运行：惰行"
                     self.shanhou(dt)
                     status = self.get_status()
@@ -172,7 +326,7 @@ class TrainSimulation:
                     status["message"] ="紧急制动罚时结束,进入惰行工况,按Q键进入牵引状态,列车可以再次启动"
                     return status
                 else:
-                    remaining_time = 5 - delta_t
+                    remaining_time = ATP_PENALTY_TIME - delta_t
                     self.shanhou(dt)
                     status = self.get_status()
                     status["message"] = f"紧急制动罚时仍在进行中，剩余时间：{remaining_time:.1f}秒"
@@ -180,8 +334,8 @@ class TrainSimulation:
                     return status
 
             elif self.status == "停站":
-                if self.time - self.stop_start >= 23.5:
-                    self.position = 22883.33
+                if self.time - self.stop_start >= STATION_DWELL_TIME:
+                    self.position = STATION_DEPART_POSITION
                     self.status = "正常运行：惰行"
                     self.shanhou(dt)
                     status = self.get_status()
@@ -189,7 +343,7 @@ class TrainSimulation:
                     status["message"] = f"列车停站结束，进入惰行状态"
                     return status
                 else:
-                    remaining_time = 23.5 - (self.time - self.stop_start)
+                    remaining_time = STATION_DWELL_TIME - (self.time - self.stop_start)
                     self.shanhou(dt)
                     status = self.get_status()
                     self.data_sender.send_data(status)
@@ -199,7 +353,7 @@ class TrainSimulation:
             else:
                 # 检查站点停靠
                 if self.check_station_stop():
-                    if 24270.31 <= self.position <= 24280.31:
+                    if TERMINAL_STATION_WINDOW[0] <= self.position <= TERMINAL_STATION_WINDOW[1]:
                         self.status = "停站"
                         self.speed = 0
                         self.acceleration = 0
@@ -212,7 +366,7 @@ class TrainSimulation:
                         return status
                     
                     else:
-                        if self.speed* 3.6 <= 3.6: #这样一次dt更新就能变成0（这个数有点大可能违反jerk限制，不过无所谓了。。）
+                        if self.speed* 3.6 <= STATION_STOP_SPEED: #这样一次dt更新就能变成0（这个数有点大可能违反jerk限制，不过无所谓了。。）
                             self.status = "停站" #可以在加一个flag_stopped来判断是否停过站了，因为我们中间只停这一次所以可以这么来,或者直接把位置挪到22883.33，防止多次停站
                             self.speed = 0
                             self.acceleration = 0
@@ -262,25 +416,21 @@ class TrainSimulation:
             return {"error": str(e)}
 
     def shanhou(self, dt):
-        old_speed = self.speed
-        self.speed = max(0, old_speed + self.acceleration * dt)
-        self.position += (old_speed + self.speed) * dt / 2
+        # 步内匀加速运动，速度降为0时停在精确的停车位置
+        step = StepKinematics(self.time - dt, self.position, self.speed, self.acceleration, dt)
+        self.speed = step.v1
+        self.position = step.x1
         
-        # 检查指定位置
-        specific_positions = [22878.32, 24275.31]
-        for i, pos in enumerate(specific_positions):
-            if self.position_counter <= i and self.position >= pos:
-                self.position_counter += 1
-                self.actual_time.append(self.time)  # 记录时间
-                self.number_1.append(self.position_counter)  # 记录检测次序
-        
-        # 检查速度为 0
-        if old_speed > 0 and self.speed == 0 and self.speed_zero_counter < 2:
-            self.speed_zero_counter += 1
-            self.actual_position.append(self.position)  # 记录距离
-            self.number_2.append(self.speed_zero_counter)  # 记录检测次序
+        # 到站检测、停车检测与ATP触发点按步内精确时刻记录
+        self.events.process(self, step)
         
         # 发送实时数据
+        self.send_counters()
+            
+        self.log_state()
+
+    def send_counters(self):
+        """发送到站时间与停车位置记录"""
         data = {
             "actual_time": self.actual_time,
             "number_1": self.number_1,
@@ -288,14 +438,168 @@ class TrainSimulation:
             "number_2": self.number_2,
             }
         self.data_sender.send_data(data)
-            
+
+    def macro_step(self, dt, control_fn=None, max_steps=None, end_time=None, emit_every=1):
+        """
+        以一个宏步跳过停站、罚时与纯惰行阶段
+
+        停站与紧急制动罚时期间列车静止，除时间外状态不变，宏步推进到阶段结束的
+        前一步；没有控制输入（control_fn为None）的惰行按Davis阻力的解析解
+        （coasting.CoastSolution）推进到下一个事件（停车、进入停站区间、到站检测
+        位置、驶入限速不高于当前速度的区段）之前。阶段结束与事件所在的步仍由
+        update()完成。宏步覆盖整数个步长，时间戳与逐步推进时一致。
+
+        参数:
+            dt: 仿真步长(秒)
+            control_fn: 逐步推进时每步调用的控制回调 control_fn() -> control_acc，
+                        停站与罚时期间按步调用以保持控制器状态；不为None时不跳过惰行
+            max_steps: 最多覆盖的步数
+            end_time: 仿真时间达到该值后不再推进（同无头运行的最长仿真时间）
+            emit_every: 每隔多少步输出一条记录（日志、遥测与返回的状态），1表示每步输出
+        返回:
+            (覆盖的步数, 输出的状态字典列表)，不处于可跳过的阶段时步数为0
+        """
+        if self.status == "紧急制动罚时":
+            return self._hold(dt, self.emergency_brake_start, ATP_PENALTY_TIME,
+                              "紧急制动罚时仍在进行中，剩余时间：{:.1f}秒", True,
+                              control_fn, max_steps, end_time, emit_every)
+        if self.status == "停站" and self.speed * 3.6 < self.get_ceiling_speed():
+            return self._hold(dt, self.stop_start, STATION_DWELL_TIME,
+                              "列车停站，剩余时间：{:.1f}秒", False,
+                              control_fn, max_steps, end_time, emit_every)
+        if (control_fn is None and self.status == "正常运行：惰行"
+                and not self.check_station_stop()
+                and self.speed * 3.6 < self.get_ceiling_speed()):
+            if self.speed > 0:
+                return self._coast(dt, max_steps, end_time, emit_every)
+            if max_steps is not None or end_time is not None:
+                # 无控制输入的静止列车一直保持静止
+                self.resistance_acc = self.get_resistance(0.0)
+                self.acceleration = 0
+                return self._hold(dt, self.time, float('inf'), None, False,
+                                  None, max_steps, end_time, emit_every)
+        return 0, []
+
+    def _hold(self, dt, start, duration, message, message_sent, control_fn,
+              max_steps, end_time, emit_every):
+        """静止阶段的宏步，推进到start + duration之前的最后一步"""
+        steps = 0
+        emitted = []
+        while max_steps is None or steps < max_steps:
+            if end_time is not None and self.time >= end_time:
+                break
+            time = self.time + dt
+            if time - start >= duration:
+                break
+            if control_fn is not None:
+                control_fn()
+            self.time = time
+            steps += 1
+            if steps % emit_every == 0:
+                status = self.get_status()
+                if message is not None:
+                    status["message"] = message.format(duration - (time - start))
+                emitted.append(self._emit(status, message_sent))
+        return steps, emitted
+
+    def _coast(self, dt, max_steps, end_time, emit_every):
+        """纯惰行阶段的宏步"""
+        if not has_closed_form(DAVIS_COEFFICIENTS):
+            return 0, []
+        distance = self.coast_event_position() - self.position
+        if distance <= self.speed * dt:
+            # 一步之内到达事件位置
+            return 0, []
+        solution = CoastSolution(self.speed, DAVIS_COEFFICIENTS)
+        limit = min(float(solution.time_to_distance(distance)), float(solution.stop_time))
+        count = int(limit / dt) + 2
+        if max_steps is not None:
+            count = min(count, max_steps)
+
+        # 时间戳按逐步累加计算，与update()一致
+        times = np.cumsum(np.r_[self.time, np.full(count, dt)])
+        steps = int(np.searchsorted(times - self.time, limit, side='left')) - 1
+        if end_time is not None:
+            steps = min(steps, int(np.searchsorted(times, end_time, side='left')))
+        if steps <= 0:
+            return 0, []
+
+        start_time, start_position = self.time, self.position
+        emitted = []
+        for k in range(1, steps + 1):
+            if k % emit_every != 0 and k != steps:
+                continue
+            tau = times[k] - start_time
+            self.time = float(times[k])
+            self.position = start_position + float(solution.distance(tau))
+            self.speed = float(solution.speed(tau))
+            self.resistance_acc = float(solution.resistance(tau))
+            self.acceleration = self.resistance_acc
+            if k % emit_every == 0:
+                emitted.append(self._emit(self.get_status(), False))
+        return steps, emitted
+
+    def coast_event_position(self):
+        """
+        惰行时前方第一个需要逐步处理的事件位置
+
+        包括事件注册表中有效的位置事件（到站检测及调用方注册的地面事件）、
+        由update()状态机处理的停站区间起点，以及限速不高于当前速度的区段起点。
+        """
+        positions = [self.events.next_position(self, self.position),
+                     MIDDLE_STATION_WINDOW[0], TERMINAL_STATION_WINDOW[0]]
+        # 惰行时速度递减，只有限速不高于当前速度的区段会触发ATP
+        restriction = self.ceiling_index.next_lower_restriction(
+            self.position, np.nextafter(self.speed * 3.6, np.inf))
+        if restriction is not None:
+            positions.append(restriction[0])
+        ahead = [pos for pos in positions if pos > self.position]
+        return min(ahead) if ahead else float('inf')
+
+    def _emit(self, status, message_sent):
+        """为宏步内的一步写日志并发送遥测数据，返回状态字典"""
+        self.send_counters()
         self.log_state()
+        if message_sent:
+            self.data_sender.send_data(status)
+        else:
+            self.data_sender.send_data({key: value for key, value in status.items() if key != "message"})
+        self.data_sender.commit_step()
+        return status
+
+    def register_route_events(self):
+        """注册线路上的到站检测、停车检测与ATP触发点事件"""
+        for i, pos in enumerate(CHECKPOINT_POSITIONS):
+            self.events.register(PositionEvent(
+                pos,
+                TrainSimulation._on_checkpoint,
+                condition=lambda sim, i=i: sim.position_counter <= i,
+                name=f"到站检测{i + 1}"
+            ))
+        self.events.register(StopEvent(
+            TrainSimulation._on_stop,
+            condition=lambda sim: sim.speed_zero_counter < 2,
+            name="停车检测"
+        ))
+        self.events.register(CeilingOverspeedEvent(TrainSimulation._on_overspeed, name="ATP触发"))
+
+    def _on_checkpoint(self, time, position, speed):
+        self.position_counter += 1
+        self.actual_time.append(time)  # 记录时间
+        self.number_1.append(self.position_counter)  # 记录检测次序
 
+    def _on_stop(self, time, position, speed):
+        self.speed_zero_counter += 1
+        self.actual_position.append(position)  # 记录距离
+        self.number_2.append(self.speed_zero_counter)  # 记录检测次序
 
+    def _on_overspeed(self, time, position, speed):
+        self.atp_trigger_time.append(time)
+        self.atp_trigger_position.append(position)
 
     def check_station_stop(self):
-        return (22873.32 <= self.position <= 22883.32 or  
-                24270.31 <= self.position <= 24280.31)
+        return (MIDDLE_STATION_WINDOW[0] <= self.position <= MIDDLE_STATION_WINDOW[1] or
+                TERMINAL_STATION_WINDOW[0] <= self.position <= TERMINAL_STATION_WINDOW[1])
 
     def get_status(self):
         return {
@@ -309,42 +613,65 @@ class TrainSimulation:
         }
 
     def log_state(self):
-        with open(self.log_filename, 'a', newline='', encoding='gbk') as f:
-            writer = csv.writer(f)
-            writer.writerow([
-                f"{self.time:.1f}",
-                f"{self.position:.4f}",
-                f"{self.speed * 3.6:.2f}",
-                f"{self.acceleration:.4f}",
-                f"{self.traction_acc:.4f}",
-                f"{self.brake_acc:.4f}",
-                f"{self.resistance_acc:.4f}",
-                self.status,
-                f"{self.get_target_speed():.2f}",
-                f"{self.get_ceiling_speed():.2f}"
-            ])
+        if self.log_writer is None:
+            return
+        self.log_writer.write_row((
+            self.time,
+            self.position,
+            self.speed * 3.6,
+            self.acceleration,
+            self.traction_acc,
+            self.brake_acc,
+            self.resistance_acc,
+            self.status,
+            self.get_target_speed(),
+            self.get_ceiling_speed()
+        ))
+
+    def flush_log(self):
+        """将缓冲的日志记录写入文件"""
+        if self.log_writer is not None:
+            self.log_writer.flush()
+
+    def cleanup(self):
+        """关闭日志文件并停止数据发送器"""
+        if self.log_writer is not None:
+            self.log_writer.close()
+            self.log_writer = None
+        self.data_sender.stop()
 
     def get_target_speed(self, position=None):
         if position is None:
             position = self.position
-        return float(self.target_speed_interp(position))
+        return self.target_speed_table(position)
 
     def get_ceiling_speed(self, position=None):
         if position is None:
-            position = self.position
-        return float(self.ceiling_speed_interp(position))
+            return self.ceiling_index.advance(self.position)
+        return self.ceiling_index.limit_at(position)
+
+    def get_speed_profiles(self, positions):
+        """
+        位置数组对应的目标速度与顶棚速度（向量化查询，用于绘制静态曲线）
+
+        返回:
+            (target_speeds, ceiling_speeds)
+        """
+        positions = np.asarray(positions, dtype=float)
+        return (self.target_speed_table.lookup_array(positions),
+                self.ceiling_index.limit_array(positions))
 
     def set_traction_acc(self, value):
         if self.status != "正常运行：牵引":
             return
         speed_kmh = self.speed * 3.6
-        max_traction = float(self.traction_acc_interp(speed_kmh))
+        max_traction = self.traction_acc_table(speed_kmh)
         self.traction_acc = max(0, min(value, max_traction))
 
     def set_brake_acc(self, value):
         if self.status != "正常运行：制动":
             return
         speed_kmh = self.speed * 3.6
-        max_brake = float(self.brake_acc_interp(speed_kmh))
+        max_brake = self.brake_acc_table(speed_kmh)
         self.brake_acc = max(0, min(value, -max_brake))
 
@@ -0,0 +1,118 @@
+# snapshot.py
+"""
+仿真状态快照
+
+SimulationSnapshot保存TrainSimulation在某一时刻的全部可变状态（运动学量、
+工况、停站与罚时计时、到站/停车计数与记录）以及速度控制器的状态（PID积分项、
+上次误差与上次输出加速度）。快照创建后不再改变，可以反复恢复或派生出任意多个
+互不影响的后续仿真：
+
+    snapshot = runner.snapshot()              # 或 simulation.snapshot(controller)
+    for kp in (0.6, 0.8, 1.0):
+        branch = runner.fork(snapshot)
+        branch.controller.set_control_params(kp=kp)
+        branch.run(reset=False)
+
+恢复只需对固定数量的字段赋值，与已仿真的时长无关。to_dict()/from_dict()
+转换为只含基本类型的字典，可直接写入JSON。
+"""
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 快照格式版本，字段变化时递增
+SNAPSHOT_VERSION = 1
+
+# TrainSimulation的标量状态
+SIMULATION_STATE_FIELDS = (
+    'time', 'position', 'speed', 'acceleration', 'traction_acc', 'brake_acc',
+    'resistance_acc', 'status', 'emergency_brake_start', 'stop_start',
+    'position_counter', 'speed_zero_counter',
+)
+
+# TrainSimulation的记录列表
+SIMULATION_RECORD_FIELDS = (
+    'actual_time', 'number_1', 'actual_position', 'number_2',
+    'atp_trigger_time', 'atp_trigger_position',
+)
+
+class SimulationSnapshot:
+    """
+    仿真与控制器状态的不可变快照
+
+    参数:
+        state: 按SIMULATION_STATE_FIELDS顺序排列的标量状态元组
+        records: 按SIMULATION_RECORD_FIELDS顺序排列的记录元组
+        controller: 控制器的get_state()结果，未保存控制器时为None
+                    （保存副本，读取与恢复时都不会修改快照）
+    """
+    __slots__ = ('state', 'records', '_controller')
+
+    def __init__(self, state, records, controller=None):
+        self.state = tuple(state)
+        self.records = tuple(tuple(values) for values in records)
+        self._controller = copy.deepcopy(controller)
+
+    @property
+    def controller(self):
+        """控制器状态的副本，修改它不影响快照"""
+        return copy.deepcopy(self._controller)
+
+    @classmethod
+    def capture(cls, simulation, controller=None):
+        """保存仿真对象（及控制器）的当前状态"""
+        return cls(
+            (getattr(simulation, field) for field in SIMULATION_STATE_FIELDS),
+            (getattr(simulation, field) for field in SIMULATION_RECORD_FIELDS),
+            controller.get_state() if controller is not None else None
+        )
+
+    def apply(self, simulation, controller=None):
+        """把快照状态写回仿真对象（及控制器）"""
+        for field, value in zip(SIMULATION_STATE_FIELDS, self.state):
+            setattr(simulation, field, value)
+        for field, values in zip(SIMULATION_RECORD_FIELDS, self.records):
+            setattr(simulation, field, list(values))
+        if controller is not None and self._controller is not None:
+            controller.set_state(self.controller)
+
+    def __getattr__(self, name):
+        # 以属性形式读取标量状态，如snapshot.position
+        if name not in SIMULATION_STATE_FIELDS:
+            raise AttributeError(name)
+        return self.state[SIMULATION_STATE_FIELDS.index(name)]
+
+    def record(self, name):
+        """读取记录列表，如snapshot.record('actual_time')"""
+        return self.records[SIMULATION_RECORD_FIELDS.index(name)]
+
+    def to_dict(self):
+        """转换为只含基本类型的字典"""
+        return {
+            'version': SNAPSHOT_VERSION,
+            'state': dict(zip(SIMULATION_STATE_FIELDS, self.state)),
+            'records': {field: list(values) for field, values in zip(SIMULATION_RECORD_FIELDS, self.records)},
+            'controller': self.controller,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """由to_dict()的结果重建快照"""
+        version = data.get('version')
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"不支持的快照版本: {version}")
+        return cls(
+            (data['state'][field] for field in SIMULATION_STATE_FIELDS),
+            (data['records'].get(field, ()) for field in SIMULATION_RECORD_FIELDS),
+            data.get('controller')
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, SimulationSnapshot):
+            return NotImplemented
+        return (self.state, self.records, self._controller) == (other.state, other.records, other._controller)
+
+    def __repr__(self):
+        return (f"SimulationSnapshot(time={self.time:.1f}, position={self.position:.2f}, "
+                f"speed={self.speed * 3.6:.2f}km/h, status={self.status})")
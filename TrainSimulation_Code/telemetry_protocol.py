@@ -0,0 +1,206 @@
+# telemetry_protocol.py
+"""
+仿真系统与评价系统之间的遥测数据帧协议
+
+每帧由8字节帧头与负载组成（小端序）:
+    帧头: b'TS' | uint8 协议版本 | uint8 负载编码 | uint32 负载长度
+    负载: 二进制编码时首字节为记录类型，其后为定长/定义好的记录体；
+          JSON编码（调试用）时为UTF-8 JSON对象，记录类型保存在"type"字段
+
+记录类型:
+    RECORD_STATE    列车状态（字段同TrainSimulation.get_status）
+    RECORD_COUNTERS 到站时间与停车位置记录（actual_time, number_1, actual_position, number_2）
+"""
+import json
+import logging
+import struct
+
+from conditions import CONDITION_CODES, OPERATING_CONDITIONS
+
+logger = logging.getLogger(__name__)
+
+FRAME_MAGIC = b'TS'
+PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct('<2sBBI')
+
+# 负载编码
+ENCODING_BINARY = 0
+ENCODING_JSON = 1
+
+# 记录类型
+RECORD_STATE = 1
+RECORD_COUNTERS = 2
+RECORD_TYPE_NAMES = {RECORD_STATE: "state", RECORD_COUNTERS: "counters"}
+RECORD_TYPES = {name: record_type for record_type, name in RECORD_TYPE_NAMES.items()}
+
+# 状态记录: 类型 | 时间 | 位置 | 速度 | 加速度 | 目标速度 | 顶棚速度 | 工况编码
+STATE_RECORD = struct.Struct('<BddffffB')
+STATE_FIELDS = ('time', 'position', 'speed', 'acceleration', 'target_speed', 'ceiling_speed')
+
+# 计数记录: 类型 | 四个列表的长度，其后依次为各列表元素
+COUNTERS_HEADER = struct.Struct('<BHHHH')
+COUNTERS_FIELDS = (('actual_time', 'd'), ('number_1', 'i'), ('actual_position', 'd'), ('number_2', 'i'))
+
+# 单帧负载的长度上限，超过视为数据流损坏
+MAX_PAYLOAD_SIZE = 1 << 20
+
+class ProtocolError(ValueError):
+    """遥测数据帧格式错误"""
+
+def _frame(encoding, payload):
+    return FRAME_HEADER.pack(FRAME_MAGIC, PROTOCOL_VERSION, encoding, len(payload)) + payload
+
+def encode_json(record_type, record):
+    """以JSON编码（调试用）打包一条记录"""
+    payload = dict(record)
+    payload["type"] = RECORD_TYPE_NAMES[record_type]
+    return _frame(ENCODING_JSON, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+def encode_state(state, encoding=ENCODING_BINARY):
+    """
+    打包一条列车状态记录
+
+    参数:
+        state: 含STATE_FIELDS与status的字典（TrainSimulation.get_status的返回值）
+        encoding: 负载编码；工况不在conditions.OPERATING_CONDITIONS中时使用JSON编码
+    """
+    code = CONDITION_CODES.get(state['status'])
+    if encoding == ENCODING_JSON or code is None:
+        record = {field: state.get(field, 0) for field in STATE_FIELDS}
+        record['status'] = state['status']
+        return encode_json(RECORD_STATE, record)
+    return _frame(ENCODING_BINARY, STATE_RECORD.pack(
+        RECORD_STATE,
+        state['time'],
+        state['position'],
+        state['speed'],
+        state['acceleration'],
+        state.get('target_speed', 0),
+        state.get('ceiling_speed', 0),
+        code
+    ))
+
+def encode_counters(counters, encoding=ENCODING_BINARY):
+    """
+    打包一条到站时间与停车位置记录
+
+    参数:
+        counters: {'actual_time', 'number_1', 'actual_position', 'number_2'} 列表字典
+    """
+    if encoding == ENCODING_JSON:
+        return encode_json(RECORD_COUNTERS, {field: list(counters[field]) for field, _ in COUNTERS_FIELDS})
+    values = [counters[field] for field, _ in COUNTERS_FIELDS]
+    body_format = '<' + ''.join(f"{len(value)}{code}" for value, (_, code) in zip(values, COUNTERS_FIELDS))
+    payload = COUNTERS_HEADER.pack(RECORD_COUNTERS, *(len(value) for value in values))
+    payload += struct.pack(body_format, *(item for value in values for item in value))
+    return _frame(ENCODING_BINARY, payload)
+
+def encode_record(record, encoding=ENCODING_BINARY):
+    """按字段自动判断记录类型并打包：含time为状态记录，含actual_time为计数记录"""
+    if 'time' in record:
+        return encode_state(record, encoding)
+    if 'actual_time' in record:
+        return encode_counters(record, encoding)
+    raise ProtocolError(f"无法识别的记录: {sorted(record)}")
+
+def _decode_state(buffer, offset):
+    values = STATE_RECORD.unpack_from(buffer, offset)
+    record = dict(zip(STATE_FIELDS, values[1:7]))
+    record['status'] = OPERATING_CONDITIONS[values[7]]
+    return record
+
+def _decode_counters(buffer, offset):
+    lengths = COUNTERS_HEADER.unpack_from(buffer, offset)[1:]
+    offset += COUNTERS_HEADER.size
+    record = {}
+    for (field, code), length in zip(COUNTERS_FIELDS, lengths):
+        item = struct.Struct(f'<{length}{code}')
+        record[field] = list(item.unpack_from(buffer, offset))
+        offset += item.size
+    return record
+
+_BINARY_DECODERS = {RECORD_STATE: _decode_state, RECORD_COUNTERS: _decode_counters}
+
+class FrameDecoder:
+    """
+    增量帧解码器
+
+    feed()把收到的字节追加到可复用的缓冲区，records()从读偏移处依次解出完整的帧，
+    二进制负载直接在缓冲区上解包而不复制。不完整的帧留待下次数据到达后继续解码；
+    遇到损坏的帧头时向后搜索下一个帧头重新同步。
+    """
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offset = 0
+        self.frames = 0
+        self.errors = 0
+
+    def reset(self):
+        """清空缓冲区（新连接建立时调用）"""
+        del self._buffer[:]
+        self._offset = 0
+
+    @property
+    def pending(self):
+        """缓冲区中尚未解码的字节数"""
+        return len(self._buffer) - self._offset
+
+    def feed(self, data):
+        """追加收到的数据"""
+        # 已解码的数据超过缓冲区一半时整体前移，避免缓冲区无限增长
+        if self._offset and self._offset * 2 >= len(self._buffer):
+            del self._buffer[:self._offset]
+            self._offset = 0
+        self._buffer += data
+
+    def records(self):
+        """
+        解出缓冲区中的全部完整帧
+
+        返回:
+            生成器，每项为 (记录类型, 记录字典)
+        """
+        buffer = self._buffer
+        while len(buffer) - self._offset >= FRAME_HEADER.size:
+            magic, version, encoding, length = FRAME_HEADER.unpack_from(buffer, self._offset)
+            if magic != FRAME_MAGIC or version != PROTOCOL_VERSION or length > MAX_PAYLOAD_SIZE:
+                self._resync()
+                continue
+            start = self._offset + FRAME_HEADER.size
+            if len(buffer) - start < length:
+                return
+            self._offset = start + length
+            self.frames += 1
+            try:
+                # 负载视图限定解包范围，解码结束即释放，不影响缓冲区扩展
+                with memoryview(buffer)[start:start + length] as payload:
+                    record = self._decode_payload(payload, encoding)
+            except (ProtocolError, struct.error, IndexError, KeyError, ValueError) as e:
+                self.errors += 1
+                logger.error(f"遥测数据帧解码失败: {str(e)}")
+                continue
+            yield record
+
+    def _decode_payload(self, payload, encoding):
+        if encoding == ENCODING_JSON:
+            record = json.loads(bytes(payload).decode('utf-8'))
+            return RECORD_TYPES[record.pop("type")], record
+        if encoding != ENCODING_BINARY or len(payload) == 0:
+            raise ProtocolError(f"未知的负载编码: {encoding}")
+        record_type = payload[0]
+        decoder = _BINARY_DECODERS.get(record_type)
+        if decoder is None:
+            raise ProtocolError(f"未知的记录类型: {record_type}")
+        return record_type, decoder(payload, 0)
+
+    def _resync(self):
+        """丢弃数据直到下一个帧头"""
+        self.errors += 1
+        index = self._buffer.find(FRAME_MAGIC, self._offset + 1)
+        if index < 0:
+            # 末尾可能是下一帧帧头的第一个字节，予以保留
+            index = len(self._buffer)
+            if self._buffer.endswith(FRAME_MAGIC[:1]):
+                index -= 1
+        logger.warning(f"遥测数据流损坏，丢弃{index - self._offset}字节")
+        self._offset = index
@@ -0,0 +1,38 @@
+# conftest.py
+"""
+测试公共设置
+
+各模块以平铺方式互相导入（与从TrainSimulation_Code目录运行程序相同），
+这里把该目录加入sys.path。需要线路数据的测试从环境变量TRAIN_DATA_DIR指定的目录
+（或TrainSimulation_Code、TrainSimulation_App目录）读取Excel数据文件，找不到时跳过。
+"""
+import logging
+import os
+import sys
+
+import pytest
+
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODE_DIR)
+
+from route_data import ROUTE_SHEETS  # noqa: E402
+
+def _has_route_data(data_dir):
+    return all(os.path.exists(os.path.join(data_dir, filename)) for filename, _ in ROUTE_SHEETS.values())
+
+@pytest.fixture(scope='session')
+def data_dir():
+    """线路数据文件目录"""
+    candidates = [os.environ.get('TRAIN_DATA_DIR'), CODE_DIR,
+                  os.path.join(os.path.dirname(CODE_DIR), 'TrainSimulation_App')]
+    for candidate in candidates:
+        if candidate and _has_route_data(candidate):
+            return candidate
+    pytest.skip("未找到线路数据文件，设置TRAIN_DATA_DIR指向数据目录")
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    """仿真每步写日志，测试中关闭"""
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
@@ -0,0 +1,201 @@
+# test_equivalence.py
+"""
+README中"结果一致"承诺的回归测试
+
+    批量引擎N=1与TrainSimulation逐步仿真一致
+    宏步跳过停站与罚时与逐步推进逐位一致
+    从快照派生的运行与不中断的运行逐位一致
+    离线评价结果与分块大小无关
+    遥测帧编码/解码往返不变
+    .trj轨迹日志与CSV日志互相转换不变
+
+前三项需要线路数据文件（见conftest.data_dir），其余使用构造的数据。
+"""
+import numpy as np
+import pytest
+
+from batch import BatchTrainSimulation, BatchSpeedController
+from conditions import ATP_EMERGENCY, ATP_PENALTY, COASTING, STATION_STOP, TRACTION
+from headless import HeadlessRunner
+from offline_evaluation import OfflineEvaluator, iter_log_chunks
+from telemetry_protocol import (ENCODING_BINARY, ENCODING_JSON, RECORD_COUNTERS, RECORD_STATE,
+                                FrameDecoder, encode_counters, encode_state)
+from trajectory_log import (TRAJECTORY_COLUMNS, TrajectoryLog, TrajectoryWriter, read_log_frame,
+                            trajectory_to_csv, csv_to_trajectory)
+
+def floor_it(simulation, dt):
+    """惰行降到30km/h以下时全力牵引的驾驶策略，会触发ATP紧急制动"""
+    if simulation.status == COASTING and simulation.speed * 3.6 < 30:
+        simulation.status = TRACTION
+        simulation.set_traction_acc(1.0)
+    return None
+
+def assert_same_trajectory(a, b):
+    assert a.keys() == b.keys()
+    for field in a:
+        assert np.array_equal(a[field], b[field]), field
+
+@pytest.fixture(scope='module')
+def reference(data_dir):
+    """自动驾驶的固定步长参考运行"""
+    runner = HeadlessRunner(data_dir=data_dir)
+    return runner, runner.run()
+
+# ---- 仿真引擎 ----
+
+def test_batch_single_train_matches_scalar(reference):
+    runner, result = reference
+    batch = BatchTrainSimulation.from_simulation(runner.simulation, 1)
+    out = batch.run(controller=BatchSpeedController(1), record_every=1)
+
+    trajectory = result['trajectory']
+    assert out['steps'] == result['steps']
+    assert np.array_equal(out['position'][:, 0], trajectory['position'])
+    assert np.array_equal(out['speed'][:, 0], trajectory['speed'])
+    checkpoint_time = out['checkpoint_time'][0]
+    np.testing.assert_allclose(checkpoint_time[~np.isnan(checkpoint_time)], result['actual_time'], atol=1e-6)
+
+@pytest.mark.parametrize('driver', [None, floor_it], ids=['autopilot', 'atp'])
+def test_macro_step_matches_fixed_step(data_dir, driver):
+    fixed = HeadlessRunner(data_dir=data_dir, driver=driver, max_time=300).run()
+    macro = HeadlessRunner(data_dir=data_dir, driver=driver, max_time=300, macro_step=True).run()
+
+    assert_same_trajectory(macro['trajectory'], fixed['trajectory'])
+    for field in ('actual_time', 'actual_position', 'atp_trigger_time', 'atp_trigger_position'):
+        assert macro[field] == fixed[field], field
+
+def test_snapshot_fork_matches_continuous_run(data_dir, reference):
+    _, full = reference
+    runner = HeadlessRunner(data_dir=data_dir, max_time=60)
+    runner.run()
+    snapshot = runner.snapshot()
+
+    branch = runner.fork(snapshot, max_time=3600)
+    tail = branch.run(reset=False)['trajectory']
+    n = len(tail['time'])
+    assert_same_trajectory(tail, {field: values[-n:] for field, values in full['trajectory'].items()})
+    # 派生运行不影响原运行器与快照
+    assert runner.simulation.time == snapshot.time
+    assert runner.snapshot() == snapshot
+
+# ---- 离线评价 ----
+
+def _synthetic_log(n_rows=997):
+    """含牵引、惰行、ATP紧急制动与停站游程的构造日志"""
+    rng = np.random.default_rng(7)
+    pattern = [TRACTION] * 40 + [COASTING] * 25 + [ATP_EMERGENCY] * 10 + [ATP_PENALTY] * 30 + [STATION_STOP] * 50
+    conditions = np.array([pattern[i % len(pattern)] for i in range(n_rows)], dtype=object)
+    time = np.round(np.arange(1, n_rows + 1) * 0.1, 1)
+    moving = conditions != STATION_STOP
+    position = 21600 + np.cumsum(np.where(moving, rng.uniform(0.5, 2.0, n_rows), 0.0))
+    speed = np.where(moving, rng.uniform(0, 80, n_rows), 0.0)
+    return {
+        'time': time,
+        'position': np.round(position, 4),
+        'speed': np.round(speed, 2),
+        'acceleration': np.round(rng.uniform(-1.5, 1.5, n_rows), 4),
+        'traction_acc': np.zeros(n_rows),
+        'brake_acc': np.zeros(n_rows),
+        'resistance_acc': np.zeros(n_rows),
+        'condition': conditions,
+        'target_speed': np.round(speed + rng.normal(0, 3, n_rows), 2),
+        'ceiling_speed': np.full(n_rows, 80.0),
+    }
+
+def _synthetic_schedule(n_stops=8):
+    """每站到发各一行（速度为0）的构造时间表"""
+    time, position, speed = [], [], []
+    for k in range(n_stops):
+        time += [30.0 * k, 30.0 * k + 10, 30.0 * k + 20]
+        position += [21600.0 + 100 * k, 21650.0 + 100 * k, 21650.0 + 100 * k]
+        speed += [40.0, 0.0, 0.0]
+    return {'time': np.array(time), 'position': np.array(position), 'speed': np.array(speed)}
+
+SCHEDULE = _synthetic_schedule()
+
+def _evaluate(log, chunk_rows):
+    evaluator = OfflineEvaluator(SCHEDULE)
+    n_rows = len(log['time'])
+    for start in range(0, n_rows, chunk_rows):
+        evaluator.update({key: values[start:start + chunk_rows] for key, values in log.items()})
+    return evaluator.result()
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 64, 155])
+def test_offline_evaluation_independent_of_chunk_size(chunk_rows):
+    log = _synthetic_log()
+    expected = _evaluate(log, len(log['time']))
+    result = _evaluate(log, chunk_rows)
+    assert result.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, str) or (isinstance(value, list) and value and isinstance(value[0], (str, bool))):
+            assert result[key] == value, key
+        else:
+            # 统计量按块累加，求和顺序不同
+            np.testing.assert_allclose(np.asarray(result[key], dtype=float), np.asarray(value, dtype=float),
+                                       rtol=1e-12, err_msg=key)
+
+# ---- 遥测协议 ----
+
+@pytest.mark.parametrize('encoding', [ENCODING_BINARY, ENCODING_JSON])
+def test_telemetry_round_trip(encoding):
+    state = {'time': 12.3, 'position': 21650.125, 'speed': 45.5, 'acceleration': -0.75,
+             'target_speed': 46.0, 'ceiling_speed': 80.0, 'status': ATP_EMERGENCY}
+    counters = {'actual_time': [116.4, 230.1], 'number_1': [1, 2],
+                'actual_position': [22204.41], 'number_2': [1]}
+    stream = encode_state(state, encoding) + encode_counters(counters, encoding)
+
+    decoder = FrameDecoder()
+    # 逐字节送入，检验跨次到达的不完整帧
+    records = []
+    for i in range(len(stream)):
+        decoder.feed(stream[i:i + 1])
+        records.extend(decoder.records())
+
+    assert [record_type for record_type, _ in records] == [RECORD_STATE, RECORD_COUNTERS]
+    decoded_state, decoded_counters = records[0][1], records[1][1]
+    assert decoded_state['status'] == state['status']
+    for field in ('time', 'position'):
+        assert decoded_state[field] == state[field]
+    for field in ('speed', 'acceleration', 'target_speed', 'ceiling_speed'):
+        assert decoded_state[field] == pytest.approx(state[field], rel=1e-6)
+    assert decoded_counters == counters
+    assert decoder.errors == 0 and decoder.pending == 0
+
+# ---- 轨迹日志 ----
+
+def test_trajectory_log_csv_round_trip(tmp_path):
+    log = _synthetic_log(300)
+    trj_path = str(tmp_path / 'run.trj')
+    writer = TrajectoryWriter(trj_path, chunk_rows=64)
+    for row in zip(*(log[key] for key, _, _ in TRAJECTORY_COLUMNS)):
+        writer.write_row(row)
+    writer.close()
+
+    csv_path = str(tmp_path / 'run.csv')
+    trajectory_to_csv(trj_path, csv_path, encoding='gb2312')
+    round_trip_path = str(tmp_path / 'round_trip.trj')
+    csv_to_trajectory(csv_path, round_trip_path, chunk_rows=100)
+
+    with TrajectoryLog(trj_path) as original, TrajectoryLog(round_trip_path) as converted:
+        assert original.n_rows == converted.n_rows == 300
+        a, b = original.read_columns(), converted.read_columns()
+        assert np.array_equal(original.decode_conditions(a['condition']), log['condition'])
+        assert np.array_equal(converted.decode_conditions(b['condition']), log['condition'])
+        for key in ('time', 'position', 'speed'):
+            assert np.array_equal(a[key], b[key]), key
+            np.testing.assert_allclose(a[key], log[key], rtol=0, atol=1e-9, err_msg=key)
+
+    # 两种格式的离线评价读取结果相同
+    frames = read_log_frame(trj_path), read_log_frame(csv_path)
+    assert list(frames[0].columns) == list(frames[1].columns)
+    csv_chunks = list(iter_log_chunks(csv_path, chunk_rows=50))
+    trj_chunks = list(iter_log_chunks(trj_path))
+    for key in ('time', 'position', 'speed', 'condition'):
+        np.testing.assert_array_equal(np.concatenate([c[key] for c in csv_chunks]),
+                                      np.concatenate([c[key] for c in trj_chunks]), err_msg=key)
+
+def test_empty_trajectory_log_is_rejected(tmp_path):
+    path = tmp_path / 'empty.trj'
+    path.write_bytes(b'')
+    with pytest.raises(ValueError, match="不是轨迹日志文件"):
+        TrajectoryLog(str(path))
@@ -0,0 +1,175 @@
+# trajectory_buffer.py
+"""
+实时速度-位置曲线的轨迹缓冲区
+
+TrajectoryBuffer以倍增扩容的NumPy数组保存轨迹点，并增量维护多分辨率的
+最小/最大值金字塔：第l层每个块覆盖2^l个相邻点，记录块内纵坐标最小与最大点的
+下标。view()按显示区间与像素预算选取合适的层，每个块只输出最小与最大两个点，
+取数代价与轨迹总长度无关，缩放到任意区间都只需读取约预算数量的块。
+
+lttb()为最大三角形三桶(Largest-Triangle-Three-Buckets)降采样，形状保持更好
+但逐桶计算较慢，用于保存图片等一次性输出。
+
+追加与读取可以在不同线程中进行：数据先写入数组再发布点数，读取方按读到的点数
+截取，扩容时旧数组仍保持有效。
+"""
+import math
+
+import numpy as np
+
+# 金字塔的最大层数（块长度2^24点）
+MAX_LEVELS = 24
+
+class _GrowableArray:
+    """容量倍增的一维数组"""
+    def __init__(self, dtype=np.float64, capacity=1024):
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            data = np.empty(len(self.data) * 2, dtype=self.data.dtype)
+            data[:self.size] = self.data[:self.size]
+            self.data = data
+        self.data[self.size] = value
+        self.size += 1
+
+def lttb(x, y, threshold):
+    """
+    最大三角形三桶降采样
+
+    参数:
+        x, y: 坐标数组
+        threshold: 输出点数
+    返回:
+        选中点的下标数组（含首尾点）
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < threshold - 1 else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # 与上一选中点、下一桶均值点构成的三角形面积最大的点
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) -
+                      (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+class TrajectoryBuffer:
+    """
+    带最小/最大值金字塔的轨迹缓冲区
+
+    横坐标（位置）应单调不减，以便按显示区间二分查找。
+
+    参数:
+        capacity: 初始容量
+    """
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        """清空轨迹"""
+        self._x = _GrowableArray(np.float64, self.capacity)
+        self._y = _GrowableArray(np.float64, self.capacity)
+        # levels[l-1] = (块内最小点下标, 块内最大点下标)，块长度2^l
+        self._levels = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, x, y):
+        """追加一个点"""
+        index = self._x.size
+        self._x.append(x)
+        self._y.append(y)
+        self._update_levels(index)
+        # 数据与金字塔都写入后再发布点数
+        self.count = index + 1
+
+    def _update_levels(self, index):
+        """点index写入后，合并所有因此完整的块"""
+        y = self._y.data
+        level = 1
+        while level <= MAX_LEVELS and (index + 1) % (1 << level) == 0:
+            block = ((index + 1) >> level) - 1
+            if level == 1:
+                left_min = left_max = index - 1
+                right_min = right_max = index
+            else:
+                mins, maxs = self._levels[level - 2]
+                left_min, right_min = mins.data[2 * block], mins.data[2 * block + 1]
+                left_max, right_max = maxs.data[2 * block], maxs.data[2 * block + 1]
+            if len(self._levels) < level:
+                self._levels.append((_GrowableArray(np.int64), _GrowableArray(np.int64)))
+            mins, maxs = self._levels[level - 1]
+            mins.append(left_min if y[left_min] <= y[right_min] else right_min)
+            maxs.append(left_max if y[left_max] >= y[right_max] else right_max)
+            level += 1
+
+    def arrays(self):
+        """返回全部轨迹点 (x, y) 的只读视图"""
+        count = self.count
+        return self._x.data[:count], self._y.data[:count]
+
+    def view(self, x_min=None, x_max=None, budget=1000, method='minmax'):
+        """
+        取显示区间内降采样后的轨迹
+
+        参数:
+            x_min, x_max: 显示区间，None表示不限
+            budget: 输出点数上限（通常取绘图区宽度像素数的两倍）
+            method: 'minmax'按金字塔块取最小/最大点；'lttb'在其结果上再做LTTB降采样
+        返回:
+            (x数组, y数组)
+        """
+        count = self.count
+        x = self._x.data[:count]
+        y = self._y.data[:count]
+
+        # 区间两侧各多取一个点，使曲线延伸到显示边界
+        start = 0 if x_min is None else max(0, int(np.searchsorted(x, x_min, 'left')) - 1)
+        stop = count if x_max is None else min(count, int(np.searchsorted(x, x_max, 'right')) + 1)
+        if stop - start <= budget:
+            return x[start:stop].copy(), y[start:stop].copy()
+
+        if method == 'lttb':
+            # 先由金字塔取约4倍预算的候选点，再在候选点上做LTTB
+            indices = self._minmax_indices(y, start, stop, budget * 4)
+            indices = indices[lttb(x[indices], y[indices], budget)]
+        else:
+            indices = self._minmax_indices(y, start, stop, budget)
+        return x[indices], y[indices]
+
+    def _minmax_indices(self, y, start, stop, budget):
+        """区间[start, stop)内各块最小/最大点的下标（按下标排序）"""
+        # 每块输出两个点，取块数不超过budget/2的最细一层
+        level = max(1, math.ceil(math.log2(2 * (stop - start) / budget)))
+        level = min(level, len(self._levels))
+        if level == 0:
+            return np.arange(start, stop)
+        size = 1 << level
+        first = -(-start // size)
+        last = stop // size
+        mins, maxs = self._levels[level - 1]
+        last = min(last, mins.size)
+
+        parts = [np.array([start, stop - 1])]
+        # 区间两端不足一块的部分直接在原始数据上取极值
+        for lo, hi in ((start, min(stop, first * size)), (max(start, last * size), stop)):
+            if hi > lo:
+                parts.append(np.array([lo + int(np.argmin(y[lo:hi])), lo + int(np.argmax(y[lo:hi]))]))
+        if last > first:
+            parts.append(mins.data[first:last])
+            parts.append(maxs.data[first:last])
+        return np.unique(np.concatenate(parts))
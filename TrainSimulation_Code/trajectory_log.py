@@ -0,0 +1,307 @@
+# trajectory_log.py
+"""
+列车运行轨迹的列式二进制日志（.trj）
+
+文件结构（小端序，所有数据块按8字节对齐）:
+    文件头: b'TRJ1' | uint32 头部长度 | 头部JSON（列名、数据类型）
+    数据块: b'CHNK' | uint32 行数 | uint32 新增工况长度 | 新增工况JSON
+            | 各列数据依次连续存放
+
+文件只追加写入。工况以uint8编码存储，编码字典预置conditions.OPERATING_CONDITIONS，
+出现新的工况名称时在所在数据块中追加。读取时用mmap映射文件，单个数据块的列直接返回
+零拷贝视图。
+"""
+import atexit
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from conditions import OPERATING_CONDITIONS
+from log_writer import LOG_COLUMNS, format_state_row
+
+logger = logging.getLogger(__name__)
+
+FILE_MAGIC = b'TRJ1'
+CHUNK_MAGIC = b'CHNK'
+FORMAT_VERSION = 1
+_ALIGNMENT = 8
+_FILE_HEADER = struct.Struct('<4sI')
+_CHUNK_HEADER = struct.Struct('<4sII')
+
+# 列定义：(键名, CSV表头, 数据类型)，顺序与TrainSimulation.log_state的记录一致
+# 时间、位置、速度参与评价指标计算，保留双精度；其余列以单精度存储
+TRAJECTORY_COLUMNS = (
+    ('time', LOG_COLUMNS[0], '<f8'),
+    ('position', LOG_COLUMNS[1], '<f8'),
+    ('speed', LOG_COLUMNS[2], '<f8'),
+    ('acceleration', LOG_COLUMNS[3], '<f4'),
+    ('traction_acc', LOG_COLUMNS[4], '<f4'),
+    ('brake_acc', LOG_COLUMNS[5], '<f4'),
+    ('resistance_acc', LOG_COLUMNS[6], '<f4'),
+    ('condition', LOG_COLUMNS[7], '<u1'),
+    ('target_speed', LOG_COLUMNS[8], '<f4'),
+    ('ceiling_speed', LOG_COLUMNS[9], '<f4'),
+)
+_CONDITION_INDEX = 7
+
+def _padding(length):
+    return -length % _ALIGNMENT
+
+class TrajectoryWriter:
+    """
+    列式轨迹日志写入器
+
+    接口与BufferedLogWriter一致，可直接作为TrainSimulation的日志写入器。
+    记录先在内存中累积，每满chunk_rows行写出一个数据块。
+
+    参数:
+        filename: 日志文件路径，已存在时在末尾追加
+        chunk_rows: 每个数据块的行数
+    """
+    def __init__(self, filename, chunk_rows=4096):
+        self.filename = filename
+        self.chunk_rows = chunk_rows
+        self.conditions = list(OPERATING_CONDITIONS)
+        self._codes = {name: code for code, name in enumerate(self.conditions)}
+        self._new_conditions = []
+        self._rows = []
+
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            # 追加到已有文件：恢复工况编码字典
+            existing = TrajectoryLog(filename)
+            self.conditions = list(existing.conditions)
+            self._codes = {name: code for code, name in enumerate(self.conditions)}
+            existing.close()
+            self._file = open(filename, 'ab')
+        else:
+            self._file = open(filename, 'wb')
+            self._write_file_header()
+        atexit.register(self.close)
+
+    def _write_file_header(self):
+        header = json.dumps({
+            "version": FORMAT_VERSION,
+            "columns": [
+                {"key": key, "name": name, "dtype": dtype}
+                for key, name, dtype in TRAJECTORY_COLUMNS
+            ],
+        }, ensure_ascii=False).encode('utf-8')
+        header += b' ' * _padding(_FILE_HEADER.size + len(header))
+        self._file.write(_FILE_HEADER.pack(FILE_MAGIC, len(header)))
+        self._file.write(header)
+
+    def condition_code(self, name):
+        """工况名称对应的编码，新名称自动加入字典"""
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.conditions)
+            if code > 255:
+                raise ValueError("工况种类超过255种，无法以uint8编码")
+            self.conditions.append(name)
+            self._codes[name] = code
+            self._new_conditions.append(name)
+        return code
+
+    def write_row(self, state):
+        """追加一条原始状态记录（字段顺序同TrainSimulation.log_state）"""
+        state = list(state)
+        state[_CONDITION_INDEX] = self.condition_code(state[_CONDITION_INDEX])
+        self._rows.append(state)
+        if len(self._rows) >= self.chunk_rows:
+            self._write_chunk()
+
+    def write_columns(self, columns):
+        """
+        按列追加一批记录
+
+        参数:
+            columns: {键名: 数组}，工况列可以是名称序列或已编码的整数数组
+        """
+        conditions = columns['condition']
+        if len(conditions) and isinstance(conditions[0], str):
+            conditions = [self.condition_code(name) for name in conditions]
+        self._flush_rows()
+        arrays = []
+        for key, _, dtype in TRAJECTORY_COLUMNS:
+            values = conditions if key == 'condition' else columns[key]
+            arrays.append(np.asarray(values, dtype=dtype))
+        self._write_arrays(arrays)
+
+    def flush(self):
+        """写出缓冲中的记录"""
+        self._flush_rows()
+        self._file.flush()
+
+    def close(self):
+        """写出剩余记录并关闭文件"""
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        atexit.unregister(self.close)
+        logger.info(f"轨迹日志已关闭: {self.filename}")
+
+    def _flush_rows(self):
+        if self._rows:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        rows, self._rows = self._rows, []
+        columns = zip(*rows)
+        arrays = [np.array(values, dtype=dtype)
+                  for values, (_, _, dtype) in zip(columns, TRAJECTORY_COLUMNS)]
+        self._write_arrays(arrays)
+
+    def _write_arrays(self, arrays):
+        n_rows = len(arrays[0])
+        if n_rows == 0:
+            return
+        new_conditions = json.dumps(self._new_conditions, ensure_ascii=False).encode('utf-8')
+        self._new_conditions = []
+        new_conditions += b' ' * _padding(_CHUNK_HEADER.size + len(new_conditions))
+
+        parts = [_CHUNK_HEADER.pack(CHUNK_MAGIC, n_rows, len(new_conditions)), new_conditions]
+        for array in arrays:
+            data = array.tobytes()
+            parts.append(data)
+            parts.append(b'\0' * _padding(len(data)))
+        self._file.write(b''.join(parts))
+
+class TrajectoryLog:
+    """
+    列式轨迹日志读取器
+
+    参数:
+        filename: 日志文件路径
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _FILE_HEADER.size:
+            # 空文件或不完整的文件头
+            self._file.close()
+            raise ValueError(f"不是轨迹日志文件: {filename}")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, header_length = _FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != FILE_MAGIC:
+            self.close()
+            raise ValueError(f"不是轨迹日志文件: {filename}")
+        header = json.loads(bytes(self._mmap[_FILE_HEADER.size:_FILE_HEADER.size + header_length]))
+        self.columns = [(c["key"], c["name"], np.dtype(c["dtype"])) for c in header["columns"]]
+        self.conditions = list(OPERATING_CONDITIONS)
+        self.chunks = self._scan_chunks(_FILE_HEADER.size + header_length, size)
+        self.n_rows = sum(n_rows for n_rows, _ in self.chunks)
+
+    def _scan_chunks(self, offset, size):
+        """遍历数据块，记录各块行数与各列偏移；末尾不完整的数据块被忽略"""
+        chunks = []
+        while offset + _CHUNK_HEADER.size <= size:
+            magic, n_rows, dict_length = _CHUNK_HEADER.unpack_from(self._mmap, offset)
+            if magic != CHUNK_MAGIC:
+                logger.warning(f"轨迹日志数据块损坏，停止读取: {self.filename} @ {offset}")
+                break
+            dict_offset = offset + _CHUNK_HEADER.size
+            offset = dict_offset + dict_length
+            column_offsets = []
+            for _, _, dtype in self.columns:
+                column_offsets.append(offset)
+                length = n_rows * dtype.itemsize
+                offset += length + _padding(length)
+            if offset - _padding(length) > size:
+                break
+            new_conditions = json.loads(bytes(self._mmap[dict_offset:dict_offset + dict_length]))
+            self.conditions.extend(new_conditions)
+            chunks.append((n_rows, column_offsets))
+        return chunks
+
+    def chunk_columns(self, index):
+        """第index个数据块的各列（零拷贝视图）"""
+        n_rows, offsets = self.chunks[index]
+        return {
+            key: np.frombuffer(self._mmap, dtype=dtype, count=n_rows, offset=offset)
+            for (key, _, dtype), offset in zip(self.columns, offsets)
+        }
+
+    def iter_chunks(self):
+        """逐块迭代各列"""
+        for index in range(len(self.chunks)):
+            yield self.chunk_columns(index)
+
+    def read_columns(self):
+        """读取全部列；只有一个数据块时返回零拷贝视图，否则拼接各块"""
+        if len(self.chunks) == 1:
+            return self.chunk_columns(0)
+        if not self.chunks:
+            return {key: np.empty(0, dtype=dtype) for key, _, dtype in self.columns}
+        chunks = list(self.iter_chunks())
+        return {key: np.concatenate([chunk[key] for chunk in chunks]) for key, _, _ in self.columns}
+
+    def decode_conditions(self, codes):
+        """工况编码数组转换为名称数组"""
+        return np.asarray(self.conditions, dtype=object)[codes]
+
+    def to_frame(self):
+        """转换为与CSV日志列名一致的pandas DataFrame"""
+        import pandas as pd
+        columns = self.read_columns()
+        data = {}
+        for key, name, _ in self.columns:
+            values = columns[key]
+            data[name] = self.decode_conditions(values) if key == 'condition' else np.asarray(values, dtype=float)
+        return pd.DataFrame(data)
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            try:
+                self._mmap.close()
+            except BufferError:
+                # 仍有数组视图引用映射内存，交由垃圾回收释放
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def read_log_frame(path, encoding='gb2312'):
+    """按扩展名读取CSV日志或列式轨迹日志，返回DataFrame"""
+    if path.lower().endswith('.trj'):
+        log = TrajectoryLog(path)
+        frame = log.to_frame()
+        log.close()
+        return frame
+    import pandas as pd
+    return pd.read_csv(path, encoding=encoding)
+
+def csv_to_trajectory(csv_path, trj_path, encoding='gb2312', chunk_rows=65536):
+    """将CSV日志转换为列式轨迹日志"""
+    import pandas as pd
+    writer = TrajectoryWriter(trj_path, chunk_rows=chunk_rows)
+    try:
+        for frame in pd.read_csv(csv_path, encoding=encoding, chunksize=chunk_rows):
+            writer.write_columns({
+                key: frame[name].to_numpy() if key == 'condition' else frame[name].to_numpy(dtype=float)
+                for key, name, _ in TRAJECTORY_COLUMNS
+            })
+    finally:
+        writer.close()
+
+def trajectory_to_csv(trj_path, csv_path, encoding='gbk'):
+    """将列式轨迹日志转换为CSV日志（列与格式同TrainSimulation.log_state）"""
+    with TrajectoryLog(trj_path) as log, open(csv_path, 'w', newline='', encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(LOG_COLUMNS)
+        for chunk in log.iter_chunks():
+            conditions = log.decode_conditions(chunk['condition'])
+            values = [chunk[key].tolist() for key, _, _ in TRAJECTORY_COLUMNS]
+            values[_CONDITION_INDEX] = conditions
+            writer.writerows(format_state_row(row) for row in zip(*values))
@@ -2,59 +2,105 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 from PyQt5.QtCore import Qt, QPoint, QRectF
 from PyQt5.QtGui import (QPainter, QPen, QColor, QPainterPath, QFont, 
-                        QLinearGradient, QRadialGradient)
+                        QLinearGradient, QRadialGradient, QPixmap)
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import numpy as np
 
-class SpeedGaugeWidget(QWidget):
-    """现代风格速度仪表盘控件"""
-    def __init__(self, parent=None):
+class GaugeWidget(QWidget):
+    """
+    仪表盘基类
+
+    背景弧、刻度线与刻度数字只在尺寸或设备像素比变化时绘制到缓存的QPixmap中，
+    每次重绘只需贴上背景并绘制指针与数值。数值变化不足以改变显示（指针转角小于
+    MIN_VISIBLE_ANGLE且数值文字不变）时不触发重绘。
+    """
+    MIN_VISIBLE_ANGLE = 0.25  # 可见的最小指针转角(度)
+
+    def __init__(self, min_value, max_value, parent=None):
         super().__init__(parent)
+        self.min_value = min_value
+        self.max_value = max_value
         self.value = 0
         self.setMinimumSize(200, 200)
         # 定义角度范围
         self.start_angle = -210  # 起始角度（左侧）
         self.end_angle = 30      # 结束角度（右侧）
         self.range_angle = self.end_angle - self.start_angle  # 总范围240度
-        
+        self._background = None
+        self._background_key = None
+
+    def valueToAngle(self, value):
+        """数值对应的指针角度(度)"""
+        return self.start_angle + ((value - self.min_value) /
+               (self.max_value - self.min_value)) * self.range_angle
+
+    def valueText(self, value):
+        """数值显示文字"""
+        return f"{value:.0f}"
+
     def setValue(self, value):
-        """设置速度值（km/h）"""
-        self.value = max(0, min(value, 120))  # 限制在0-120范围内
+        """设置显示值，超出量程时取边界值"""
+        value = max(self.min_value, min(value, self.max_value))
+        if (abs(self.valueToAngle(value) - self.valueToAngle(self.value)) < self.MIN_VISIBLE_ANGLE
+                and self.valueText(value) == self.valueText(self.value)):
+            return
+        self.value = value
         self.update()
-        
+
+    def resizeEvent(self, event):
+        self._background = None
+        super().resizeEvent(event)
+
+    def radius(self):
+        return min(self.width(), self.height()) // 2 - 20
+
+    def background(self):
+        """返回缓存的仪表盘背景，尺寸或设备像素比变化时重新绘制"""
+        ratio = self.devicePixelRatioF()
+        key = (self.width(), self.height(), ratio)
+        if self._background is None or self._background_key != key:
+            pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.translate(self.width() // 2, self.height() // 2)
+            self.drawBackground(painter, self.radius())
+            painter.end()
+            self._background = pixmap
+            self._background_key = key
+        return self._background
+
+    def drawBackground(self, painter, radius):
+        """绘制背景弧与刻度"""
+        pen = QPen(QColor("#e5e7eb"), 10)
+        painter.setPen(pen)
+        painter.drawArc(-radius, -radius, radius*2, radius*2,
+                       self.start_angle*16, self.range_angle*16)
+        self.drawScale(painter, radius)
+
     def paintEvent(self, event):
         """绘制仪表盘"""
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.background())
         painter.setRenderHint(QPainter.Antialiasing)
         
-        # 计算绘制区域
-        width = self.width()
-        height = self.height()
-        center_x = width // 2
-        center_y = height // 2  # 居中放置
-        radius = min(width, height) // 2 - 20
-        
-        # 绘制外圈
         painter.save()
-        painter.translate(center_x, center_y)
-        
-        # 绘制背景弧
-        pen = QPen(QColor("#e5e7eb"), 10)
-        painter.setPen(pen)
-        painter.drawArc(-radius, -radius, radius*2, radius*2,
-                       self.start_angle*16, self.range_angle*16)
-        
-        # 绘制刻度
-        self.drawScale(painter, radius)
+        painter.translate(self.width() // 2, self.height() // 2)
         
         # 绘制数值显示
-        self.drawValue(painter, radius)
+        self.drawValue(painter, self.radius())
         
         # 绘制指针
-        self.drawPointer(painter, radius)
+        self.drawPointer(painter, self.radius())
         
         painter.restore()
+
+class SpeedGaugeWidget(GaugeWidget):
+    """现代风格速度仪表盘控件"""
+    def __init__(self, parent=None):
+        super().__init__(0, 120, parent)
         
     def drawScale(self, painter, radius):
         """绘制刻度"""
@@ -137,7 +183,7 @@ class SpeedGaugeWidget(QWidget):
         font.setBold(True)
         painter.setFont(font)
         painter.setPen(QColor("#2563eb"))
-        value_text = f"{self.value:.0f}"
+        value_text = self.valueText(self.value)
         painter.drawText(QRectF(-50, radius/2, 100, 40), Qt.AlignCenter, value_text)
         
         # 绘制单位
@@ -152,7 +198,7 @@ class SpeedGaugeWidget(QWidget):
         painter.save()
         
         # 计算指针角度
-        angle = self.start_angle + (self.value / 120) * self.range_angle
+        angle = self.valueToAngle(self.value)
         rad_angle = angle * np.pi / 180
         
         # 计算指针端点
@@ -192,56 +238,13 @@ class SpeedGaugeWidget(QWidget):
         
         painter.restore()
 
-class AccelerationGaugeWidget(QWidget):
+class AccelerationGaugeWidget(GaugeWidget):
     """现代风格加速度仪表盘控件"""
     def __init__(self, parent=None):
-        super().__init__(parent)
-        self.value = 0
-        self.setMinimumSize(200, 200)
-        # 定义角度范围
-        self.start_angle = -210  # 起始角度（左侧，对应-1.1）
-        self.end_angle = 30      # 结束角度（右侧，对应+1.1）
-        self.range_angle = self.end_angle - self.start_angle  # 总范围240度
-        self.min_value = -1.1
-        self.max_value = 1.1
-        
-    def setValue(self, value):
-        """设置加速度值（m/s²）"""
-        self.value = max(self.min_value, min(value, self.max_value))
-        self.update()
-        
-    def paintEvent(self, event):
-        """绘制仪表盘"""
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        
-        # 计算绘制区域
-        width = self.width()
-        height = self.height()
-        center_x = width // 2
-        center_y = height // 2  # 居中放置
-        radius = min(width, height) // 2 - 20
-        
-        # 绘制外圈
-        painter.save()
-        painter.translate(center_x, center_y)
-        
-        # 绘制背景弧
-        pen = QPen(QColor("#e5e7eb"), 10)
-        painter.setPen(pen)
-        painter.drawArc(-radius, -radius, radius*2, radius*2,
-                       self.start_angle*16, self.range_angle*16)
-        
-        # 绘制刻度
-        self.drawScale(painter, radius)
-        
-        # 绘制数值显示
-        self.drawValue(painter, radius)
-        
-        # 绘制指针
-        self.drawPointer(painter, radius)
-        
-        painter.restore()
+        super().__init__(-1.1, 1.1, parent)
+
+    def valueText(self, value):
+        return f"{value:.2f}"
         
     def drawScale(self, painter, radius):
         """绘制刻度"""
@@ -311,7 +314,7 @@ class AccelerationGaugeWidget(QWidget):
         font.setBold(True)
         painter.setFont(font)
         painter.setPen(color)
-        value_text = f"{self.value:.2f}"
+        value_text = self.valueText(self.value)
         painter.drawText(QRectF(-50, radius/2, 100, 40), Qt.AlignCenter, value_text)
         
         # 绘制单位
@@ -326,8 +329,7 @@ class AccelerationGaugeWidget(QWidget):
         painter.save()
         
         # 计算指针角度
-        angle = self.start_angle + ((self.value - self.min_value) / 
-               (self.max_value - self.min_value)) * self.range_angle
+        angle = self.valueToAngle(self.value)
         rad_angle = angle * np.pi / 180
         
         # 计算指针端点
@@ -372,7 +374,12 @@ class AccelerationGaugeWidget(QWidget):
         painter.restore()
 
 class MatplotlibWidget(QWidget):
-    """Matplotlib图表控件"""
+    """
+    Matplotlib图表控件
+
+    目标速度与顶棚速度曲线作为静态背景，每条线路只绘制一次；实际速度曲线为动画元素，
+    更新时恢复缓存的背景并只重绘这一条曲线（blitting）。
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
         # 创建图表
@@ -387,47 +394,78 @@ class MatplotlibWidget(QWidget):
         layout.addWidget(self.canvas)
         
         # 配置图表样式
-        self.ax.grid(True, linestyle='--', alpha=0.6)
-        self.ax.set_xlabel('位置 (m)', fontsize=10)
-        self.ax.set_ylabel('速度 (km/h)', fontsize=10)
-        self.ax.tick_params(labelsize=9)
-        self.figure.tight_layout()
-        
-    def plot_data(self, x1, y1, x2, y2, x3=None, y3=None):
-        """绘制速度曲线"""
-        self.ax.clear()
-        
-        # 设置样式
         self.ax.set_facecolor('#f8fafc')
         self.ax.grid(True, linestyle='--', alpha=0.6, color='#cbd5e1')
-        
-        # 绘制曲线
-        self.ax.plot(x1, y1, color='#2563eb', label='目标速度', 
-                    linewidth=2, linestyle='-')
-        self.ax.plot(x2, y2, color='#dc2626', label='顶棚速度', 
-                    linewidth=2, linestyle='--')
-        
-        if x3 is not None and y3 is not None and len(x3) > 0:
-            self.ax.plot(x3, y3, color='#eab308', label='实际速度', 
-                        linewidth=2.5)
-            
-        # 设置图表属性
         self.ax.set_xlabel('位置 (m)', fontsize=10, color='#475569')
         self.ax.set_ylabel('速度 (km/h)', fontsize=10, color='#475569')
-        self.ax.tick_params(colors='#475569')
-        
-        # 设置图例
+        self.ax.tick_params(labelsize=9, colors='#475569')
+
+        # 创建常驻的曲线对象，之后只更新数据
+        self.target_line, = self.ax.plot([], [], color='#2563eb', label='目标速度',
+                                         linewidth=2, linestyle='-')
+        self.ceiling_line, = self.ax.plot([], [], color='#dc2626', label='顶棚速度',
+                                          linewidth=2, linestyle='--')
+        self.actual_line, = self.ax.plot([], [], color='#eab308', label='实际速度',
+                                         linewidth=2.5, animated=True)
         self.ax.legend(loc='upper right', fancybox=True, shadow=True)
-        
-        # 调整显示范围
-        if x3 is not None and len(x3) > 0:
-            self.ax.set_xlim(min(x1[0], x3[0]), max(x1[-1], x3[-1]))
-            self.ax.set_ylim(0, max(max(y1), max(y2)) * 1.1)
-            
+        self.figure.tight_layout()
+
+        # 静态背景缓存，整图重绘（包括窗口缩放）后在draw_event中更新
+        self.background = None
+        self.static_data = None
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def on_draw(self, event):
+        """整图重绘后缓存背景，并补画动画元素"""
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.actual_line)
+
+    def set_static_curves(self, x1, y1, x2, y2):
+        """设置目标速度与顶棚速度曲线并整图重绘"""
+        self.static_data = (x1, y1, x2, y2)
+        self.target_line.set_data(x1, y1)
+        self.ceiling_line.set_data(x2, y2)
+        self.ax.set_xlim(min(x1[0], x2[0]), max(x1[-1], x2[-1]))
+        self.ax.set_ylim(0, max(np.max(y1), np.max(y2)) * 1.1)
         self.figure.tight_layout()
         self.canvas.draw()
+
+    def point_budget(self):
+        """实际速度曲线的点数预算：绘图区每个像素列两个点（最小与最大值）"""
+        return max(100, 2 * int(self.ax.bbox.width))
+
+    def update_actual(self, x3, y3):
+        """更新实际速度曲线，只重绘该曲线"""
+        self.actual_line.set_data(x3, y3)
+
+        # 实际曲线超出当前显示范围时扩展横轴并整图重绘
+        left, right = self.ax.get_xlim()
+        if len(x3) > 0 and (x3[0] < left or x3[-1] > right):
+            self.ax.set_xlim(min(left, x3[0]), max(right, x3[-1]))
+            self.canvas.draw()
+            return
+
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.actual_line)
+        self.canvas.blit(self.ax.bbox)
+        
+    def plot_data(self, x1, y1, x2, y2, x3=None, y3=None):
+        """绘制速度曲线（静态曲线数据变化时才重绘背景）"""
+        static_data = (x1, y1, x2, y2)
+        if self.static_data is None or any(a is not b for a, b in zip(static_data, self.static_data)):
+            self.set_static_curves(x1, y1, x2, y2)
+        self.update_actual([] if x3 is None else x3, [] if y3 is None else y3)
         
     def save_plot(self, filename):
         """保存图表为图片"""
-        self.figure.savefig(filename, dpi=100, bbox_inches='tight', 
-                          facecolor='white', edgecolor='none')
\ No newline at end of file
+        # 动画元素不参与普通绘制，保存时临时取消
+        self.actual_line.set_animated(False)
+        try:
+            self.figure.savefig(filename, dpi=100, bbox_inches='tight', 
+                              facecolor='white', edgecolor='none')
+        finally:
+            self.actual_line.set_animated(True)
+            self.canvas.draw()
\ No newline at end of file